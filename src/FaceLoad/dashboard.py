@@ -0,0 +1,277 @@
+"""
+Instantané du tableau de bord administrateur.
+
+Le contenu JSON du tableau de bord est calculé une fois puis conservé dans
+le cache (`DASHBOARD_SNAPSHOT['CACHE']`) avec :
+
+- un numéro de version, incrémenté après chaque validation de transaction
+  qui touche un `Planning` ou une `Absence` (signaux post_save/post_delete,
+  appels explicites dans les écritures groupées) ;
+- une durée de vie courte (`TTL`), qui borne aussi la fraîcheur des données
+  non suivies : utilisateurs, et pointages, trop fréquents pendant un cours
+  (un scan par étudiant) pour périmer l'instantané à chacun ;
+- un ETag et une date de génération pour les requêtes conditionnelles.
+
+Un instantané périmé n'est reconstruit que par un seul worker à la fois
+(verrou `cache.add`), les autres continuent à servir l'ancien en attendant.
+Pour que l'invalidation et le verrou valent pour tous les workers, le cache
+doit être partagé (Redis, Memcached) ; avec le cache mémoire par défaut, ils
+ne valent que par processus et le TTL borne le retard des autres.
+
+Les graphiques d'absences sont lus dans la table de faits `FaitAbsence`.
+Les sections (KPIs, graphiques) sont indépendantes : `calculer_dashboard`
+les enchaîne, `calculer_dashboard_concurrent` (vue asynchrone) les exécute
+en parallèle sur des connexions distinctes.
+"""
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import close_old_connections, transaction
+from django.db.models import Sum
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from absences.models import Absence, FaitAbsence
+from planning.models import Planning
+from pointage.models import Pointage
+
+from .stats import compter_plannings, compter_utilisateurs_actifs
+
+_config = getattr(settings, 'DASHBOARD_SNAPSHOT', {})
+
+CLE_INSTANTANE = 'dashboard:instantane'
+CLE_VERSION = 'dashboard:version'
+CLE_VERROU = 'dashboard:verrou'
+
+
+def _cache():
+    return caches[_config.get('CACHE', 'default')]
+
+
+# --- Sections indépendantes : une ou deux requêtes chacune, sans état partagé ---
+
+def _section_utilisateurs(today):
+    return compter_utilisateurs_actifs()
+
+
+def _section_presents(today):
+    return Pointage.objects.filter(timestamp__date=today).values('user').distinct().count()
+
+
+def _section_plannings(today):
+    return compter_plannings(Planning.objects.filter(date=today))
+
+
+def _section_absences_semaine(today):
+    one_week_ago = today - timedelta(days=7)
+    # Équivalent à cree_le__date__gte, sans conversion de la colonne : l'index (statut, cree_le) sert
+    return Absence.objects.filter(
+        cree_le__gte=timezone.make_aware(datetime.combine(one_week_ago, datetime.min.time())),
+        statut='NON_JUSTIFIEE'
+    ).count()
+
+
+def _graphique(dimension, decimales):
+    # Table de faits (absences.faits) : une absence compte pour 1 au total, répartie
+    # entre les filières de son module
+    def section(today):
+        data = (
+            FaitAbsence.objects.filter(statut='NON_JUSTIFIEE', **{f'{dimension}__isnull': False})
+            .values(f'{dimension}__name').annotate(count=Sum('poids')).order_by('-count')
+        )
+        return {
+            'labels': [item[f'{dimension}__name'] for item in data],
+            'data': [round(item['count'], decimales) if decimales else round(item['count']) for item in data],
+        }
+    return section
+
+
+SECTIONS = {
+    'utilisateurs': _section_utilisateurs,
+    'presents': _section_presents,
+    'plannings': _section_plannings,
+    'absences_semaine': _section_absences_semaine,
+    'absences_by_filiere': _graphique('filiere', 2),
+    'absences_by_module': _graphique('module', 0),
+    'absences_by_classe': _graphique('classe', 0),
+}
+
+
+def _assembler(sections):
+    """
+    Toutes les données du dashboard admin : KPIs et données des graphiques d'absences.
+    """
+    # Taux de présence
+    total_students = sections['utilisateurs']['etudiants']
+    students_present_today = sections['presents']
+    attendance_rate = (students_present_today / total_students) * 100 if total_students > 0 else 0
+
+    # Plannings du jour
+    plannings_today = sections['plannings']
+    total_plannings_today = plannings_today['total']
+    validated_plannings = plannings_today['valides_admin']
+    cancelled_plannings = plannings_today['annules']
+    scheduled_plannings = total_plannings_today - validated_plannings - cancelled_plannings
+
+    return {
+        'kpis': {
+            'attendance_rate': round(attendance_rate, 2),
+            'plannings_today': {
+                'total': total_plannings_today,
+                'validated': validated_plannings,
+                'cancelled': cancelled_plannings,
+                'scheduled': scheduled_plannings,
+            },
+            'active_users': {
+                'students': total_students,
+                'professors': sections['utilisateurs']['professeurs'],
+            },
+            'unjustified_absences_week': sections['absences_semaine'],
+        },
+        'charts': {
+            'absences_by_filiere': sections['absences_by_filiere'],
+            'absences_by_module': sections['absences_by_module'],
+            'absences_by_classe': sections['absences_by_classe'],
+        }
+    }
+
+
+def calculer_dashboard():
+    """Calcul séquentiel, dans le thread (et sur la connexion) de l'appelant."""
+    today = date.today()
+    return _assembler({nom: section(today) for nom, section in SECTIONS.items()})
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _pool_sections():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(
+                    max_workers=_config.get('WORKERS', 4), thread_name_prefix='dashboard'
+                )
+    return _pool
+
+
+def _executer_section(section, today):
+    # Chaque section est traitée comme une requête : les connexions expirées
+    # (CONN_MAX_AGE) ou en erreur des threads du pool sont fermées avant et après
+    close_old_connections()
+    try:
+        return section(today)
+    finally:
+        close_old_connections()
+
+
+def calculer_dashboard_concurrent():
+    """
+    Exécute les sections en parallèle dans un pool de threads borné (`DASHBOARD_SNAPSHOT['WORKERS']`),
+    une connexion par thread : la durée est proche de celle de la section la plus lente.
+    """
+    today = date.today()
+    pool = _pool_sections()
+    futures = {nom: pool.submit(_executer_section, section, today) for nom, section in SECTIONS.items()}
+    return _assembler({nom: future.result() for nom, future in futures.items()})
+
+
+def version():
+    cache = _cache()
+    valeur = cache.get(CLE_VERSION)
+    if valeur is None:
+        cache.add(CLE_VERSION, 1, timeout=None)
+        valeur = cache.get(CLE_VERSION, 1)
+    return valeur
+
+
+def _incrementer_version():
+    cache = _cache()
+    try:
+        cache.incr(CLE_VERSION)
+    except ValueError:
+        cache.add(CLE_VERSION, 1, timeout=None)
+
+
+def marquer_perime():
+    """
+    Périme l'instantané une fois la transaction en cours validée (une reconstruction
+    lancée avant la validation ne verrait pas encore la modification).
+    """
+    transaction.on_commit(_incrementer_version)
+
+
+def _est_frais(instantane, version_actuelle):
+    return (
+        instantane['version'] == version_actuelle
+        and instantane['jour'] == date.today().isoformat()
+        and time.time() - instantane['genere_le'] < _config.get('TTL', 30)
+    )
+
+
+def reconstruire(calculer=calculer_dashboard):
+    """
+    Recalcule l'instantané avec `calculer` et le range dans le cache.
+
+    Returns:
+        L'instantané : dictionnaire (contenu JSON, etag, genere_le, version, jour).
+    """
+    version_source = version()
+    contenu = json.dumps(calculer(), ensure_ascii=False).encode('utf-8')
+    instantane = {
+        'contenu': contenu,
+        'etag': f'"{hashlib.md5(contenu).hexdigest()}"',
+        'genere_le': time.time(),
+        'version': version_source,
+        'jour': date.today().isoformat(),
+    }
+    # Conservé au-delà du TTL pour être servi pendant la reconstruction suivante
+    _cache().set(CLE_INSTANTANE, instantane, timeout=_config.get('TTL', 30) * 20)
+    return instantane
+
+
+def obtenir_instantane(calculer=calculer_dashboard):
+    """
+    Returns:
+        L'instantané frais, ou l'ancien si un autre worker le reconstruit déjà.
+    """
+    cache = _cache()
+    instantane = cache.get(CLE_INSTANTANE)
+    if instantane is not None and _est_frais(instantane, version()):
+        return instantane
+
+    delai_verrou = _config.get('DELAI_VERROU', 30)
+    if cache.add(CLE_VERROU, 1, timeout=delai_verrou):
+        try:
+            return reconstruire(calculer)
+        finally:
+            cache.delete(CLE_VERROU)
+
+    if instantane is not None and instantane['jour'] == date.today().isoformat():
+        return instantane
+
+    # Aucun instantané utilisable : on attend celui en cours de construction
+    limite = time.monotonic() + delai_verrou
+    while time.monotonic() < limite and cache.get(CLE_VERROU) is not None:
+        time.sleep(0.05)
+    instantane = cache.get(CLE_INSTANTANE)
+    if instantane is not None and instantane['jour'] == date.today().isoformat():
+        return instantane
+    return reconstruire(calculer)
+
+
+@receiver(post_save, sender=Planning)
+@receiver(post_save, sender=Absence)
+@receiver(post_delete, sender=Planning)
+@receiver(post_delete, sender=Absence)
+def perimer_dashboard(sender, **kwargs):
+    marquer_perime()
@@ -0,0 +1,260 @@
+"""
+Exports CSV et XLSX en flux, à mémoire constante.
+
+Les lignes arrivent d'un générateur (en pratique `values_list(...).iterator(chunk_size=...)`)
+et sont encodées par morceaux d'environ 64 Ko :
+
+- CSV : séparateur `;` et BOM UTF-8, pour une ouverture directe dans Excel ;
+- XLSX : classeur minimal écrit avec `zipfile` dans un tampon non
+  positionnable (descripteurs de données ZIP), cellules en chaînes inline,
+  sans `sharedStrings` à construire en mémoire.
+
+`reponse_export` sert le flux par `StreamingHttpResponse` (itérateur
+asynchrone sous ASGI, pour que Django ne charge pas tout le flux en
+mémoire), `ecrire_export` l'écrit dans `EXPORTS_ROOT` (hors de MEDIA_ROOT,
+jamais servi directement) pour les exports lancés en tâche de fond : le
+fichier se télécharge par la tâche, avec les mêmes droits que son statut.
+
+Les textes commençant par `= + - @`, une tabulation ou un retour chariot
+sont préfixés d'une apostrophe, pour qu'un tableur ne les évalue pas comme
+des formules (noms, justificatifs saisis par les étudiants).
+"""
+import csv
+import re
+import zipfile
+from datetime import date, datetime
+from itertools import chain
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+# Lignes lues par aller-retour avec la base
+TAILLE_LOT = 2000
+
+# Taille visée d'un morceau envoyé au client
+TAILLE_MORCEAU = 64 * 1024
+
+# Caractères de contrôle interdits dans le XML
+_CARACTERES_INTERDITS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+# Premiers caractères qu'un tableur interprète comme le début d'une formule
+_DEBUTS_FORMULE = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _neutraliser(texte):
+    return "'" + texte if texte.startswith(_DEBUTS_FORMULE) else texte
+
+
+def _texte(valeur):
+    if valeur is None:
+        return ''
+    if isinstance(valeur, datetime):
+        if timezone.is_aware(valeur):
+            valeur = timezone.localtime(valeur)
+        return valeur.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(valeur, date):
+        return valeur.isoformat()
+    if isinstance(valeur, str):
+        return _neutraliser(valeur)
+    return str(valeur)
+
+
+class _Echo:
+    """Pseudo-fichier pour `csv.writer` : retourne la ligne au lieu de l'écrire."""
+
+    def write(self, valeur):
+        return valeur
+
+
+def lignes_csv(entetes, lignes):
+    writer = csv.writer(_Echo(), delimiter=';')
+    morceau = ['\ufeff' + writer.writerow(entetes)]
+    taille = 0
+    for ligne in lignes:
+        texte = writer.writerow([_texte(valeur) for valeur in ligne])
+        morceau.append(texte)
+        taille += len(texte)
+        if taille >= TAILLE_MORCEAU:
+            yield ''.join(morceau).encode('utf-8')
+            morceau, taille = [], 0
+    yield ''.join(morceau).encode('utf-8')
+
+
+class _TamponFlux:
+    """
+    Fichier en écriture seule et non positionnable : `zipfile` y écrit, le
+    générateur XLSX en retire le contenu au fur et à mesure.
+    """
+
+    def __init__(self):
+        self.morceaux = []
+        self.taille = 0
+
+    def write(self, donnees):
+        self.morceaux.append(bytes(donnees))
+        self.taille += len(donnees)
+        return len(donnees)
+
+    def flush(self):
+        pass
+
+    def vider(self):
+        donnees = b''.join(self.morceaux)
+        self.morceaux, self.taille = [], 0
+        return donnees
+
+
+_XLSX_FICHIERS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="{feuille}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+        'Target="styles.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/styles.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="1"><fill><patternFill patternType="none"/></fill></fills>'
+        '<borders count="1"><border/></borders>'
+        '<cellStyleXfs count="1"><xf/></cellStyleXfs>'
+        '<cellXfs count="1"><xf xfId="0"/></cellXfs>'
+        '</styleSheet>'
+    ),
+}
+
+
+def _cellule_xml(valeur):
+    if valeur is None:
+        return '<c/>'
+    if isinstance(valeur, (int, float)) and not isinstance(valeur, bool):
+        return f'<c t="n"><v>{valeur}</v></c>'
+    texte = escape(_CARACTERES_INTERDITS.sub('', _texte(valeur)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{texte}</t></is></c>'
+
+
+def lignes_xlsx(entetes, lignes, feuille='Export'):
+    tampon = _TamponFlux()
+    with zipfile.ZipFile(tampon, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for nom, contenu in _XLSX_FICHIERS.items():
+            archive.writestr(nom, contenu.replace('{feuille}', escape(feuille[:31])))
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as xml:
+            xml.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            for ligne in chain([entetes], lignes):
+                xml.write(('<row>' + ''.join(_cellule_xml(valeur) for valeur in ligne) + '</row>').encode('utf-8'))
+                if tampon.taille >= TAILLE_MORCEAU:
+                    yield tampon.vider()
+            xml.write(b'</sheetData></worksheet>')
+    yield tampon.vider()
+
+
+FORMATS = {
+    'csv': ('text/csv; charset=utf-8', lignes_csv),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', lignes_xlsx),
+}
+
+
+async def _flux_async(morceaux):
+    """
+    Itérateur asynchrone sur un générateur synchrone : chaque morceau est produit
+    dans le thread de la vue (lectures en base comprises).
+    """
+    iterateur = iter(morceaux)
+    suivant = sync_to_async(lambda: next(iterateur, None), thread_sensitive=True)
+    while True:
+        morceau = await suivant()
+        if morceau is None:
+            return
+        yield morceau
+
+
+def reponse_export(request, nom, type_fichier, entetes, lignes):
+    """
+    Returns:
+        Une `StreamingHttpResponse` en pièce jointe `nom.type_fichier`.
+    """
+    content_type, generer = FORMATS[type_fichier]
+    morceaux = generer(entetes, lignes)
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        morceaux = _flux_async(morceaux)
+
+    reponse = StreamingHttpResponse(morceaux, content_type=content_type)
+    reponse['Content-Disposition'] = f'attachment; filename="{nom}.{type_fichier}"'
+    return reponse
+
+
+def chemin_export(nom_fichier):
+    """
+    Returns:
+        Le chemin d'un export écrit par `ecrire_export`, ou None si le nom sort du dossier.
+    """
+    if not nom_fichier or Path(nom_fichier).name != nom_fichier:
+        return None
+    return Path(settings.EXPORTS_ROOT) / nom_fichier
+
+
+def ecrire_export(nom, type_fichier, entetes, lignes):
+    """
+    Écrit l'export dans `EXPORTS_ROOT/nom.type_fichier`.
+
+    Returns:
+        Un tuple (nom du fichier, nombre de lignes écrites).
+    """
+    compteur = [0]
+
+    def compter(lignes):
+        for ligne in lignes:
+            compteur[0] += 1
+            yield ligne
+
+    _, generer = FORMATS[type_fichier]
+    nom_fichier = f"{nom}.{type_fichier}"
+    chemin = chemin_export(nom_fichier)
+    chemin.parent.mkdir(parents=True, exist_ok=True)
+    with open(chemin, 'wb') as fichier:
+        for morceau in generer(entetes, compter(lignes)):
+            fichier.write(morceau)
+    return nom_fichier, compteur[0]
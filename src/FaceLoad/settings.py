@@ -37,6 +37,9 @@ ALLOWED_HOSTS = ['127.0.0.1', 'localhost', '192.168.1.9']
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Exports écrits par les tâches de fond : hors de MEDIA_ROOT, servis uniquement par `taches/<id>/fichier/`
+EXPORTS_ROOT = BASE_DIR / 'exports'
+
 
 
 # Application definition installé
@@ -58,7 +61,10 @@ INSTALLED_APPS = [
     "horaire",
     "role",
     "planning",
-    "pointage"
+    "pointage",
+    "taches",
+    "medias",
+    "statistiques"
 ]
 
 MIDDLEWARE = [
@@ -202,3 +208,85 @@ CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
+
+# Index des sessions de présence actives (pointage)
+# Alias d'un cache de CACHES partagé entre les workers (ex: Redis). None = index en mémoire du processus uniquement
+POINTAGE_INDEX_CACHE = None
+
+# Écriture des pointages par micro-lots (pointage.ingestion)
+# ACTIF=False écrit chaque pointage directement (tests), TAILLE_LOT et DELAI (secondes) bornent un lot
+POINTAGE_TAMPON = {
+    'ACTIF': True,
+    'TAILLE_LOT': 200,
+    'DELAI': 0.02,
+    'TIMEOUT': 10,
+}
+
+# Rayon (en mètres) autour du professeur dans lequel un étudiant peut pointer
+POINTAGE_RAYON_METRES = 100
+
+# Codes de présence rotatifs (pointage.codes) : durée d'un code et nombre de codes précédents encore acceptés
+POINTAGE_CODE_ROTATION_SECONDES = 30
+POINTAGE_CODE_TOLERANCE = 1
+
+# Pointages hors ligne (pointage.hors_ligne) : délai (minutes) après la fin d'une session pendant
+# lequel l'appareil d'un professeur peut encore les envoyer. Ceux d'un étudiant doivent arriver avant la fin
+POINTAGE_HORS_LIGNE_DELAI_MINUTES = 60
+
+# Intervalle (secondes) du balayeur qui désactive les sessions de présence expirées.
+# None = pas de balayeur dans le processus (utiliser la commande `expirer_sessions`)
+POINTAGE_EXPIRATION_INTERVALLE = 60
+
+# File de tâches de fond en base (taches). WORKERS_INTEGRES = threads workers du processus web
+# (0 = utiliser la commande `executer_taches`), DELAI_RETRY, DELAI_BLOCAGE et BATTEMENT en secondes.
+# Une tâche EN_COURS sans battement depuis DELAI_BLOCAGE est reprise : BATTEMENT doit rester bien inférieur
+TACHES = {
+    'WORKERS_INTEGRES': 2,
+    'INTERVALLE': 2,
+    'DELAI_RETRY': 30,
+    'DELAI_BLOCAGE': 900,
+    'BATTEMENT': 60,
+}
+
+# Téléversement des justificatifs par morceaux (absences.televersement). Tailles en octets
+JUSTIFICATIF_TELEVERSEMENT = {
+    'TAILLE_MAX': 20 * 1024 * 1024,
+    'TAILLE_MORCEAU_MAX': 2 * 1024 * 1024,
+    'EXPIRATION_HEURES': 24,
+}
+
+# Variantes des images de MEDIA_ROOT (medias) : largeur maximale en pixels et qualité JPEG
+MEDIAS_VARIANTES = {
+    'vignette': {'LARGEUR': 320, 'QUALITE': 70},
+    'apercu': {'LARGEUR': 1600, 'QUALITE': 80},
+}
+MEDIAS_DOSSIERS = ['photos', 'justificatifs_absences']
+
+# Alertes d'absences non justifiées par module (absences.alertes). DELAI_ENVOI en secondes :
+# regroupe dans un même lot les alertes levées peu de temps après la première.
+# DELAI_RESERVATION (secondes) : délai après lequel un lot réservé mais jamais confirmé est renvoyé
+ALERTES_ABSENCES = {
+    'SEUILS': [3, 5],
+    'DESTINATAIRES_COPIE': [],
+    'DELAI_ENVOI': 60,
+    'TAILLE_LOT': 200,
+    'MAX_TENTATIVES': 5,
+    'DELAI_RESERVATION': 900,
+}
+
+# Instantané du dashboard admin (FaceLoad.dashboard). TTL et DELAI_VERROU en secondes.
+# TTL borne aussi le retard des présences du jour : les pointages ne périment pas l'instantané
+# CACHE : alias de CACHES, partagé entre les workers en production (ex: Redis)
+# WORKERS : threads de la vue asynchrone qui calculent les sections en parallèle (connexions recyclées à chaque section)
+DASHBOARD_SNAPSHOT = {
+    'CACHE': 'default',
+    'TTL': 30,
+    'DELAI_VERROU': 30,
+    'WORKERS': 4,
+}
+
+# Agrégats quotidiens de présence (statistiques.rollup). FENETRE_HEURES : changements repris
+# par le passage de nuit, un peu plus de 24 h pour que deux passages se chevauchent
+STATISTIQUES_ROLLUP = {
+    'FENETRE_HEURES': 26,
+}
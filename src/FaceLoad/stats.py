@@ -0,0 +1,52 @@
+"""
+Statistiques partagées par le dashboard admin et les vues de planning.
+
+Chaque groupe de chiffres est obtenu en une seule requête par table, par
+agrégation conditionnelle (`aggregate(Count('id', filter=Q(...)))`), au
+lieu d'un `.count()` par chiffre.
+"""
+from django.db.models import Count, Q
+
+from planning.models import Planning
+from users.models import User
+
+
+def compter_plannings(plannings=None, user=None):
+    """
+    Args:
+        plannings: Plannings à compter (tous par défaut).
+        user: Si fourni, ajoute les chiffres de ses propres plannings (`mes_*`).
+
+    Returns:
+        Un dictionnaire : total, valides_professeur, valides_admin, annules
+        (validés par le professeur mais pas par l'administration), en_attente
+        (validés par personne) et, avec `user`, mes_total, mes_valides, mes_en_attente.
+    """
+    if plannings is None:
+        plannings = Planning.objects.all()
+    en_attente = Q(is_validated_by_professor=False, is_validated_by_admin=False)
+    agregats = {
+        'total': Count('id'),
+        'valides_professeur': Count('id', filter=Q(is_validated_by_professor=True)),
+        'valides_admin': Count('id', filter=Q(is_validated_by_admin=True)),
+        'annules': Count('id', filter=Q(is_validated_by_professor=True, is_validated_by_admin=False)),
+        'en_attente': Count('id', filter=en_attente),
+    }
+    if user is not None:
+        agregats.update({
+            'mes_total': Count('id', filter=Q(user=user)),
+            'mes_valides': Count('id', filter=Q(user=user, is_validated_by_professor=True)),
+            'mes_en_attente': Count('id', filter=Q(user=user) & en_attente),
+        })
+    return plannings.aggregate(**agregats)
+
+
+def compter_utilisateurs_actifs():
+    """
+    Returns:
+        Un dictionnaire : etudiants et professeurs actifs, en une requête.
+    """
+    return User.objects.aggregate(
+        etudiants=Count('id', filter=Q(id__in=User.get_students().filter(is_active=True).values('id'))),
+        professeurs=Count('id', filter=Q(id__in=User.get_professors().filter(is_active=True).values('id'))),
+    )
@@ -18,7 +18,7 @@ from django.contrib import admin
 from django.urls import path, include
 
 from .settings import DEBUG,MEDIA_URL,MEDIA_ROOT
-from .views import dashboard_api_view
+from .views import dashboard_api_view, dashboard_async_view
 
 from django.conf.urls.static import static
 
@@ -34,6 +34,7 @@ urlpatterns = [
     path("admin/", admin.site.urls),
     # Endpoint pour le dashboard
     path("api/v1/dashboard/", dashboard_api_view, name="api_dashboard"),
+    path("api/v1/dashboard/async/", dashboard_async_view, name="api_dashboard_async"),
 
     # Les Endpoints pour les API
     path("api/v1/", include("users.urls")),
@@ -46,6 +47,9 @@ urlpatterns = [
     path("api/v1/", include("role.urls")),
     path("api/v1/", include("planning.urls")),
     path("api/v1/", include("pointage.urls")),
+    path("api/v1/", include("taches.urls")),
+    path("api/v1/", include("medias.urls")),
+    path("api/v1/", include("statistiques.urls")),
 
 
     # Token
@@ -1,4 +1,5 @@
 from django.contrib import admin
-from .models import Absence
+from .models import Absence, AttendanceSummary
 # Register your models here.
 admin.site.register(Absence)
+admin.site.register(AttendanceSummary)
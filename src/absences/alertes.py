@@ -0,0 +1,234 @@
+"""
+Alertes de dépassement du nombre d'absences non justifiées par module.
+
+Les seuils sont évalués à partir des compteurs `AttendanceSummary`, et
+seulement pour les couples (étudiant, module) dont le nombre d'absences non
+justifiées vient d'augmenter : `compteurs.appliquer` appelle `evaluer` après
+chaque variation (génération des absences, refus, suppression d'un
+justificatif...). Le coût est proportionnel aux changements, pas au nombre
+d'étudiants × modules.
+
+Un seuil franchi crée une `AlerteAbsence` (une seule par seuil) et une
+`NotificationAlerte` par destinataire dans la même transaction. La boîte
+d'envoi est vidée par lots par la tâche `absences.envoyer_alertes`, planifiée
+avec un court délai pour regrouper les alertes d'une même génération, ou par
+la commande `alertes_absences`.
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from .models import AlerteAbsence, AttendanceSummary, NotificationAlerte
+
+logger = logging.getLogger(__name__)
+
+_config = getattr(settings, 'ALERTES_ABSENCES', {})
+
+TYPE_TACHE = 'absences.envoyer_alertes'
+
+
+def seuils():
+    return sorted(_config.get('SEUILS', [3]))
+
+
+def _non_justifiees():
+    # NON_JUSTIFIEE et REFUSEE : ni approuvées, ni en attente de validation
+    return F('absents') - F('justifiees') - F('en_attente')
+
+
+def evaluer(user_ids=None, module_id=None):
+    """
+    Lève les alertes des seuils atteints par les étudiants `user_ids` dans le module
+    `module_id`. Sans argument, évalue tous les compteurs (première mise en service,
+    changement des seuils).
+
+    Returns:
+        Le nombre d'alertes créées.
+    """
+    paliers = seuils()
+    if not paliers:
+        return 0
+    lignes = AttendanceSummary.objects.annotate(non_justifiees=_non_justifiees()).filter(non_justifiees__gte=paliers[0])
+    if user_ids is not None:
+        lignes = lignes.filter(module_id=module_id, user_id__in=list(user_ids))
+    atteints = {
+        (user_id, module_id): n
+        for user_id, module_id, n in lignes.values_list('user_id', 'module_id', 'non_justifiees')
+    }
+    if not atteints:
+        return 0
+
+    existantes = set(
+        AlerteAbsence.objects
+        .filter(user_id__in={u for u, _ in atteints}, module_id__in={m for _, m in atteints})
+        .values_list('user_id', 'module_id', 'seuil')
+    )
+    nouvelles = [
+        AlerteAbsence(user_id=user_id, module_id=module_id, seuil=seuil, non_justifiees=n)
+        for (user_id, module_id), n in atteints.items()
+        for seuil in paliers
+        if seuil <= n and (user_id, module_id, seuil) not in existantes
+    ]
+    if not nouvelles:
+        return 0
+
+    with transaction.atomic():
+        # Une alerte créée entre-temps par une autre transaction est ignorée, et ses
+        # notifications ne sont pas dupliquées (unicité alerte, destinataire)
+        AlerteAbsence.objects.bulk_create(nouvelles, ignore_conflicts=True)
+        alertes = AlerteAbsence.objects.filter(
+            user_id__in={a.user_id for a in nouvelles},
+            module_id__in={a.module_id for a in nouvelles},
+            notifications__isnull=True,
+        ).values_list('id', 'user__email', 'user_id', 'module_id', 'seuil')
+        cles = {(a.user_id, a.module_id, a.seuil) for a in nouvelles}
+        copies = _config.get('DESTINATAIRES_COPIE', [])
+        notifications = [
+            NotificationAlerte(alerte_id=alerte_id, destinataire=destinataire)
+            for alerte_id, email, user_id, module_id, seuil in alertes
+            if (user_id, module_id, seuil) in cles
+            for destinataire in [email, *copies]
+        ]
+        NotificationAlerte.objects.bulk_create(notifications, ignore_conflicts=True)
+        planifier_envoi()
+    logger.info(f"{len(nouvelles)} alerte(s) d'absences levée(s).")
+    return len(nouvelles)
+
+
+def planifier_envoi():
+    """
+    Planifie l'envoi de la boîte d'envoi, sauf si un envoi est déjà en attente :
+    les alertes levées d'ici là partiront dans le même lot.
+    """
+    from taches.execution import enfiler
+    from taches.models import Tache
+
+    if Tache.objects.filter(type=TYPE_TACHE, statut='EN_ATTENTE').exists():
+        return None
+    delai = timedelta(seconds=_config.get('DELAI_ENVOI', 60))
+    return enfiler(TYPE_TACHE, executer_apres=timezone.now() + delai)
+
+
+def _message(destinataire, alertes, connexion):
+    contexte = {
+        "date": timezone.localdate(),
+        "alertes": [
+            {
+                "etudiant": f"{a.user.first_name} {a.user.last_name}".strip() or a.user.email,
+                "module": a.module.name,
+                "seuil": a.seuil,
+                "non_justifiees": a.non_justifiees,
+            }
+            for a in alertes
+        ],
+    }
+    html = render_to_string('alertes_absences.html', contexte)
+    message = EmailMultiAlternatives(
+        subject="Alerte d'absences non justifiées",
+        body=strip_tags(html),
+        from_email=settings.EMAIL_HOST_USER,
+        to=[destinataire],
+        connection=connexion,
+    )
+    message.attach_alternative(html, 'text/html')
+    return message
+
+
+def reserver_lot(taille_lot, now=None):
+    """
+    Réserve les prochaines notifications à envoyer (`ENVOI_EN_COURS`), dans une
+    transaction courte : aucun verrou n'est tenu pendant l'envoi SMTP. Une réservation
+    plus ancienne que `DELAI_RESERVATION` (worker arrêté pendant l'envoi) est reprise :
+    le courriel peut alors partir deux fois, mais n'est jamais perdu.
+
+    Returns:
+        Les notifications réservées, avec leur alerte, leur étudiant et leur module.
+    """
+    now = now or timezone.now()
+    limite = now - timedelta(seconds=_config.get('DELAI_RESERVATION', 900))
+    with transaction.atomic():
+        ids = list(
+            NotificationAlerte.objects
+            .select_for_update(skip_locked=True)
+            .filter(Q(statut='EN_ATTENTE') | Q(statut='ENVOI_EN_COURS', reservee_le__lt=limite))
+            .order_by('id')
+            .values_list('id', flat=True)[:taille_lot]
+        )
+        NotificationAlerte.objects.filter(id__in=ids).update(statut='ENVOI_EN_COURS', reservee_le=now)
+    return list(
+        NotificationAlerte.objects
+        .select_related('alerte__user', 'alerte__module')
+        .filter(id__in=ids, reservee_le=now)
+        .order_by('id')
+    )
+
+
+def _enregistrer_resultats(lot, reussies, ratees):
+    """
+    Passe les notifications envoyées à `ENVOYEE` et remet les autres en attente (ou
+    `ECHOUEE` après `MAX_TENTATIVES`), si elles n'ont pas été reprises entre-temps.
+    """
+    max_tentatives = _config.get('MAX_TENTATIVES', 5)
+    reservees = NotificationAlerte.objects.filter(statut='ENVOI_EN_COURS', reservee_le=lot[0].reservee_le)
+    with transaction.atomic():
+        reservees.filter(id__in=reussies).update(
+            statut='ENVOYEE', envoyee_le=timezone.now(), tentatives=F('tentatives') + 1, erreur=''
+        )
+        for erreur, ids in ratees.items():
+            reservees.filter(id__in=ids).update(
+                statut=Case(When(tentatives__gte=max_tentatives - 1, then=Value('ECHOUEE')), default=Value('EN_ATTENTE')),
+                tentatives=F('tentatives') + 1,
+                erreur=erreur,
+            )
+
+
+def envoyer_notifications(taille_lot=None):
+    """
+    Envoie les notifications en attente par lots de `taille_lot`, un courriel par
+    destinataire et par lot, sur une seule connexion SMTP. Chaque lot est réservé,
+    envoyé hors transaction, puis son résultat enregistré.
+
+    Returns:
+        Un dictionnaire avec le nombre de notifications envoyées et en échec.
+    """
+    taille_lot = taille_lot or _config.get('TAILLE_LOT', 200)
+    envoyees = 0
+    echecs = 0
+    connexion = get_connection()
+    try:
+        while True:
+            lot = reserver_lot(taille_lot)
+            if not lot:
+                break
+
+            par_destinataire = defaultdict(list)
+            for notification in lot:
+                par_destinataire[notification.destinataire].append(notification)
+
+            reussies, ratees = [], defaultdict(list)
+            for destinataire, notifications in par_destinataire.items():
+                try:
+                    _message(destinataire, [n.alerte for n in notifications], connexion).send()
+                    reussies.extend(n.id for n in notifications)
+                except Exception as e:
+                    logger.error(f"Échec de l'envoi des alertes à {destinataire} : {e}")
+                    ratees[str(e)].extend(n.id for n in notifications)
+
+            _enregistrer_resultats(lot, reussies, ratees)
+            envoyees += len(reussies)
+            echecs += sum(len(ids) for ids in ratees.values())
+
+            if ratees or len(lot) < taille_lot:
+                # En cas d'échec, les notifications restantes attendent le prochain envoi
+                break
+    finally:
+        connexion.close()
+    return {"envoyees": envoyees, "echecs": echecs}
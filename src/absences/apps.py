@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class AbsenceConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "absences"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        # Invalidation de l'instantané du dashboard (signaux Planning, Absence)
+        from FaceLoad import dashboard  # noqa: F401
@@ -0,0 +1,198 @@
+"""
+Mise à jour incrémentale des compteurs `AttendanceSummary` (étudiant, module).
+
+Tous les chemins d'écriture passent par ici : signaux sur `Pointage` et
+`Absence` pour les écritures unitaires (admin, approuver, refuser,
+justifier), appels explicites pour les insertions groupées (génération des
+absences, tampon de pointages) qui n'envoient pas de signaux. Chaque
+variation est un seul UPDATE avec des expressions `F()`, les lignes
+manquantes sont créées à zéro juste avant par un `bulk_create`
+(`ignore_conflicts=True`). Quand le nombre d'absences non justifiées
+augmente, les seuils d'alerte des seuls couples modifiés sont réévalués
+(`absences.alertes`).
+"""
+from collections import defaultdict
+
+from django.db.models import Count, F, Q
+
+from pointage.models import Pointage, SessionPresence
+
+from . import alertes
+from .models import Absence, AttendanceSummary
+
+CHAMPS = ('presents', 'absents', 'justifiees', 'en_attente')
+
+# Colonne incrémentée en plus de `absents` selon le statut de l'absence
+COLONNE_STATUT = {
+    'APPROUVEE': 'justifiees',
+    'EN_ATTENTE': 'en_attente',
+}
+
+
+def deltas_statut(ancien, nouveau):
+    """Variations des compteurs quand une absence passe du statut `ancien` à `nouveau`."""
+    deltas = defaultdict(int)
+    if ancien in COLONNE_STATUT:
+        deltas[COLONNE_STATUT[ancien]] -= 1
+    if nouveau in COLONNE_STATUT:
+        deltas[COLONNE_STATUT[nouveau]] += 1
+    return {champ: delta for champ, delta in deltas.items() if delta}
+
+
+def appliquer(user_ids, module_id, **deltas):
+    """
+    Applique les mêmes variations aux compteurs de plusieurs étudiants d'un module,
+    en un seul UPDATE.
+    """
+    deltas = {champ: delta for champ, delta in deltas.items() if delta}
+    user_ids = list(user_ids)
+    if not deltas or not user_ids or module_id is None:
+        return
+    # Une décrémentation ne crée pas de ligne : pendant la suppression en cascade d'un
+    # étudiant, une ligne recréée ferait échouer la contrainte de clé étrangère
+    if any(delta > 0 for delta in deltas.values()):
+        AttendanceSummary.objects.bulk_create(
+            [AttendanceSummary(user_id=user_id, module_id=module_id) for user_id in user_ids],
+            ignore_conflicts=True
+        )
+    AttendanceSummary.objects.filter(module_id=module_id, user_id__in=user_ids).update(
+        **{champ: F(champ) + delta for champ, delta in deltas.items()}
+    )
+    if deltas.get('absents', 0) - deltas.get('justifiees', 0) - deltas.get('en_attente', 0) > 0:
+        alertes.evaluer(user_ids, module_id)
+
+
+def appliquer_lot(variations):
+    """
+    Args:
+        variations: Dictionnaire {(user_id, module_id): {champ: delta}}. Les couples
+            ayant les mêmes variations dans le même module partagent un UPDATE.
+    """
+    groupes = defaultdict(list)
+    for (user_id, module_id), deltas in variations.items():
+        cle = tuple(sorted((champ, delta) for champ, delta in deltas.items() if delta))
+        if cle and module_id is not None:
+            groupes[(module_id, cle)].append(user_id)
+    for (module_id, cle), user_ids in groupes.items():
+        appliquer(user_ids, module_id, **dict(cle))
+
+
+def pointages_crees(paires):
+    """
+    Compte les pointages (session_id, user_id) qui viennent d'être créés.
+    """
+    paires = list(paires)
+    if not paires:
+        return
+    modules = dict(
+        SessionPresence.objects
+        .filter(id__in={session_id for session_id, _ in paires})
+        .values_list('id', 'planning__horaire__module_id')
+    )
+    variations = defaultdict(lambda: defaultdict(int))
+    for session_id, user_id in paires:
+        variations[(user_id, modules.get(session_id))]['presents'] += 1
+    appliquer_lot(variations)
+
+
+def absences_creees(user_ids, module_id, statut='NON_JUSTIFIEE'):
+    """
+    Compte des absences créées pour un même module (génération d'un planning).
+    """
+    appliquer(user_ids, module_id, absents=1, **deltas_statut(None, statut))
+
+
+def statuts_modifies(changements):
+    """
+    Args:
+        changements: Liste de tuples (user_id, module_id, ancien_statut, nouveau_statut).
+    """
+    variations = defaultdict(lambda: defaultdict(int))
+    for user_id, module_id, ancien, nouveau in changements:
+        for champ, delta in deltas_statut(ancien, nouveau).items():
+            variations[(user_id, module_id)][champ] += delta
+    appliquer_lot(variations)
+
+
+def deplacer(pointages, absences, ancien_module_id, nouveau_module_id):
+    """
+    Déplace les compteurs de ces pointages et absences (querysets) d'un module à
+    un autre (planning changé d'horaire, horaire changé de module...). Un module
+    None n'a pas de compteurs : seul l'autre côté est modifié.
+    """
+    if ancien_module_id == nouveau_module_id:
+        return
+    variations = defaultdict(lambda: defaultdict(int))
+
+    def deplacer_deltas(user_id, **valeurs):
+        for champ, valeur in valeurs.items():
+            variations[(user_id, ancien_module_id)][champ] -= valeur
+            variations[(user_id, nouveau_module_id)][champ] += valeur
+
+    for user_id, n in pointages.values_list('user_id').annotate(n=Count('id')).order_by():
+        deplacer_deltas(user_id, presents=n)
+    lignes = (
+        absences.values_list('user_id')
+        .annotate(
+            absents=Count('id'),
+            justifiees=Count('id', filter=Q(statut='APPROUVEE')),
+            en_attente=Count('id', filter=Q(statut='EN_ATTENTE')),
+        )
+        .order_by()
+    )
+    for user_id, absents, justifiees, en_attente in lignes:
+        deplacer_deltas(user_id, absents=absents, justifiees=justifiees, en_attente=en_attente)
+    appliquer_lot(variations)
+
+
+def calculer_compteurs():
+    """
+    Recalcule tous les compteurs depuis `Pointage` et `Absence`, en deux requêtes agrégées.
+
+    Returns:
+        Un dictionnaire {(user_id, module_id): {champ: valeur}}.
+    """
+    compteurs = defaultdict(lambda: dict.fromkeys(CHAMPS, 0))
+    presences = (
+        Pointage.objects
+        .filter(session__planning__horaire__module__isnull=False)
+        .values_list('user_id', 'session__planning__horaire__module_id')
+        .annotate(n=Count('id'))
+        .order_by()
+    )
+    for user_id, module_id, n in presences:
+        compteurs[(user_id, module_id)]['presents'] = n
+
+    absences = (
+        Absence.objects
+        .filter(planning__horaire__module__isnull=False)
+        .values_list('user_id', 'planning__horaire__module_id')
+        .annotate(
+            absents=Count('id'),
+            justifiees=Count('id', filter=Q(statut='APPROUVEE')),
+            en_attente=Count('id', filter=Q(statut='EN_ATTENTE')),
+        )
+        .order_by()
+    )
+    for user_id, module_id, absents, justifiees, en_attente in absences:
+        compteurs[(user_id, module_id)].update(absents=absents, justifiees=justifiees, en_attente=en_attente)
+    return compteurs
+
+
+def comparer(attendus):
+    """
+    Returns:
+        La liste des écarts (user_id, module_id, valeurs en base, valeurs attendues).
+    """
+    en_base = {
+        (ligne['user_id'], ligne['module_id']): {champ: ligne[champ] for champ in CHAMPS}
+        for ligne in AttendanceSummary.objects.values('user_id', 'module_id', *CHAMPS)
+    }
+    zero = dict.fromkeys(CHAMPS, 0)
+    ecarts = []
+    for cle in set(en_base) | set(attendus):
+        actuel = en_base.get(cle, zero)
+        attendu = attendus.get(cle, zero)
+        if actuel != attendu:
+            ecarts.append((cle[0], cle[1], actuel, attendu))
+    return ecarts
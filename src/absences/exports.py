@@ -0,0 +1,26 @@
+"""
+Export des absences (voir `FaceLoad.exports`).
+"""
+from FaceLoad.exports import TAILLE_LOT
+
+from .models import Absence
+from .utils import filtrer_absences
+
+ENTETES = [
+    'id', 'etudiant_id', 'nom', 'prenom', 'email', 'date', 'module', 'classe',
+    'statut', 'justificatif', 'cree_le', 'modifie_le',
+]
+
+
+def lignes_absences(filtre):
+    """Une ligne par absence, dans l'ordre de création, lue par lots de `TAILLE_LOT`."""
+    return (
+        filtrer_absences(Absence.objects.all(), filtre)
+        .order_by('cree_le', 'id')
+        .values_list(
+            'id', 'user_id', 'user__last_name', 'user__first_name', 'user__email',
+            'planning__date', 'planning__horaire__module__name', 'planning__horaire__module__classe__name',
+            'statut', 'justificatif_texte', 'cree_le', 'modifie_le',
+        )
+        .iterator(chunk_size=TAILLE_LOT)
+    )
@@ -0,0 +1,94 @@
+"""
+Alimentation de la table de faits `FaitAbsence`.
+
+Une absence y a une ligne par filière de son module (ou une seule ligne sans
+filière), de poids 1/n : les graphiques par filière, module ou classe sont de
+simples `GROUP BY` avec `Sum('poids')` sur une table étroite et indexée, sans
+traverser Planning → Horaire → Module → filieres, et sans compter plusieurs
+fois une absence dont le module appartient à plusieurs filières.
+
+Tenue à jour par les signaux (absences créées ou modifiées une par une,
+filières d'un module, classe d'un module, horaire ou date d'un planning,
+module d'un horaire) et par des appels explicites dans les écritures
+groupées. `reconstruire_faits_absences` recalcule toute la table (après des
+`QuerySet.update()` qui n'envoient pas de signaux, par exemple).
+"""
+from collections import defaultdict
+
+from django.db import transaction
+
+from module.models import Module
+
+from .models import Absence, FaitAbsence
+
+TAILLE_LOT = 5000
+
+
+def _faits(absences):
+    """`FaitAbsence` (non enregistrés) des absences données, en deux requêtes."""
+    lignes = list(absences.values_list(
+        'id', 'planning__date', 'cree_le', 'statut',
+        'planning__horaire__module_id', 'planning__horaire__module__classe_id',
+    ))
+    filieres = defaultdict(list)
+    liens = Module.filieres.through.objects.filter(module_id__in={ligne[4] for ligne in lignes if ligne[4]})
+    for module_id, filiere_id in liens.values_list('module_id', 'filiere_id'):
+        filieres[module_id].append(filiere_id)
+
+    faits = []
+    for absence_id, jour, cree_le, statut, module_id, classe_id in lignes:
+        ventilation = filieres.get(module_id) or [None]
+        for filiere_id in ventilation:
+            faits.append(FaitAbsence(
+                absence_id=absence_id, date=jour, cree_le=cree_le, statut=statut,
+                classe_id=classe_id, module_id=module_id, filiere_id=filiere_id,
+                poids=1 / len(ventilation),
+            ))
+    return faits
+
+
+def creer(absences):
+    """Ajoute les faits d'absences qui viennent d'être créées (queryset)."""
+    FaitAbsence.objects.bulk_create(_faits(absences), batch_size=TAILLE_LOT, ignore_conflicts=True)
+
+
+def statuts_modifies(absence_ids, statut):
+    FaitAbsence.objects.filter(absence_id__in=absence_ids).update(statut=statut)
+
+
+def reconstruire_absences(absences):
+    """Recalcule les faits des absences données (queryset)."""
+    with transaction.atomic():
+        FaitAbsence.objects.filter(absence__in=absences).delete()
+        _creer_par_lots(absences)
+
+
+def reconstruire_modules(module_ids):
+    """Recalcule les faits des absences de ces modules (filières modifiées)."""
+    reconstruire_absences(Absence.objects.filter(planning__horaire__module_id__in=module_ids))
+
+
+def reconstruire_plannings(planning_ids):
+    """Recalcule les faits des absences de ces plannings (horaire, date ou module déplacés)."""
+    reconstruire_absences(Absence.objects.filter(planning_id__in=planning_ids))
+
+
+def _creer_par_lots(absences):
+    dernier = 0
+    while True:
+        ids = list(absences.filter(id__gt=dernier).order_by('id').values_list('id', flat=True)[:TAILLE_LOT])
+        if not ids:
+            return
+        creer(Absence.objects.filter(id__in=ids))
+        dernier = ids[-1]
+
+
+def reconstruire():
+    """
+    Returns:
+        Le nombre de faits après reconstruction complète de la table.
+    """
+    with transaction.atomic():
+        FaitAbsence.objects.all().delete()
+        _creer_par_lots(Absence.objects.all())
+    return FaitAbsence.objects.count()
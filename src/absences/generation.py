@@ -0,0 +1,131 @@
+"""
+Génération des absences en fin de journée pour les cours non traités.
+
+Les absences ne sont normalement générées qu'au `valider_cours` du
+professeur ou par `GenererAbsencesView`. Ce module rattrape les cours
+oubliés : il cherche les plannings terminés d'une période qui ont eu au
+moins une session de présence et aucune absence, les regroupe par classe
+et les traite dans un pool de threads (une connexion par thread).
+`generer_absences_pour_planning` verrouille le planning et ne génère rien
+si des absences existent déjà : relancer la génération est sans danger.
+"""
+import logging
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.db import close_old_connections
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from planning.models import Planning
+from pointage.models import SessionPresence
+
+from .models import Absence
+from .utils import generer_absences_pour_planning
+
+logger = logging.getLogger(__name__)
+
+
+def plannings_a_traiter(date_debut, date_fin, now=None, avec_sessions_seulement=True):
+    """
+    Plannings de la période dont le cours est terminé et qui n'ont encore aucune absence.
+
+    Returns:
+        Un dictionnaire {classe_id: [planning_id, ...]}.
+    """
+    now = timezone.localtime(now or timezone.now())
+    plannings = (
+        Planning.objects
+        .filter(date__range=(date_debut, date_fin), horaire__module__classe__isnull=False)
+        # Cours passés, ou cours du jour déjà terminés
+        .filter(Q(date__lt=now.date()) | Q(date=now.date(), horaire__time_end_course__lte=now.time()))
+        .filter(~Exists(Absence.objects.filter(planning=OuterRef('pk'))))
+    )
+    if avec_sessions_seulement:
+        # Sans aucune session, le cours n'a sans doute pas eu lieu
+        plannings = plannings.filter(Exists(SessionPresence.objects.filter(planning=OuterRef('pk'))))
+
+    par_classe = defaultdict(list)
+    for planning_id, classe_id in plannings.order_by('date', 'id').values_list('id', 'horaire__module__classe_id'):
+        par_classe[classe_id].append(planning_id)
+    return par_classe
+
+
+def _traiter_classe(planning_ids):
+    """
+    Génère les absences des plannings d'une classe, dans le thread du pool.
+
+    Returns:
+        Un tuple (absences créées, erreurs).
+    """
+    close_old_connections()
+    try:
+        absences_creees = 0
+        erreurs = 0
+        plannings = Planning.objects.select_related('horaire__module').filter(id__in=planning_ids).order_by('date', 'id')
+        for planning in plannings:
+            # Un planning en erreur n'empêche pas de traiter les suivants
+            try:
+                resultat = generer_absences_pour_planning(planning)
+            except Exception as e:
+                logger.error(f"Erreur lors de la génération des absences du planning #{planning.id} : {e}")
+                erreurs += 1
+                continue
+            absences_creees += resultat.get('absences_creees', 0)
+        return absences_creees, erreurs
+    finally:
+        # Chaque thread a sa propre connexion : on la ferme avant de rendre la main
+        close_old_connections()
+
+
+def generer_absences_periode(date_debut, date_fin, workers=4, progression=None, avec_sessions_seulement=True):
+    """
+    Génère les absences de tous les cours non traités entre `date_debut` et `date_fin`.
+
+    Args:
+        workers: Nombre de threads, chacun avec sa propre connexion.
+        progression: Fonction optionnelle appelée avec (plannings traités, total)
+            après chaque classe.
+
+    Returns:
+        Un dictionnaire avec le nombre de plannings, d'absences créées, d'erreurs et la durée.
+    """
+    debut = time.perf_counter()
+    par_classe = plannings_a_traiter(date_debut, date_fin, avec_sessions_seulement=avec_sessions_seulement)
+    total = sum(len(ids) for ids in par_classe.values())
+
+    traites = 0
+    absences_creees = 0
+    erreurs = 0
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='absences') as executor:
+        futures = {executor.submit(_traiter_classe, ids): classe_id for classe_id, ids in par_classe.items()}
+        for future in as_completed(futures):
+            nb_absences, nb_erreurs = future.result()
+            traites += len(par_classe[futures[future]])
+            absences_creees += nb_absences
+            erreurs += nb_erreurs
+            if progression:
+                progression(traites, total)
+
+    duree = time.perf_counter() - debut
+    logger.info(
+        f"Génération des absences du {date_debut} au {date_fin} : "
+        f"{total} planning(s), {absences_creees} absence(s) créée(s) en {duree:.1f} s."
+    )
+    return {
+        "plannings": total,
+        "classes": len(par_classe),
+        "absences_creees": absences_creees,
+        "erreurs": erreurs,
+        "duree": duree,
+    }
+
+
+def generer_absences_du_jour(jour=None, workers=4):
+    """
+    Tâche planifiable (cron, file de tâches) : rattrape les cours du jour non traités.
+    """
+    jour = jour or timezone.localdate()
+    return generer_absences_periode(jour, jour, workers=workers)
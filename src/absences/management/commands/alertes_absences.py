@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from absences.alertes import envoyer_notifications, evaluer
+
+
+class Command(BaseCommand):
+    help = (
+        "Envoie les notifications d'alertes d'absences en attente. Avec --evaluer, évalue d'abord "
+        "les seuils sur tous les compteurs (mise en service, changement des seuils)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--evaluer', action='store_true', help="Évalue les seuils sur tous les compteurs.")
+        parser.add_argument('--taille-lot', type=int, default=None)
+
+    def handle(self, *args, **options):
+        if options['evaluer']:
+            self.stdout.write(f"{evaluer()} alerte(s) levée(s).")
+        resultat = envoyer_notifications(options['taille_lot'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultat['envoyees']} notification(s) envoyée(s), {resultat['echecs']} en échec."
+        ))
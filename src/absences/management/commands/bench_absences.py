@@ -0,0 +1,148 @@
+import random
+import time
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from absences.models import Absence
+from absences.serializers import AdminAbsenceSerializer
+from planning.models import Planning
+from pointage.bench import CompteurRequetes, JeuDeDonnees, percentile, supprimer_par_lots
+from users.models import User
+
+STATUTS = ['NON_JUSTIFIEE'] * 6 + ['EN_ATTENTE'] * 2 + ['APPROUVEE', 'REFUSEE']
+
+
+class Command(BaseCommand):
+    help = (
+        "Mesure la liste des absences des administrateurs sur un gros volume : "
+        "crée N absences de test, compare l'ancienne sérialisation (UserSerializer imbriqué, sans pagination) "
+        "à la liste paginée par curseur et filtrée, puis supprime les données."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--absences', type=int, default=1_000_000)
+        parser.add_argument('--etudiants', type=int, default=1000)
+        parser.add_argument('--repetitions', type=int, default=20)
+        parser.add_argument('--pages', type=int, default=20, help="Pages successives parcourues avec le curseur.")
+        parser.add_argument('--historique', type=int, default=2000,
+                            help="Absences sérialisées par l'ancien chemin (le tout serait trop long).")
+
+    def handle(self, *args, **options):
+        donnees = JeuDeDonnees(options['etudiants'], avec_session=False).creer()
+        admin = User.objects.create(email=f"{donnees.prefixe}-admin@example.com", is_staff=True)
+        try:
+            self._creer_absences(donnees, options['absences'])
+            client = APIClient(SERVER_NAME='localhost')
+            client.force_authenticate(admin)
+            self._mesurer_historique(options['historique'])
+            self._mesurer_liste(client, donnees, options)
+        finally:
+            self.stdout.write("Suppression des données de test...")
+            plannings = Planning.objects.filter(horaire=donnees.horaire)
+            # Par lots : les signaux post_delete tiennent compteurs et faits à jour
+            supprimer_par_lots(Absence.objects.filter(planning__in=plannings))
+            plannings.exclude(id=donnees.planning.id).delete()
+            donnees.supprimer()
+
+    def _creer_absences(self, donnees, total):
+        etudiants = [etudiant.id for etudiant in donnees.etudiants]
+        nb_plannings = -(-total // len(etudiants))
+        aujourd_hui = timezone.localdate()
+        plannings = Planning.objects.bulk_create(
+            [
+                Planning(user=donnees.professeur, horaire=donnees.horaire, date=aujourd_hui - timedelta(days=i // 4))
+                for i in range(nb_plannings)
+            ],
+            batch_size=5000
+        )
+
+        debut = time.perf_counter()
+        lot = []
+        crees = 0
+        for planning in plannings:
+            for user_id in etudiants:
+                if crees + len(lot) >= total:
+                    break
+                lot.append(Absence(user_id=user_id, planning_id=planning.id, statut=random.choice(STATUTS)))
+                if len(lot) == 10000:
+                    Absence.objects.bulk_create(lot)
+                    crees += len(lot)
+                    lot = []
+                    self.stdout.write(f"  {crees}/{total} absences créées", ending='\r')
+        Absence.objects.bulk_create(lot)
+        crees += len(lot)
+        self.stdout.write(f"{crees} absences créées en {time.perf_counter() - debut:.1f} s sur {nb_plannings} cours.")
+
+    def _mesurer_historique(self, nombre):
+        compteur = CompteurRequetes()
+        debut = time.perf_counter()
+        with connection.execute_wrapper(compteur):
+            absences = Absence.objects.all()[:nombre]
+            try:
+                AdminAbsenceSerializer(absences, many=True).data
+            except Exception as e:
+                self.stdout.write(f"ancien chemin en erreur : {e}")
+                return
+        duree = time.perf_counter() - debut
+        self.stdout.write(
+            f"{'ancien chemin':<28} {nombre} absences en {duree * 1000:.0f} ms, {compteur.total} requêtes "
+            f"({duree / nombre * 1e6:.0f} µs par absence, soit ~{duree / nombre * Absence.objects.count():.0f} s "
+            f"pour toute la table sans pagination)"
+        )
+
+    def _mesurer_liste(self, client, donnees, options):
+        aujourd_hui = timezone.localdate()
+        scenarios = {
+            'première page': {},
+            'statut EN_ATTENTE': {'statut': 'EN_ATTENTE'},
+            'classe + 30 jours': {
+                'classe': donnees.classe.id,
+                'date_debut': aujourd_hui - timedelta(days=30),
+                'date_fin': aujourd_hui,
+            },
+            'module + statut': {'module': donnees.module.id, 'statut': 'APPROUVEE'},
+        }
+        for nom, params in scenarios.items():
+            url = f"/api/v1/absences/manage-absences/?{urlencode(params)}"
+            self._afficher(nom, *self._mesurer(client, [url] * options['repetitions']))
+
+        # Parcours de pages successives : le coût d'une page ne dépend pas de sa profondeur
+        urls = [f"/api/v1/absences/manage-absences/?{urlencode({'statut': 'NON_JUSTIFIEE'})}"]
+        latences, requetes = [], []
+        for _ in range(options['pages']):
+            compteur = CompteurRequetes()
+            debut = time.perf_counter()
+            with connection.execute_wrapper(compteur):
+                reponse = client.get(urls[-1])
+            latences.append(time.perf_counter() - debut)
+            requetes.append(compteur.total)
+            suivante = reponse.json().get('next')
+            if not suivante:
+                break
+            urls.append(suivante)
+        self._afficher(f"{len(latences)} pages successives", latences, requetes)
+
+    def _mesurer(self, client, urls):
+        latences, requetes = [], []
+        for url in urls:
+            compteur = CompteurRequetes()
+            debut = time.perf_counter()
+            with connection.execute_wrapper(compteur):
+                reponse = client.get(url)
+            latences.append(time.perf_counter() - debut)
+            requetes.append(compteur.total)
+            if reponse.status_code != 200:
+                self.stdout.write(f"  {url} : HTTP {reponse.status_code}")
+        return latences, requetes
+
+    def _afficher(self, nom, latences, requetes):
+        self.stdout.write(
+            f"{nom:<28} p50={percentile(latences, 50) * 1000:>7.1f} ms  "
+            f"p95={percentile(latences, 95) * 1000:>7.1f} ms  "
+            f"requêtes/page={max(requetes) if requetes else 0}"
+        )
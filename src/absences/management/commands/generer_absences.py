@@ -0,0 +1,53 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from absences.generation import generer_absences_periode
+
+
+class Command(BaseCommand):
+    help = (
+        "Génère les absences des cours terminés d'une période qui n'en ont pas encore "
+        "(professeur n'ayant pas validé le cours). Peut être relancée sans risque."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--debut', type=date.fromisoformat, default=None,
+                            help="Date de début (AAAA-MM-JJ). Par défaut : aujourd'hui.")
+        parser.add_argument('--fin', type=date.fromisoformat, default=None,
+                            help="Date de fin (AAAA-MM-JJ). Par défaut : aujourd'hui.")
+        parser.add_argument('--jours', type=int, default=None,
+                            help="Traite les N derniers jours (remplace --debut).")
+        parser.add_argument('--workers', type=int, default=4,
+                            help="Threads de génération, chacun avec sa propre connexion.")
+        parser.add_argument('--inclure-sans-session', action='store_true',
+                            help="Traite aussi les cours sans aucune session de présence (toute la classe absente).")
+
+    def handle(self, *args, **options):
+        aujourd_hui = timezone.localdate()
+        fin = options['fin'] or aujourd_hui
+        debut = options['debut'] or aujourd_hui
+        if options['jours'] is not None:
+            debut = fin - timedelta(days=options['jours'])
+        if debut > fin:
+            raise CommandError("La date de début doit précéder la date de fin.")
+
+        def progression(traites, total):
+            self.stdout.write(f"  {traites}/{total} planning(s) traité(s)")
+
+        self.stdout.write(f"Génération des absences du {debut} au {fin}...")
+        resultat = generer_absences_periode(
+            debut, fin,
+            workers=options['workers'],
+            progression=progression,
+            avec_sessions_seulement=not options['inclure_sans_session'],
+        )
+
+        duree = resultat['duree']
+        debit = resultat['plannings'] / duree if duree else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultat['plannings']} planning(s) sur {resultat['classes']} classe(s), "
+            f"{resultat['absences_creees']} absence(s) créée(s), {resultat['erreurs']} erreur(s) "
+            f"en {duree:.1f} s ({debit:.1f} plannings/s)."
+        ))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from absences.compteurs import CHAMPS, calculer_compteurs, comparer
+from absences.models import AttendanceSummary
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcule les compteurs de présence (AttendanceSummary) depuis les pointages et les absences. "
+        "Avec --verifier, liste seulement les écarts sans rien modifier."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verifier', action='store_true',
+                            help="Compare les compteurs en base au recalcul sans les modifier.")
+        parser.add_argument('--details', type=int, default=20, help="Nombre d'écarts à afficher.")
+
+    def handle(self, *args, **options):
+        attendus = calculer_compteurs()
+
+        if options['verifier']:
+            ecarts = comparer(attendus)
+            for user_id, module_id, actuel, attendu in ecarts[:options['details']]:
+                self.stdout.write(f"  étudiant #{user_id}, module #{module_id} : {actuel} au lieu de {attendu}")
+            if ecarts:
+                self.stdout.write(self.style.ERROR(f"{len(ecarts)} compteur(s) incohérent(s)."))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{len(attendus)} compteur(s) cohérent(s)."))
+            return
+
+        with transaction.atomic():
+            # Verrou : aucune mise à jour incrémentale ne doit se glisser entre la suppression et l'insertion
+            list(AttendanceSummary.objects.select_for_update().values_list('id', flat=True))
+            AttendanceSummary.objects.all().delete()
+            AttendanceSummary.objects.bulk_create(
+                [
+                    AttendanceSummary(user_id=user_id, module_id=module_id, **valeurs)
+                    for (user_id, module_id), valeurs in attendus.items()
+                    if any(valeurs[champ] for champ in CHAMPS)
+                ],
+                batch_size=5000
+            )
+        self.stdout.write(self.style.SUCCESS(f"{len(attendus)} compteur(s) recalculé(s)."))
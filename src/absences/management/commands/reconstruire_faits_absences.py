@@ -0,0 +1,14 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from absences.faits import reconstruire
+
+
+class Command(BaseCommand):
+    help = "Recalcule toute la table de faits des absences (graphiques par filière, module et classe)."
+
+    def handle(self, *args, **options):
+        debut = time.perf_counter()
+        total = reconstruire()
+        self.stdout.write(self.style.SUCCESS(f"{total} fait(s) d'absence écrit(s) en {time.perf_counter() - debut:.1f} s."))
@@ -0,0 +1,69 @@
+# Generated by Django 4.2.16 on 2026-10-18 14:22
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from collections import defaultdict
+
+
+def initialiser_compteurs(apps, schema_editor):
+    """Même calcul que `absences.compteurs.calculer_compteurs`, sur les modèles historiques."""
+    Pointage = apps.get_model('pointage', 'Pointage')
+    Absence = apps.get_model('absences', 'Absence')
+    AttendanceSummary = apps.get_model('absences', 'AttendanceSummary')
+
+    compteurs = defaultdict(dict)
+    presences = (
+        Pointage.objects.filter(session__planning__horaire__module__isnull=False)
+        .values_list('user_id', 'session__planning__horaire__module_id')
+        .annotate(n=models.Count('id')).order_by()
+    )
+    for user_id, module_id, n in presences:
+        compteurs[(user_id, module_id)]['presents'] = n
+
+    absences = (
+        Absence.objects.filter(planning__horaire__module__isnull=False)
+        .values_list('user_id', 'planning__horaire__module_id')
+        .annotate(
+            absents=models.Count('id'),
+            justifiees=models.Count('id', filter=models.Q(statut='APPROUVEE')),
+            en_attente=models.Count('id', filter=models.Q(statut='EN_ATTENTE')),
+        ).order_by()
+    )
+    for user_id, module_id, absents, justifiees, en_attente in absences:
+        compteurs[(user_id, module_id)].update(absents=absents, justifiees=justifiees, en_attente=en_attente)
+
+    AttendanceSummary.objects.bulk_create(
+        [AttendanceSummary(user_id=user_id, module_id=module_id, **valeurs) for (user_id, module_id), valeurs in compteurs.items()],
+        batch_size=5000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('module', '0001_initial'),
+        ('absences', '0003_initial'),
+        ('pointage', '0004_pointage_timestamp_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('presents', models.IntegerField(default=0, help_text='Sessions de présence pointées.')),
+                ('absents', models.IntegerField(default=0, help_text='Absences, quel que soit leur statut.')),
+                ('justifiees', models.IntegerField(default=0, help_text='Absences approuvées.')),
+                ('en_attente', models.IntegerField(default=0, help_text='Absences dont le justificatif attend une validation.')),
+                ('modifie_le', models.DateTimeField(auto_now=True)),
+                ('module', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='compteurs_presence', to='module.module')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='compteurs_presence', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'module')},
+            },
+        ),
+        migrations.RunPython(initialiser_compteurs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.16 on 2026-10-18 14:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('absences', '0004_attendancesummary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='absence',
+            index=models.Index(fields=['-cree_le', '-id'], name='absence_cree_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='absence',
+            index=models.Index(fields=['statut', '-cree_le', '-id'], name='absence_statut_cree_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='absence',
+            index=models.Index(fields=['planning', 'user'], name='absence_planning_user_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.16 on 2026-10-18 14:29
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('absences', '0005_absence_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeleversementJustificatif',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('nom_fichier', models.CharField(max_length=255)),
+                ('taille', models.BigIntegerField(help_text='Taille totale annoncée, en octets.')),
+                ('sha256', models.CharField(help_text='Empreinte SHA-256 annoncée du fichier complet.', max_length=64)),
+                ('offset', models.BigIntegerField(default=0)),
+                ('statut', models.CharField(choices=[('EN_COURS', 'En cours'), ('TERMINE', 'Terminé')], default='EN_COURS', max_length=20)),
+                ('chemin', models.CharField(blank=True, default='', help_text='Document final, relatif à MEDIA_ROOT.', max_length=255)),
+                ('cree_le', models.DateTimeField(auto_now_add=True)),
+                ('modifie_le', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='televersements_justificatifs', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.16 on 2026-10-18 14:33
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('module', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('absences', '0006_televersementjustificatif'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlerteAbsence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seuil', models.PositiveIntegerField()),
+                ('non_justifiees', models.PositiveIntegerField(help_text="Absences non justifiées au moment de l'alerte.")),
+                ('cree_le', models.DateTimeField(auto_now_add=True)),
+                ('module', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alertes_absences', to='module.module')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alertes_absences', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-cree_le'],
+                'unique_together': {('user', 'module', 'seuil')},
+            },
+        ),
+        migrations.CreateModel(
+            name='NotificationAlerte',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('destinataire', models.EmailField(max_length=254)),
+                ('statut', models.CharField(choices=[('EN_ATTENTE', 'En attente'), ('ENVOYEE', 'Envoyée'), ('ECHOUEE', 'Échouée')], default='EN_ATTENTE', max_length=20)),
+                ('tentatives', models.PositiveIntegerField(default=0)),
+                ('erreur', models.TextField(blank=True, default='')),
+                ('cree_le', models.DateTimeField(auto_now_add=True)),
+                ('envoyee_le', models.DateTimeField(blank=True, null=True)),
+                ('alerte', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='absences.alerteabsence')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['statut', 'id'], name='notif_alerte_statut_idx')],
+                'unique_together': {('alerte', 'destinataire')},
+            },
+        ),
+    ]
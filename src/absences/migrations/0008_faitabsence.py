@@ -0,0 +1,66 @@
+# Generated by Django 4.2.16 on 2026-10-18 14:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+from collections import defaultdict
+
+
+def initialiser_faits(apps, schema_editor):
+    """Même calcul que `absences.faits.reconstruire`, sur les modèles historiques."""
+    Absence = apps.get_model('absences', 'Absence')
+    FaitAbsence = apps.get_model('absences', 'FaitAbsence')
+    Module = apps.get_model('module', 'Module')
+
+    filieres = defaultdict(list)
+    for module_id, filiere_id in Module.filieres.through.objects.values_list('module_id', 'filiere_id'):
+        filieres[module_id].append(filiere_id)
+
+    lot = []
+    lignes = Absence.objects.values_list(
+        'id', 'planning__date', 'cree_le', 'statut',
+        'planning__horaire__module_id', 'planning__horaire__module__classe_id',
+    ).iterator(chunk_size=5000)
+    for absence_id, jour, cree_le, statut, module_id, classe_id in lignes:
+        ventilation = filieres.get(module_id) or [None]
+        for filiere_id in ventilation:
+            lot.append(FaitAbsence(
+                absence_id=absence_id, date=jour, cree_le=cree_le, statut=statut,
+                classe_id=classe_id, module_id=module_id, filiere_id=filiere_id,
+                poids=1 / len(ventilation),
+            ))
+        if len(lot) >= 5000:
+            FaitAbsence.objects.bulk_create(lot)
+            lot = []
+    FaitAbsence.objects.bulk_create(lot)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('filiere', '0001_initial'),
+        ('module', '0001_initial'),
+        ('classe', '0001_initial'),
+        ('absences', '0007_alertes_absences'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FaitAbsence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='Date du cours.')),
+                ('cree_le', models.DateTimeField(help_text="Création de l'absence.")),
+                ('statut', models.CharField(choices=[('NON_JUSTIFIEE', 'Non justifiée'), ('EN_ATTENTE', 'En attente de validation'), ('APPROUVEE', 'Approuvée'), ('REFUSEE', 'Refusée')], max_length=20)),
+                ('poids', models.FloatField(default=1)),
+                ('absence', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='faits', to='absences.absence')),
+                ('classe', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='classe.classe')),
+                ('filiere', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='filiere.filiere')),
+                ('module', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='module.module')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['statut', 'filiere'], name='fait_absence_filiere_idx'), models.Index(fields=['statut', 'module'], name='fait_absence_module_idx'), models.Index(fields=['statut', 'classe'], name='fait_absence_classe_idx'), models.Index(fields=['statut', 'cree_le'], name='fait_absence_cree_idx')],
+                'unique_together': {('absence', 'filiere')},
+            },
+        ),
+        migrations.RunPython(initialiser_faits, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('absences', '0008_faitabsence'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationalerte',
+            name='reservee_le',
+            field=models.DateTimeField(blank=True, help_text="Réservation par l'envoi en cours.", null=True),
+        ),
+        migrations.AlterField(
+            model_name='notificationalerte',
+            name='statut',
+            field=models.CharField(choices=[('EN_ATTENTE', 'En attente'), ('ENVOI_EN_COURS', 'Envoi en cours'), ('ENVOYEE', 'Envoyée'), ('ECHOUEE', 'Échouée')], default='EN_ATTENTE', max_length=20),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:15
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('absences', '0009_notificationalerte_reservation'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='absence',
+            name='user',
+            field=models.ForeignKey(limit_choices_to={'role__name': 'STUDENT'}, on_delete=django.db.models.deletion.CASCADE, related_name='absences', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -1,6 +1,11 @@
+import uuid
+
 from django.db import models
 from users.models import User
 from planning.models import Planning
+from module.models import Module
+from classe.models import Classe
+from filiere.models import Filiere
 
 class Absence(models.Model):
     """
@@ -19,7 +24,7 @@ class Absence(models.Model):
         User,
         on_delete=models.CASCADE,
         related_name='absences',
-        limit_choices_to={'roles__name': 'STUDENT'} # S'assure que seul un étudiant peut avoir une absence
+        limit_choices_to={'role__name': 'STUDENT'} # S'assure que seul un étudiant peut avoir une absence
     )
     planning = models.ForeignKey(
         Planning,
@@ -49,6 +54,139 @@ class Absence(models.Model):
         # Un étudiant ne peut pas être absent deux fois pour le même cours
         unique_together = ('user', 'planning')
         ordering = ['-cree_le']
+        indexes = [
+            # Liste des administrateurs : tri (cree_le, id) de la pagination par curseur, filtrée ou non par statut
+            models.Index(fields=['-cree_le', '-id'], name='absence_cree_id_idx'),
+            models.Index(fields=['statut', '-cree_le', '-id'], name='absence_statut_cree_idx'),
+            # Recherches par cours (génération, filtres classe/module/date via le planning)
+            models.Index(fields=['planning', 'user'], name='absence_planning_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"Absence de {self.user.email} pour le cours du {self.planning.date}"
+
+
+class AttendanceSummary(models.Model):
+    """
+    Compteurs de présence d'un étudiant pour un module, tenus à jour à chaque
+    pointage et à chaque création ou changement de statut d'une absence
+    (voir `absences.compteurs`). Recalculables avec `recalculer_compteurs`.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='compteurs_presence')
+    module = models.ForeignKey(Module, on_delete=models.CASCADE, related_name='compteurs_presence')
+    presents = models.IntegerField(default=0, help_text="Sessions de présence pointées.")
+    absents = models.IntegerField(default=0, help_text="Absences, quel que soit leur statut.")
+    justifiees = models.IntegerField(default=0, help_text="Absences approuvées.")
+    en_attente = models.IntegerField(default=0, help_text="Absences dont le justificatif attend une validation.")
+    modifie_le = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'module')
+
+    def __str__(self):
+        return f"{self.user} - {self.module} : {self.presents} présence(s), {self.absents} absence(s)"
+
+
+class AlerteAbsence(models.Model):
+    """
+    Dépassement d'un seuil d'absences non justifiées par un étudiant dans un
+    module (voir `absences.alertes`). Levée une seule fois par seuil.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='alertes_absences')
+    module = models.ForeignKey(Module, on_delete=models.CASCADE, related_name='alertes_absences')
+    seuil = models.PositiveIntegerField()
+    non_justifiees = models.PositiveIntegerField(help_text="Absences non justifiées au moment de l'alerte.")
+    cree_le = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('user', 'module', 'seuil')
+        ordering = ['-cree_le']
+
+    def __str__(self):
+        return f"{self.user} - {self.module} : seuil de {self.seuil} absence(s) atteint"
+
+
+class NotificationAlerte(models.Model):
+    """
+    Boîte d'envoi des alertes : une ligne par alerte et par destinataire,
+    envoyées par lots (un courriel par destinataire et par lot).
+    """
+    STATUT_CHOICES = [
+        ('EN_ATTENTE', 'En attente'),
+        ('ENVOI_EN_COURS', 'Envoi en cours'),
+        ('ENVOYEE', 'Envoyée'),
+        ('ECHOUEE', 'Échouée'),
+    ]
+
+    alerte = models.ForeignKey(AlerteAbsence, on_delete=models.CASCADE, related_name='notifications')
+    destinataire = models.EmailField()
+    statut = models.CharField(max_length=20, choices=STATUT_CHOICES, default='EN_ATTENTE')
+    tentatives = models.PositiveIntegerField(default=0)
+    erreur = models.TextField(blank=True, default='')
+    cree_le = models.DateTimeField(auto_now_add=True)
+    reservee_le = models.DateTimeField(null=True, blank=True, help_text="Réservation par l'envoi en cours.")
+    envoyee_le = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('alerte', 'destinataire')
+        indexes = [
+            models.Index(fields=['statut', 'id'], name='notif_alerte_statut_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.alerte} -> {self.destinataire} ({self.statut})"
+
+
+class FaitAbsence(models.Model):
+    """
+    Table de faits des absences pour les graphiques (voir `absences.faits`) :
+    classe, module et filière dénormalisés, une ligne par (absence, filière).
+    Une absence d'un module rattaché à n filières a n lignes de poids 1/n : la
+    somme des poids compte chaque absence une seule fois, quel que soit le
+    regroupement.
+    """
+    absence = models.ForeignKey(Absence, on_delete=models.CASCADE, related_name='faits')
+    date = models.DateField(help_text="Date du cours.")
+    cree_le = models.DateTimeField(help_text="Création de l'absence.")
+    statut = models.CharField(max_length=20, choices=Absence.STATUT_CHOICES)
+    classe = models.ForeignKey(Classe, on_delete=models.SET_NULL, null=True, related_name='+')
+    module = models.ForeignKey(Module, on_delete=models.SET_NULL, null=True, related_name='+')
+    filiere = models.ForeignKey(Filiere, on_delete=models.SET_NULL, null=True, related_name='+')
+    poids = models.FloatField(default=1)
+
+    class Meta:
+        unique_together = ('absence', 'filiere')
+        indexes = [
+            models.Index(fields=['statut', 'filiere'], name='fait_absence_filiere_idx'),
+            models.Index(fields=['statut', 'module'], name='fait_absence_module_idx'),
+            models.Index(fields=['statut', 'classe'], name='fait_absence_classe_idx'),
+            models.Index(fields=['statut', 'cree_le'], name='fait_absence_cree_idx'),
+        ]
+
+    def __str__(self):
+        return f"Absence #{self.absence_id} - filière {self.filiere_id} ({self.poids:g})"
+
+
+class TeleversementJustificatif(models.Model):
+    """
+    Téléversement par morceaux d'un justificatif (voir `absences.televersement`).
+    `offset` est le nombre d'octets déjà reçus : un envoi interrompu reprend à cet offset.
+    """
+    STATUT_CHOICES = [
+        ('EN_COURS', 'En cours'),
+        ('TERMINE', 'Terminé'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='televersements_justificatifs')
+    nom_fichier = models.CharField(max_length=255)
+    taille = models.BigIntegerField(help_text="Taille totale annoncée, en octets.")
+    sha256 = models.CharField(max_length=64, help_text="Empreinte SHA-256 annoncée du fichier complet.")
+    offset = models.BigIntegerField(default=0)
+    statut = models.CharField(max_length=20, choices=STATUT_CHOICES, default='EN_COURS')
+    chemin = models.CharField(max_length=255, blank=True, default='', help_text="Document final, relatif à MEDIA_ROOT.")
+    cree_le = models.DateTimeField(auto_now_add=True)
+    modifie_le = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"Absence de {self.user.email} pour le cours du {self.planning.date}"
\ No newline at end of file
+        return f"Téléversement {self.id} ({self.offset}/{self.taille} octets)"
@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import Absence
+from .models import Absence, TeleversementJustificatif
+from .televersement import stocker_justificatif
 from users.serializers import UserSerializer # Pour afficher les détails de l'utilisateur
 
 class AdminAbsenceSerializer(serializers.ModelSerializer):
@@ -21,6 +22,37 @@ class AdminAbsenceSerializer(serializers.ModelSerializer):
             'modifie_le'
         ]
 
+class AdminAbsenceListSerializer(serializers.ModelSerializer):
+    """
+    Version compacte pour la liste des administrateurs : champs à plat,
+    sans les détails imbriqués de `UserSerializer`.
+    """
+    first_name = serializers.CharField(source='user.first_name', read_only=True)
+    last_name = serializers.CharField(source='user.last_name', read_only=True)
+    email = serializers.CharField(source='user.email', read_only=True)
+    date = serializers.DateField(source='planning.date', read_only=True)
+    module = serializers.CharField(source='planning.horaire.module.name', read_only=True, default=None)
+    classe = serializers.CharField(source='planning.horaire.module.classe.name', read_only=True, default=None)
+
+    class Meta:
+        model = Absence
+        fields = [
+            'id',
+            'user_id',
+            'first_name',
+            'last_name',
+            'email',
+            'planning_id',
+            'date',
+            'module',
+            'classe',
+            'statut',
+            'justificatif_texte',
+            'justificatif_document',
+            'cree_le',
+            'modifie_le'
+        ]
+
 class StudentAbsenceSerializer(serializers.ModelSerializer):
     """
     Serializer pour les étudiants. N'affiche que les informations pertinentes pour eux.
@@ -42,14 +74,30 @@ class StudentJustificationSerializer(serializers.ModelSerializer):
     """
     Serializer utilisé par l'étudiant pour soumettre ou mettre à jour un justificatif.
     """
+    # Document déjà envoyé par morceaux (voir `absences.televersement`)
+    televersement_id = serializers.UUIDField(write_only=True, required=False)
+
     class Meta:
         model = Absence
-        fields = ['justificatif_texte', 'justificatif_document']
+        fields = ['justificatif_texte', 'justificatif_document', 'televersement_id']
+
+    def validate_televersement_id(self, value):
+        televersement = TeleversementJustificatif.objects.filter(
+            id=value, user=self.context['request'].user, statut='TERMINE'
+        ).first()
+        if televersement is None:
+            raise serializers.ValidationError("Téléversement inconnu ou inachevé.")
+        return televersement
 
     def update(self, instance, validated_data):
         # Quand un étudiant soumet un justificatif, le statut passe automatiquement à "En attente"
         instance.justificatif_texte = validated_data.get('justificatif_texte', instance.justificatif_texte)
-        instance.justificatif_document = validated_data.get('justificatif_document', instance.justificatif_document)
+
+        # Les documents sont rangés sous leur empreinte SHA-256 : un même fichier n'est stocké qu'une fois
+        if validated_data.get('televersement_id'):
+            instance.justificatif_document.name = validated_data['televersement_id'].chemin
+        elif validated_data.get('justificatif_document'):
+            instance.justificatif_document.name = stocker_justificatif(validated_data['justificatif_document'])
         
         # On vérifie qu'au moins un des deux champs de justification est rempli
         if not instance.justificatif_texte and not instance.justificatif_document:
@@ -58,3 +106,50 @@ class StudentJustificationSerializer(serializers.ModelSerializer):
         instance.statut = 'EN_ATTENTE'
         instance.save()
         return instance
+
+
+class TeleversementJustificatifSerializer(serializers.ModelSerializer):
+    """
+    Création et suivi d'un téléversement par morceaux.
+    """
+    sha256 = serializers.RegexField(r'^[0-9a-fA-F]{64}$')
+    taille = serializers.IntegerField(min_value=1)
+
+    class Meta:
+        model = TeleversementJustificatif
+        fields = ['id', 'nom_fichier', 'taille', 'sha256', 'offset', 'statut', 'cree_le']
+        read_only_fields = ['id', 'offset', 'statut', 'cree_le']
+
+
+class FiltreAbsencesSerializer(serializers.Serializer):
+    """
+    Critères de sélection des absences (voir `absences.utils.filtrer_absences`).
+    """
+    statut = serializers.ChoiceField(choices=Absence.STATUT_CHOICES, required=False)
+    classe = serializers.IntegerField(required=False)
+    module = serializers.IntegerField(required=False)
+    filiere = serializers.IntegerField(required=False)
+    date_debut = serializers.DateField(required=False)
+    date_fin = serializers.DateField(required=False)
+
+
+class ExportAbsencesSerializer(FiltreAbsencesSerializer):
+    """
+    Paramètres de l'export des absences : filtres, format et exécution en tâche de fond.
+    """
+    fichier = serializers.ChoiceField(choices=['csv', 'xlsx'], default='csv')
+    en_tache = serializers.BooleanField(default=False)
+
+
+class TraitementLotSerializer(serializers.Serializer):
+    """
+    Approbation ou refus d'un lot d'absences, désignées par `ids` ou par `filtre`.
+    """
+    action = serializers.ChoiceField(choices=['approuver', 'refuser'])
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False, max_length=1000)
+    filtre = FiltreAbsencesSerializer(required=False)
+
+    def validate(self, data):
+        if ('ids' in data) == ('filtre' in data):
+            raise serializers.ValidationError("Fournissez soit une liste d'ids, soit un filtre.")
+        return data
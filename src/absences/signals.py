@@ -0,0 +1,190 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from filiere.models import Filiere
+from horaire.models import Horaire
+from module.models import Module
+from planning.models import Planning
+from pointage.models import Pointage, SessionPresence
+from pointage.signals import pointages_crees
+
+from . import compteurs, faits
+from .models import Absence, FaitAbsence
+
+
+def _module_du_planning(planning_id):
+    return Planning.objects.filter(id=planning_id).values_list('horaire__module_id', flat=True).first()
+
+
+@receiver(post_save, sender=Pointage)
+def compter_pointage(sender, instance, created, **kwargs):
+    """Pointages créés un par un. Les insertions par lots envoient `pointages_crees`."""
+    if created:
+        compteurs.pointages_crees([(instance.session_id, instance.user_id)])
+
+
+@receiver(pointages_crees)
+def compter_pointages_lot(sender, paires, **kwargs):
+    compteurs.pointages_crees(paires)
+
+
+@receiver(pre_delete, sender=Pointage)
+def memoriser_module_pointage(sender, instance, **kwargs):
+    # Lu avant toute suppression : dans une cascade (session, planning), les pre_delete
+    # sont tous envoyés avant les DELETE et les SET_NULL
+    instance._module_id = (
+        SessionPresence.objects.filter(id=instance.session_id)
+        .values_list('planning__horaire__module_id', flat=True).first()
+    )
+
+
+@receiver(post_delete, sender=Pointage)
+def decompter_pointage(sender, instance, **kwargs):
+    compteurs.appliquer([instance.user_id], getattr(instance, '_module_id', None), presents=-1)
+
+
+@receiver(post_init, sender=Absence)
+def memoriser_statut(sender, instance, **kwargs):
+    # Lu dans __dict__ pour ne pas charger un champ différé
+    instance._statut_initial = instance.__dict__.get('statut')
+    instance._affectation_initiale = (instance.__dict__.get('user_id'), instance.__dict__.get('planning_id'))
+
+
+@receiver(post_save, sender=Absence)
+def compter_absence(sender, instance, created, **kwargs):
+    """Création d'une absence, changements de statut (approuver, refuser, justifier...) et réattributions."""
+    user_id, planning_id = instance._affectation_initiale
+    if created:
+        compteurs.absences_creees([instance.user_id], _module_du_planning(instance.planning_id), instance.statut)
+        faits.creer(Absence.objects.filter(id=instance.id))
+    elif None not in (user_id, planning_id, instance._statut_initial) and (user_id, planning_id) != (instance.user_id, instance.planning_id):
+        # Absence réattribuée (autre étudiant ou autre cours) : elle quitte l'ancien compteur pour le nouveau
+        compteurs.appliquer(
+            [user_id], _module_du_planning(planning_id),
+            absents=-1, **compteurs.deltas_statut(instance._statut_initial, None)
+        )
+        compteurs.absences_creees([instance.user_id], _module_du_planning(instance.planning_id), instance.statut)
+        faits.reconstruire_absences(Absence.objects.filter(id=instance.id))
+    elif instance._statut_initial is not None and instance._statut_initial != instance.statut:
+        compteurs.statuts_modifies([
+            (instance.user_id, _module_du_planning(instance.planning_id), instance._statut_initial, instance.statut)
+        ])
+        faits.statuts_modifies([instance.id], instance.statut)
+    instance._statut_initial = instance.statut
+    instance._affectation_initiale = (instance.user_id, instance.planning_id)
+
+
+@receiver(pre_delete, sender=Absence)
+def memoriser_module_absence(sender, instance, **kwargs):
+    instance._module_id = _module_du_planning(instance.planning_id)
+
+
+@receiver(post_delete, sender=Absence)
+def decompter_absence(sender, instance, **kwargs):
+    compteurs.appliquer(
+        [instance.user_id], getattr(instance, '_module_id', None),
+        absents=-1, **compteurs.deltas_statut(instance.statut, None)
+    )
+
+
+@receiver(m2m_changed, sender=Module.filieres.through)
+def ventiler_faits(sender, instance, action, reverse, pk_set, **kwargs):
+    """Les filières d'un module changent : les poids de ses absences aussi."""
+    if reverse and action == 'pre_clear':
+        # `filiere.modules.clear()` : pk_set vaut None, on retient les modules avant leur détachement
+        instance._modules_detaches = list(instance.modules.values_list('id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        faits.reconstruire_modules([instance.pk])
+    else:
+        module_ids = instance.__dict__.pop('_modules_detaches', None) if action == 'post_clear' else pk_set
+        if module_ids:
+            faits.reconstruire_modules(module_ids)
+
+
+@receiver(pre_delete, sender=Filiere)
+def ventiler_faits_filiere(sender, instance, **kwargs):
+    # Les liens module-filière sont supprimés en cascade, sans m2m_changed
+    module_ids = list(instance.modules.values_list('id', flat=True))
+    if module_ids:
+        transaction.on_commit(lambda: faits.reconstruire_modules(module_ids))
+
+
+@receiver(post_save, sender=Module)
+def classe_des_faits(sender, instance, created, **kwargs):
+    if not created:
+        FaitAbsence.objects.filter(module_id=instance.id).exclude(classe_id=instance.classe_id).update(classe_id=instance.classe_id)
+
+
+def _deplacer_plannings(planning_ids, ancien_module_id, nouveau_module_id):
+    """Compteurs de présence des plannings (ids ou queryset) déplacés d'un module à un autre."""
+    compteurs.deplacer(
+        Pointage.objects.filter(session__planning_id__in=planning_ids),
+        Absence.objects.filter(planning_id__in=planning_ids),
+        ancien_module_id, nouveau_module_id,
+    )
+
+
+def _module_de_l_horaire(horaire_id):
+    return Horaire.objects.filter(id=horaire_id).values_list('module_id', flat=True).first() if horaire_id else None
+
+
+@receiver(post_init, sender=Planning)
+def memoriser_emplacement(sender, instance, **kwargs):
+    instance._emplacement_initial = (instance.__dict__.get('horaire_id'), instance.__dict__.get('date'))
+
+
+@receiver(post_save, sender=Planning)
+def deplacer_planning(sender, instance, created, **kwargs):
+    """Horaire (donc module) ou date d'un planning modifié : ses compteurs et ses faits changent de ligne."""
+    horaire_initial, date_initiale = instance._emplacement_initial
+    if not created and horaire_initial != instance.horaire_id:
+        _deplacer_plannings(
+            [instance.id], _module_de_l_horaire(horaire_initial), _module_de_l_horaire(instance.horaire_id)
+        )
+    if not created and (horaire_initial, date_initiale) != (instance.horaire_id, instance.date):
+        faits.reconstruire_plannings([instance.id])
+    instance._emplacement_initial = (instance.horaire_id, instance.date)
+
+
+@receiver(post_init, sender=Horaire)
+def memoriser_module_horaire(sender, instance, **kwargs):
+    instance._module_initial = instance.__dict__.get('module_id')
+
+
+@receiver(post_save, sender=Horaire)
+def deplacer_horaire(sender, instance, created, **kwargs):
+    if not created and instance._module_initial != instance.module_id:
+        plannings = Planning.objects.filter(horaire_id=instance.id).values('id')
+        _deplacer_plannings(plannings, instance._module_initial, instance.module_id)
+        faits.reconstruire_plannings(plannings)
+    instance._module_initial = instance.module_id
+
+
+@receiver(pre_delete, sender=Horaire)
+def detacher_horaire(sender, instance, **kwargs):
+    # Les plannings passent à horaire NULL par SET_NULL, sans post_save : leurs
+    # compteurs quittent le module maintenant, leurs faits sont recalculés après
+    planning_ids = list(instance.plannings.values_list('id', flat=True))
+    if planning_ids:
+        _deplacer_plannings(planning_ids, instance.module_id, None)
+        transaction.on_commit(lambda: faits.reconstruire_plannings(planning_ids))
+
+
+@receiver(post_init, sender=SessionPresence)
+def memoriser_planning_session(sender, instance, **kwargs):
+    instance._planning_initial = instance.__dict__.get('planning_id')
+
+
+@receiver(post_save, sender=SessionPresence)
+def deplacer_session(sender, instance, created, **kwargs):
+    """Session rattachée à un autre planning : ses pointages comptent pour le module de celui-ci."""
+    if not created and instance._planning_initial not in (None, instance.planning_id):
+        compteurs.deplacer(
+            Pointage.objects.filter(session_id=instance.id), Absence.objects.none(),
+            _module_du_planning(instance._planning_initial), _module_du_planning(instance.planning_id),
+        )
+    instance._planning_initial = instance.planning_id
@@ -0,0 +1,59 @@
+"""
+Gestionnaires de tâches de fond de l'application absences.
+"""
+import uuid
+from datetime import date
+
+from django.urls import reverse
+
+from FaceLoad.exports import ecrire_export
+from planning.models import Planning
+from statistiques.rollup import mettre_a_jour_planning
+from taches.registre import tache
+
+from . import alertes
+from .exports import ENTETES, lignes_absences
+from .generation import generer_absences_periode
+from .serializers import ExportAbsencesSerializer
+from .utils import generer_absences_pour_planning
+
+
+@tache('absences.generer')
+def generer_absences(t):
+    """Génère les absences d'un planning (déclenchée par `valider_cours`)."""
+    planning = Planning.objects.select_related('horaire__module').get(id=t.parametres['planning_id'])
+    resultat = generer_absences_pour_planning(planning)
+    # Cours validé : ses chiffres du jour sont à jour dans les agrégats de présence
+    mettre_a_jour_planning(planning)
+    return resultat
+
+
+@tache('absences.generer_periode')
+def generer_absences_en_retard(t):
+    """Rattrape les cours non traités d'une période (voir `absences.generation`)."""
+    return generer_absences_periode(
+        date.fromisoformat(t.parametres['debut']),
+        date.fromisoformat(t.parametres['fin']),
+        workers=t.parametres.get('workers', 4),
+        progression=lambda traites, total: t.progresser(traites * 100 / total if total else 100),
+    )
+
+
+@tache('absences.exporter')
+def exporter_absences(t):
+    """Export des absences écrit dans EXPORTS_ROOT, téléchargeable par `taches/<id>/fichier/`."""
+    serializer = ExportAbsencesSerializer(data=t.parametres)
+    serializer.is_valid(raise_exception=True)
+    data = serializer.validated_data
+    fichier, lignes = ecrire_export(f"absences-{t.id}-{uuid.uuid4().hex[:12]}", data['fichier'], ENTETES, lignes_absences(data))
+    return {"fichier": fichier, "lignes": lignes, "telechargement": reverse('tache-fichier', args=[t.id])}
+
+
+@tache('absences.envoyer_alertes')
+def envoyer_alertes(t):
+    """Vide la boîte d'envoi des alertes d'absences (voir `absences.alertes`)."""
+    resultat = alertes.envoyer_notifications()
+    if resultat['echecs']:
+        # Les notifications en échec seront retentées au prochain envoi
+        alertes.planifier_envoi()
+    return resultat
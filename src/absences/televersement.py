@@ -0,0 +1,213 @@
+"""
+Téléversement des justificatifs, par morceaux et avec reprise.
+
+Protocole :
+
+1. POST `absences/televersements/` avec `nom_fichier`, `taille` et `sha256`
+   du fichier complet. Si l'utilisateur a lui-même déjà envoyé ce document
+   (téléversement terminé ou justificatif d'une de ses absences), le
+   téléversement est terminé immédiatement (rien à envoyer). Une empreinte
+   annoncée ne donne jamais accès au document d'un autre utilisateur.
+2. PATCH `absences/televersements/<id>/` avec l'en-tête `Upload-Offset` et
+   les octets du morceau en corps brut. Un offset différent de celui du
+   serveur est refusé (409) avec l'offset attendu : après une coupure,
+   le client lit l'offset (GET) et reprend de là.
+3. Au dernier octet, l'empreinte est vérifiée et le fichier est rangé sous
+   `justificatifs_absences/<sha256>.<ext>` : un même document, dont le
+   serveur a reçu et vérifié le contenu, n'est stocké qu'une fois.
+4. `justifier` reçoit `televersement_id` à la place de `justificatif_document`.
+"""
+import hashlib
+import os
+import re
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from medias.traitement import planifier_variantes
+
+from .models import Absence, TeleversementJustificatif
+
+DOSSIER = 'justificatifs_absences'
+
+_config = getattr(settings, 'JUSTIFICATIF_TELEVERSEMENT', {})
+TAILLE_MAX = _config.get('TAILLE_MAX', 20 * 1024 * 1024)
+TAILLE_MORCEAU_MAX = _config.get('TAILLE_MORCEAU_MAX', 2 * 1024 * 1024)
+EXPIRATION = timedelta(hours=_config.get('EXPIRATION_HEURES', 24))
+
+TAILLE_LECTURE = 64 * 1024
+
+
+class TeleversementInvalide(Exception):
+    """Erreur à renvoyer au client avec le code HTTP `statut`."""
+
+    def __init__(self, message, statut=400, offset=None):
+        super().__init__(message)
+        self.statut = statut
+        self.offset = offset
+
+
+def _extension(nom_fichier):
+    extension = os.path.splitext(nom_fichier)[1].lower().lstrip('.')
+    return extension if re.fullmatch(r'[a-z0-9]{1,8}', extension) else 'bin'
+
+
+def chemin_document(sha256, nom_fichier):
+    """Nom du document final, relatif à MEDIA_ROOT."""
+    return f"{DOSSIER}/{sha256}.{_extension(nom_fichier)}"
+
+
+def _absolu(chemin):
+    return Path(settings.MEDIA_ROOT) / chemin
+
+
+def _chemin_partiel(televersement):
+    return _absolu(f"{DOSSIER}/televersements/{televersement.id}.part")
+
+
+def stocker_justificatif(fichier):
+    """
+    Range un fichier reçu en une fois (multipart) sous son empreinte.
+
+    Returns:
+        Le nom du document, relatif à MEDIA_ROOT.
+    """
+    empreinte = hashlib.sha256()
+    for morceau in fichier.chunks():
+        empreinte.update(morceau)
+    chemin = chemin_document(empreinte.hexdigest(), fichier.name)
+
+    destination = _absolu(chemin)
+    if not destination.exists():
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        # Nom temporaire unique : deux requêtes du même processus peuvent envoyer le même document
+        with tempfile.NamedTemporaryFile(dir=destination.parent, suffix='.tmp', delete=False) as sortie:
+            for morceau in fichier.chunks():
+                sortie.write(morceau)
+        os.replace(sortie.name, destination)
+        planifier_variantes(chemin)
+    return chemin
+
+
+def purger_televersements(user):
+    """Supprime les téléversements inachevés et expirés de l'utilisateur."""
+    expires = TeleversementJustificatif.objects.filter(
+        user=user, statut='EN_COURS', modifie_le__lt=timezone.now() - EXPIRATION
+    )
+    for televersement in expires:
+        _chemin_partiel(televersement).unlink(missing_ok=True)
+    expires.delete()
+
+
+def creer_televersement(user, nom_fichier, taille, sha256):
+    if taille > TAILLE_MAX:
+        raise TeleversementInvalide(f"Le document dépasse la taille maximale de {TAILLE_MAX // (1024 * 1024)} Mo.", 413)
+    purger_televersements(user)
+
+    televersement = TeleversementJustificatif(user=user, nom_fichier=nom_fichier, taille=taille, sha256=sha256.lower())
+    chemin = chemin_document(televersement.sha256, nom_fichier)
+    if _absolu(chemin).exists() and _deja_envoye_par(user, televersement.sha256, chemin):
+        # Document déjà reçu de cet utilisateur : rien à envoyer
+        televersement.offset = taille
+        televersement.statut = 'TERMINE'
+        televersement.chemin = chemin
+    televersement.save()
+    return televersement
+
+
+def _deja_envoye_par(user, sha256, chemin):
+    """
+    True si l'utilisateur a déjà transmis ce contenu : l'empreinte seule, fournie par le
+    client, ne prouve pas qu'il possède le document.
+    """
+    return (
+        TeleversementJustificatif.objects.filter(user=user, statut='TERMINE', sha256=sha256, chemin=chemin).exists()
+        or Absence.objects.filter(user=user, justificatif_document=chemin).exists()
+    )
+
+
+def ecrire_morceau(televersement_id, user, offset, flux, longueur):
+    """
+    Ajoute un morceau au fichier partiel, puis assemble le document au dernier octet.
+
+    Args:
+        offset: Position annoncée par le client (en-tête `Upload-Offset`).
+        flux: Corps brut de la requête, lu par blocs de 64 Ko.
+        longueur: Taille du morceau (en-tête `Content-Length`).
+
+    Returns:
+        Le `TeleversementJustificatif` à jour.
+    """
+    if longueur > TAILLE_MORCEAU_MAX:
+        raise TeleversementInvalide(f"Un morceau ne peut pas dépasser {TAILLE_MORCEAU_MAX} octets.", 413)
+
+    with transaction.atomic():
+        televersement = (
+            TeleversementJustificatif.objects.select_for_update()
+            .filter(id=televersement_id, user=user).first()
+        )
+        if televersement is None:
+            raise TeleversementInvalide("Téléversement non trouvé.", 404)
+        if televersement.statut == 'TERMINE':
+            return televersement
+        if offset != televersement.offset:
+            raise TeleversementInvalide("Offset inattendu.", 409, offset=televersement.offset)
+        if offset + longueur > televersement.taille:
+            raise TeleversementInvalide("Le morceau dépasse la taille annoncée du document.")
+
+        partiel = _chemin_partiel(televersement)
+        partiel.parent.mkdir(parents=True, exist_ok=True)
+        recus = 0
+        with open(partiel, 'r+b' if partiel.exists() else 'wb') as sortie:
+            # Un essai précédent interrompu a pu écrire au-delà de l'offset validé
+            sortie.seek(offset)
+            sortie.truncate()
+            while recus < longueur:
+                bloc = flux.read(min(TAILLE_LECTURE, longueur - recus))
+                if not bloc:
+                    break
+                sortie.write(bloc)
+                recus += len(bloc)
+
+        televersement.offset = offset + recus
+        corrompu = televersement.offset == televersement.taille and not _assembler(televersement, partiel)
+        televersement.save()
+
+    if corrompu:
+        raise TeleversementInvalide("L'empreinte SHA-256 du document ne correspond pas. Recommencez l'envoi.", 422, offset=0)
+    return televersement
+
+
+def _assembler(televersement, partiel):
+    """
+    Vérifie l'empreinte du fichier complet et le range sous son nom définitif.
+
+    Returns:
+        False si l'empreinte ne correspond pas (le téléversement repart de zéro).
+    """
+    empreinte = hashlib.sha256()
+    with open(partiel, 'rb') as entree:
+        for bloc in iter(lambda: entree.read(TAILLE_LECTURE), b''):
+            empreinte.update(bloc)
+
+    if empreinte.hexdigest() != televersement.sha256:
+        # Fichier corrompu : on repart de zéro
+        partiel.unlink(missing_ok=True)
+        televersement.offset = 0
+        return False
+
+    chemin = chemin_document(televersement.sha256, televersement.nom_fichier)
+    destination = _absolu(chemin)
+    if destination.exists():
+        partiel.unlink()
+    else:
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(partiel, destination)
+        planifier_variantes(chemin)
+    televersement.statut = 'TERMINE'
+    televersement.chemin = chemin
+    return True
@@ -1,3 +1,316 @@
-from django.test import TestCase
+import hashlib
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail import EmailMultiAlternatives
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from pointage.bench import JeuDeDonnees
+from pointage.ingestion import inserer_pointages
+from pointage.models import Pointage, SessionPresence
+
+from . import compteurs
+from .alertes import _enregistrer_resultats, envoyer_notifications, reserver_lot
+from .models import (
+    Absence, AlerteAbsence, AttendanceSummary, FaitAbsence, NotificationAlerte, TeleversementJustificatif,
+)
+from .televersement import stocker_justificatif
+from .utils import generer_absences_pour_planning, traiter_absences_lot
+
+
+class CoherenceMixin:
+    """Compteurs et faits doivent toujours correspondre à un recalcul complet."""
+
+    def assertCoherent(self):
+        self.assertEqual(compteurs.comparer(compteurs.calculer_compteurs()), [])
+        for absence in Absence.objects.select_related('planning__horaire'):
+            module_id = absence.planning.horaire.module_id if absence.planning.horaire else None
+            faits = list(FaitAbsence.objects.filter(absence=absence).values_list('module_id', 'date', 'statut'))
+            self.assertTrue(faits, f"Absence #{absence.id} sans fait.")
+            self.assertEqual(set(faits), {(module_id, absence.planning.date, absence.statut)})
+
+
+class CompteursTests(CoherenceMixin, TestCase):
+
+    def setUp(self):
+        self.jeu = JeuDeDonnees(4).creer()
+        self.autre = JeuDeDonnees(1).creer()
+        self.etudiants = self.jeu.etudiants
+
+    def generer(self, nb_presents=1):
+        for etudiant in self.etudiants[:nb_presents]:
+            Pointage.objects.create(session=self.jeu.session, user=etudiant)
+        generer_absences_pour_planning(self.jeu.planning)
+        return Absence.objects.filter(planning=self.jeu.planning).order_by('id')
+
+    def test_pointage_cree_puis_supprime(self):
+        pointage = Pointage.objects.create(session=self.jeu.session, user=self.etudiants[0])
+        self.assertCoherent()
+        pointage.delete()
+        self.assertCoherent()
+
+    def test_pointages_par_lot(self):
+        inserer_pointages([(self.jeu.session.id, etudiant.id) for etudiant in self.etudiants])
+        self.assertCoherent()
+
+    def test_suppression_en_cascade_de_la_session(self):
+        Pointage.objects.create(session=self.jeu.session, user=self.etudiants[0])
+        self.jeu.session.delete()
+        self.assertCoherent()
+
+    def test_generation_et_changements_de_statut(self):
+        absences = self.generer()
+        self.assertEqual(absences.count(), 3)
+        self.assertCoherent()
+
+        absence = absences[0]
+        for statut in ('EN_ATTENTE', 'APPROUVEE', 'REFUSEE'):
+            absence.statut = statut
+            absence.save()
+            self.assertCoherent()
+
+        absence.delete()
+        self.assertCoherent()
+
+    def test_effectifs_de_la_generation(self):
+        Pointage.objects.create(session=self.jeu.session, user=self.etudiants[0])
+        resultat = generer_absences_pour_planning(self.jeu.planning)
+        self.assertEqual(
+            (resultat['absences_creees'], resultat['total_etudiants_classe'],
+             resultat['etudiants_presents'], resultat['etudiants_absents']),
+            (3, 4, 1, 3),
+        )
+        self.assertEqual(generer_absences_pour_planning(self.jeu.planning)['absences_creees'], 0)
+
+    def test_transition_par_lot(self):
+        absences = self.generer()
+        traiter_absences_lot('approuver', ids=[absence.id for absence in absences])
+        self.assertCoherent()
+
+    def test_reattribution(self):
+        absence = self.generer()[0]
+        absence.user = self.autre.etudiants[0]
+        absence.save()
+        self.assertCoherent()
+        absence.planning = self.autre.planning
+        absence.statut = 'APPROUVEE'
+        absence.save()
+        self.assertCoherent()
+
+    def test_planning_change_d_horaire(self):
+        self.generer()
+        self.jeu.planning.horaire = self.autre.horaire
+        self.jeu.planning.save()
+        self.assertCoherent()
+        self.assertFalse(AttendanceSummary.objects.filter(module=self.jeu.module).exclude(
+            presents=0, absents=0, justifiees=0, en_attente=0
+        ).exists())
+
+    def test_horaire_change_de_module(self):
+        self.generer()
+        self.jeu.horaire.module = self.autre.module
+        self.jeu.horaire.save()
+        self.assertCoherent()
+
+    def test_suppression_de_l_horaire(self):
+        self.generer()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.jeu.horaire.delete()
+        self.assertCoherent()
+
+    def test_session_change_de_planning(self):
+        Pointage.objects.create(session=self.jeu.session, user=self.etudiants[0])
+        session = SessionPresence.objects.get(id=self.jeu.session.id)
+        session.planning = self.autre.planning
+        session.save()
+        self.assertCoherent()
+
+    def test_recalculer_compteurs(self):
+        self.generer()
+        AttendanceSummary.objects.update(absents=99)
+        self.assertNotEqual(compteurs.comparer(compteurs.calculer_compteurs()), [])
+
+        sortie = StringIO()
+        call_command('recalculer_compteurs', '--verifier', stdout=sortie)
+        self.assertIn("incohérent", sortie.getvalue())
+
+        call_command('recalculer_compteurs', stdout=StringIO())
+        self.assertCoherent()
+
+
+class TraitementParLotTests(CoherenceMixin, TestCase):
+
+    def setUp(self):
+        self.jeu = JeuDeDonnees(3).creer()
+        self.autre = JeuDeDonnees(2).creer()
+        for jeu in (self.jeu, self.autre):
+            generer_absences_pour_planning(jeu.planning)
+        self.absences = list(Absence.objects.filter(planning=self.jeu.planning).order_by('id'))
+
+    def passer(self, absence, statut):
+        absence.statut = statut
+        absence.save()
+
+    def resultats(self, reponse):
+        return {r['id']: r['resultat'] for r in reponse['resultats']}
+
+    def test_resultat_par_absence(self):
+        en_attente, non_justifiee, approuvee = self.absences
+        self.passer(en_attente, 'EN_ATTENTE')
+        self.passer(approuvee, 'APPROUVEE')
+
+        reponse = traiter_absences_lot('approuver', ids=[en_attente.id, non_justifiee.id, approuvee.id, 0])
+        self.assertEqual(reponse['modifiees'], 2)
+        self.assertEqual(self.resultats(reponse), {
+            en_attente.id: 'modifiee', non_justifiee.id: 'modifiee', approuvee.id: 'ignoree', 0: 'introuvable',
+        })
+        self.assertEqual(
+            set(Absence.objects.filter(planning=self.jeu.planning).values_list('statut', flat=True)), {'APPROUVEE'}
+        )
+        self.assertCoherent()
+
+    def test_refus_limite_aux_absences_en_attente(self):
+        en_attente, non_justifiee, _ = self.absences
+        self.passer(en_attente, 'EN_ATTENTE')
+
+        reponse = traiter_absences_lot('refuser', ids=[en_attente.id, non_justifiee.id])
+        self.assertEqual(self.resultats(reponse), {en_attente.id: 'modifiee', non_justifiee.id: 'ignoree'})
+        self.assertEqual(Absence.objects.get(id=non_justifiee.id).statut, 'NON_JUSTIFIEE')
+        self.assertCoherent()
+
+    def test_selection_par_filtre(self):
+        reponse = traiter_absences_lot('approuver', filtre={'module': self.jeu.module.id})
+        self.assertEqual(reponse['modifiees'], 3)
+        self.assertEqual(set(self.resultats(reponse)), {absence.id for absence in self.absences})
+        self.assertFalse(
+            Absence.objects.filter(planning=self.autre.planning).exclude(statut='NON_JUSTIFIEE').exists()
+        )
+        self.assertCoherent()
+
+        # Les absences déjà approuvées ne sont plus sélectionnées
+        reponse = traiter_absences_lot('approuver', filtre={'module': self.jeu.module.id})
+        self.assertEqual((reponse['modifiees'], reponse['resultats']), (0, []))
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class TeleversementTests(TestCase):
+
+    contenu = b"justificatif " * 1000
+
+    def setUp(self):
+        self.jeu = JeuDeDonnees(2).creer()
+        self.client = APIClient()
+        self.client.force_authenticate(self.jeu.etudiants[0])
+
+    def tearDown(self):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+
+    def creer(self, contenu=None, sha256=None):
+        contenu = contenu or self.contenu
+        reponse = self.client.post(reverse('justificatif-upload'), {
+            'nom_fichier': 'certificat.pdf', 'taille': len(contenu),
+            'sha256': sha256 or hashlib.sha256(contenu).hexdigest(),
+        }, format='json')
+        self.assertEqual(reponse.status_code, 201, reponse.data)
+        return reponse.data
+
+    def envoyer(self, televersement, offset, morceau):
+        return self.client.patch(
+            reverse('justificatif-upload-detail', args=[televersement['id']]), morceau,
+            content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def test_envoi_par_morceaux(self):
+        televersement = self.creer()
+        self.assertEqual(self.envoyer(televersement, 0, self.contenu[:5000]).status_code, 200)
+
+        # Morceau rejoué ou en avance : l'offset attendu est renvoyé
+        reponse = self.envoyer(televersement, 1000, self.contenu[1000:6000])
+        self.assertEqual((reponse.status_code, reponse.data['offset']), (409, 5000))
+
+        reponse = self.envoyer(televersement, 5000, self.contenu[5000:])
+        self.assertEqual((reponse.status_code, reponse.data['statut']), (200, 'TERMINE'))
+        chemin = TeleversementJustificatif.objects.get(id=televersement['id']).chemin
+        self.assertEqual((Path(settings.MEDIA_ROOT) / chemin).read_bytes(), self.contenu)
+
+    def test_empreinte_incorrecte(self):
+        televersement = self.creer(sha256='0' * 64)
+        reponse = self.envoyer(televersement, 0, self.contenu)
+        self.assertEqual((reponse.status_code, reponse.data['offset']), (422, 0))
+        self.assertEqual(TeleversementJustificatif.objects.get(id=televersement['id']).offset, 0)
+        self.assertEqual(list(Path(settings.MEDIA_ROOT).glob('justificatifs_absences/*.pdf')), [])
+
+    def test_deduplication(self):
+        premier = self.creer()
+        self.envoyer(premier, 0, self.contenu)
+
+        # Le même utilisateur n'a rien à renvoyer
+        second = self.creer()
+        self.assertEqual((second['statut'], second['offset']), ('TERMINE', len(self.contenu)))
+
+        # Un autre utilisateur doit envoyer le contenu, stocké une seule fois
+        self.client.force_authenticate(self.jeu.etudiants[1])
+        autre = self.creer()
+        self.assertEqual((autre['statut'], autre['offset']), ('EN_COURS', 0))
+        self.assertEqual(self.envoyer(autre, 0, self.contenu).data['statut'], 'TERMINE')
+        self.assertEqual(len(list(Path(settings.MEDIA_ROOT).glob('justificatifs_absences/*.pdf'))), 1)
+
+    def test_stockage_en_une_fois(self):
+        chemins = {stocker_justificatif(SimpleUploadedFile('scan.pdf', self.contenu)) for _ in range(2)}
+        self.assertEqual(len(chemins), 1)
+        self.assertEqual(list(Path(settings.MEDIA_ROOT).rglob('*.tmp')), [])
+
+
+class EnvoiAlertesTests(TestCase):
+
+    def setUp(self):
+        jeu = JeuDeDonnees(2).creer()
+        self.notifications = [
+            NotificationAlerte.objects.create(
+                alerte=AlerteAbsence.objects.create(user=etudiant, module=jeu.module, seuil=3, non_justifiees=3),
+                destinataire='scolarite@example.com',
+            )
+            for etudiant in jeu.etudiants
+        ]
+
+    def statuts(self):
+        return list(NotificationAlerte.objects.order_by('id').values_list('statut', 'tentatives'))
+
+    def test_un_courriel_par_destinataire(self):
+        self.assertEqual(envoyer_notifications(), {'envoyees': 2, 'echecs': 0})
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(self.statuts(), [('ENVOYEE', 1), ('ENVOYEE', 1)])
+
+    def test_echec_puis_abandon(self):
+        NotificationAlerte.objects.filter(id=self.notifications[1].id).update(tentatives=4)
+        with mock.patch.object(EmailMultiAlternatives, 'send', side_effect=OSError("SMTP indisponible")):
+            self.assertEqual(envoyer_notifications(), {'envoyees': 0, 'echecs': 2})
+        self.assertEqual(self.statuts(), [('EN_ATTENTE', 1), ('ECHOUEE', 5)])
+        self.assertEqual(NotificationAlerte.objects.get(id=self.notifications[0].id).erreur, "SMTP indisponible")
+
+    def test_reservation_abandonnee_reprise(self):
+        recente, ancienne = self.notifications
+        NotificationAlerte.objects.filter(id=recente.id).update(statut='ENVOI_EN_COURS', reservee_le=timezone.now())
+        NotificationAlerte.objects.filter(id=ancienne.id).update(
+            statut='ENVOI_EN_COURS', reservee_le=timezone.now() - timedelta(seconds=901)
+        )
+        self.assertEqual(envoyer_notifications(), {'envoyees': 1, 'echecs': 0})
+        self.assertEqual(self.statuts(), [('ENVOI_EN_COURS', 0), ('ENVOYEE', 1)])
+
+    def test_resultat_d_un_lot_repris_ignore(self):
+        lot = reserver_lot(10)
+        # Lot repris par un autre envoi : le premier n'écrase pas son résultat
+        NotificationAlerte.objects.update(reservee_le=timezone.now() + timedelta(seconds=1))
+        _enregistrer_resultats(lot, [n.id for n in lot], {})
+        self.assertEqual(self.statuts(), [('ENVOI_EN_COURS', 0), ('ENVOI_EN_COURS', 0)])
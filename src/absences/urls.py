@@ -1,6 +1,9 @@
 from django.urls import path
 from .views import (
     GenererAbsencesView,
+    AbsenceExportView,
+    TeleversementJustificatifView,
+    TeleversementJustificatifDetailView,
     StudentAbsenceViewSet,
     AdminAbsenceViewSet
 )
@@ -9,6 +12,9 @@ urlpatterns = [
     # URL pour la génération automatique des absences
     path('absences/generate/', GenererAbsencesView.as_view(), name='generate-absences'),
 
+    # Export CSV/XLSX pour les administrateurs
+    path('absences/export/', AbsenceExportView.as_view(), name='export-absences'),
+
     # URLs pour les étudiants concernant leurs absences
     path(
         'absences/my-absences/',
@@ -20,6 +26,8 @@ urlpatterns = [
         StudentAbsenceViewSet.as_view({'get': 'retrieve'}),
         name='student-absence-detail'
     ),
+    path('absences/televersements/', TeleversementJustificatifView.as_view(), name='justificatif-upload'),
+    path('absences/televersements/<uuid:id>/', TeleversementJustificatifDetailView.as_view(), name='justificatif-upload-detail'),
     path(
         'absences/my-absences/<int:pk>/justifier/',
         StudentAbsenceViewSet.as_view({'post': 'justifier', 'put': 'justifier'}),
@@ -32,6 +40,11 @@ urlpatterns = [
         AdminAbsenceViewSet.as_view({'get': 'list', 'post': 'create'}),
         name='admin-absence-list-create'
     ),
+    path(
+        'absences/manage-absences/traiter-lot/',
+        AdminAbsenceViewSet.as_view({'post': 'traiter_lot'}),
+        name='admin-absence-bulk'
+    ),
     path(
         'absences/manage-absences/<int:pk>/',
         AdminAbsenceViewSet.as_view({
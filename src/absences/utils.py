@@ -1,9 +1,14 @@
 import logging
+from django.db import transaction
 from django.utils import timezone
+from django.db.models import Exists, OuterRef
 
+from FaceLoad import dashboard
+
+from . import compteurs, faits
 from .models import Absence
 from planning.models import Planning
-from pointage.models import Pointage, SessionPresence
+from pointage.models import Pointage
 from users.models import User
 
 logger = logging.getLogger(__name__)
@@ -12,41 +17,142 @@ def generer_absences_pour_planning(planning: Planning) -> dict:
     """
     Génère les absences pour une instance de Planning donnée.
 
+    Les étudiants attendus sont ceux de la classe du module du cours
+    (`planning.horaire.module.classe`). Une seule requête lit les étudiants
+    attendus avec leur présence : les effectifs et la liste des absents en
+    sont déduits. Les absences sont insérées en une seule requête
+    (`bulk_create(ignore_conflicts=True)`).
+
     Args:
         planning: L'objet Planning pour lequel générer les absences.
 
     Returns:
         Un dictionnaire contenant les résultats de l'opération.
     """
-    # Évite de générer deux fois les absences
-    if Absence.objects.filter(planning=planning).exists():
-        logger.info(f"Les absences pour le planning #{planning.id} ont déjà été générées.")
-        return {"message": "Déjà généré", "absences_creees": 0}
-
-    logger.info(f"Traitement du planning #{planning.id} pour le cours de {planning.module.name}...")
-
-    # **CETTE LOGIQUE DEVRA ÊTRE ADAPTÉE PRÉCISÉMENT À VOTRE STRUCTURE**
-    classe = planning.user.classe  # Hypothèse simplifiée
-    if not classe:
+    module = planning.module
+    classe_id = module.classe_id if module else None
+    if not classe_id:
         logger.warning(f"Impossible de déterminer la classe pour le planning #{planning.id}. On ignore.")
         return {"message": "Classe non trouvée", "absences_creees": 0}
 
-    etudiants_de_la_classe = User.objects.filter(classe=classe, roles__name='STUDENT')
-    sessions_presence = SessionPresence.objects.filter(planning=planning)
-    etudiants_presents_ids = Pointage.objects.filter(session__in=sessions_presence).values_list('user_id', flat=True)
-    etudiants_absents = etudiants_de_la_classe.exclude(id__in=etudiants_presents_ids)
+    with transaction.atomic():
+        # Verrou sur le planning : deux générations simultanées ne se chevauchent pas
+        Planning.objects.select_for_update().filter(id=planning.id).exists()
+
+        # Évite de générer deux fois les absences
+        if Absence.objects.filter(planning=planning).exists():
+            logger.info(f"Les absences pour le planning #{planning.id} ont déjà été générées.")
+            return {"message": "Déjà généré", "absences_creees": 0}
+
+        logger.info(f"Traitement du planning #{planning.id} pour le cours de {module.name}...")
+
+        etudiants = list(
+            User.get_students().filter(classe_id=classe_id)
+            .annotate(present=Exists(Pointage.objects.filter(session__planning=planning, user_id=OuterRef('id'))))
+            .values_list('id', 'present')
+        )
+        absents_ids = [etudiant_id for etudiant_id, present in etudiants if not present]
 
-    absences_creees = 0
-    for etudiant in etudiants_absents:
-        _, created = Absence.objects.get_or_create(user=etudiant, planning=planning)
-        if created:
-            absences_creees += 1
+        Absence.objects.bulk_create(
+            [Absence(user_id=etudiant_id, planning=planning) for etudiant_id in absents_ids],
+            ignore_conflicts=True
+        )
+        # Aucune absence n'existait sous le verrou : chaque absent a la sienne
+        absences_creees = len(absents_ids)
+
+        # bulk_create n'envoie pas post_save : mise à jour directe des compteurs, des faits et du dashboard
+        compteurs.absences_creees(absents_ids, module.id)
+        faits.creer(Absence.objects.filter(planning=planning))
+        dashboard.marquer_perime()
 
     logger.info(f">>> {absences_creees} absence(s) créée(s) pour le planning #{planning.id}.")
-    
+
     return {
         "message": "Opération terminée",
         "absences_creees": absences_creees,
-        "etudiants_presents": etudiants_presents_ids.count(),
-        "etudiants_absents": etudiants_absents.count()
+        "total_etudiants_classe": len(etudiants),
+        "etudiants_presents": len(etudiants) - len(absents_ids),
+        "etudiants_absents": len(absents_ids)
     }
+
+
+# Traitement par lot : statut cible et statuts de départ autorisés
+TRANSITIONS_LOT = {
+    'approuver': ('APPROUVEE', ('EN_ATTENTE', 'NON_JUSTIFIEE')),
+    'refuser': ('REFUSEE', ('EN_ATTENTE',)),
+}
+
+
+def filtrer_absences(absences, filtre):
+    """
+    Restreint un queryset d'absences selon les critères de `FiltreAbsencesSerializer`.
+    """
+    if filtre.get('statut'):
+        absences = absences.filter(statut=filtre['statut'])
+    if filtre.get('classe'):
+        absences = absences.filter(planning__horaire__module__classe_id=filtre['classe'])
+    if filtre.get('module'):
+        absences = absences.filter(planning__horaire__module_id=filtre['module'])
+    if filtre.get('filiere'):
+        absences = absences.filter(planning__horaire__module__filieres__id=filtre['filiere'])
+    if filtre.get('date_debut'):
+        absences = absences.filter(planning__date__gte=filtre['date_debut'])
+    if filtre.get('date_fin'):
+        absences = absences.filter(planning__date__lte=filtre['date_fin'])
+    return absences
+
+
+def traiter_absences_lot(action, ids=None, filtre=None):
+    """
+    Approuve ou refuse un lot d'absences en un seul UPDATE, limité aux absences
+    dont le statut autorise la transition.
+
+    Args:
+        action: 'approuver' ou 'refuser'.
+        ids: Identifiants des absences à traiter, ou None pour utiliser `filtre`.
+        filtre: Critères de sélection (voir `filtrer_absences`).
+
+    Returns:
+        Un dictionnaire avec le nombre d'absences modifiées et le résultat par absence.
+    """
+    nouveau_statut, statuts_depart = TRANSITIONS_LOT[action]
+
+    absences = Absence.objects.all()
+    if ids is not None:
+        absences = absences.filter(id__in=ids)
+    else:
+        absences = filtrer_absences(absences, filtre).filter(statut__in=statuts_depart)
+
+    with transaction.atomic():
+        # Les lignes verrouillées ne peuvent pas changer entre la lecture et l'UPDATE
+        lignes = list(
+            absences.select_for_update(of=('self',))
+            .values_list('id', 'user_id', 'planning__horaire__module_id', 'statut')
+        )
+        a_modifier = [ligne for ligne in lignes if ligne[3] in statuts_depart]
+        modifiees = Absence.objects.filter(
+            id__in=[ligne[0] for ligne in a_modifier], statut__in=statuts_depart
+        ).update(statut=nouveau_statut, modifie_le=timezone.now())
+
+        # update() n'envoie pas post_save : mise à jour directe des compteurs, des faits et du dashboard
+        compteurs.statuts_modifies(
+            [(user_id, module_id, ancien, nouveau_statut) for _, user_id, module_id, ancien in a_modifier]
+        )
+        faits.statuts_modifies([ligne[0] for ligne in a_modifier], nouveau_statut)
+        if modifiees:
+            dashboard.marquer_perime()
+
+    statuts = {ligne[0]: ligne[3] for ligne in lignes}
+    modifiees_ids = {ligne[0] for ligne in a_modifier}
+    resultats = []
+    for absence_id in (ids if ids is not None else [ligne[0] for ligne in lignes]):
+        if absence_id in modifiees_ids:
+            resultats.append({'id': absence_id, 'resultat': 'modifiee', 'statut': nouveau_statut})
+        elif absence_id in statuts:
+            resultats.append({'id': absence_id, 'resultat': 'ignoree', 'statut': statuts[absence_id],
+                              'error': f"Transition impossible depuis le statut {statuts[absence_id]}."})
+        else:
+            resultats.append({'id': absence_id, 'resultat': 'introuvable', 'error': "Absence non trouvée."})
+
+    logger.info(f"{modifiees} absence(s) passée(s) au statut {nouveau_statut} par lot.")
+    return {'action': action, 'modifiees': modifiees, 'resultats': resultats}
@@ -1,4 +1,7 @@
 from rest_framework import viewsets, status, generics
+from rest_framework.pagination import CursorPagination
+from rest_framework.views import APIView
+from django.utils import timezone
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
@@ -6,12 +9,22 @@ from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from .models import Absence
 from .serializers import (
     AdminAbsenceSerializer,
+    AdminAbsenceListSerializer,
+    ExportAbsencesSerializer,
+    TeleversementJustificatifSerializer,
+    FiltreAbsencesSerializer,
     StudentAbsenceSerializer,
-    StudentJustificationSerializer
+    StudentJustificationSerializer,
+    TraitementLotSerializer
 )
-from users.models import User
 from planning.models import Planning
-from pointage.models import Pointage, SessionPresence
+from pointage.models import SessionPresence
+from taches.execution import enfiler
+from FaceLoad.exports import reponse_export
+from .exports import ENTETES, lignes_absences
+from .televersement import TeleversementInvalide, creer_televersement, ecrire_morceau, TAILLE_MORCEAU_MAX
+from .models import TeleversementJustificatif
+from .utils import filtrer_absences, generer_absences_pour_planning, traiter_absences_lot
 
 class GenererAbsencesView(generics.GenericAPIView):
     """
@@ -27,48 +40,29 @@ class GenererAbsencesView(generics.GenericAPIView):
             return Response({"error": "planning_id est requis."}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            planning = Planning.objects.get(id=planning_id)
+            planning = Planning.objects.select_related('horaire__module').get(id=planning_id)
         except Planning.DoesNotExist:
             return Response({"error": "Planning non trouvé."}, status=status.HTTP_404_NOT_FOUND)
 
-        # Trouver la classe associée à ce planning (logique à adapter selon vos modèles)
-        # Hypothèse : le module du planning est lié à une filière, qui a des classes
-        # Cette partie est complexe et dépend de la structure exacte de vos modèles
-        # Pour l'instant, on suppose que le prof du planning a une classe.
-        # **CETTE LOGIQUE DEVRA ÊTRE ADAPTÉE PRÉCISÉMENT À VOTRE STRUCTURE**
-        classe = planning.user.classe # Hypothèse simplifiée
-        if not classe:
+        # La classe attendue est celle du module du cours (planning -> horaire -> module -> classe)
+        if not planning.module or not planning.module.classe_id:
             return Response({"error": "Impossible de déterminer la classe pour ce planning."}, status=status.HTTP_400_BAD_REQUEST)
 
-        etudiants_de_la_classe = User.objects.filter(classe=classe, roles__name='STUDENT')
-        
-        # Récupérer les sessions de présence actives pour ce planning
-        sessions_presence = SessionPresence.objects.filter(planning=planning, is_active=True)
-        if not sessions_presence.exists():
-            return Response({"message": "Aucune session de présence active trouvée pour ce planning. Impossible de générer les absences."},
+        # Récupérer les sessions de présence de ce planning (désactivées à leur expiration)
+        if not SessionPresence.objects.filter(planning=planning).exists():
+            return Response({"message": "Aucune session de présence trouvée pour ce planning. Impossible de générer les absences."},
                             status=status.HTTP_404_NOT_FOUND)
 
-        # Récupérer les IDs des étudiants qui ont pointé dans l'une de ces sessions
-        etudiants_presents_ids = Pointage.objects.filter(session__in=sessions_presence).values_list('user_id', flat=True)
-
-        # Trouver les étudiants absents
-        etudiants_absents = etudiants_de_la_classe.exclude(id__in=etudiants_presents_ids)
-
-        absences_creees = 0
-        for etudiant in etudiants_absents:
-            # Crée l'absence seulement si elle n'existe pas déjà
-            _, created = Absence.objects.get_or_create(
-                user=etudiant,
-                planning=planning
-            )
-            if created:
-                absences_creees += 1
+        resultat = generer_absences_pour_planning(planning)
+        if resultat["message"] == "Déjà généré":
+            return Response({"message": "Les absences de ce planning ont déjà été générées."}, status=status.HTTP_200_OK)
 
+        absences_creees = resultat["absences_creees"]
         return Response({
             "message": f"{absences_creees} absence(s) créée(s) avec succès.",
-            "total_etudiants_classe": etudiants_de_la_classe.count(),
-            "etudiants_presents": len(etudiants_presents_ids),
-            "etudiants_absents": etudiants_absents.count()
+            "total_etudiants_classe": resultat["total_etudiants_classe"],
+            "etudiants_presents": resultat["etudiants_presents"],
+            "etudiants_absents": resultat["etudiants_absents"]
         }, status=status.HTTP_201_CREATED)
 
 
@@ -93,7 +87,8 @@ class StudentAbsenceViewSet(viewsets.ReadOnlyModelViewSet):
         if absence.statut not in ['NON_JUSTIFIEE', 'EN_ATTENTE']:
             return Response({"error": "Cette absence ne peut plus être justifiée."}, status=status.HTTP_400_BAD_REQUEST)
 
-        serializer = self.get_serializer(instance=absence, data=request.data)
+        # Serializer explicite : les urls montent le viewset sans routeur, les options de @action ne sont pas appliquées
+        serializer = StudentJustificationSerializer(instance=absence, data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)
         serializer.save()
         
@@ -101,16 +96,103 @@ class StudentAbsenceViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(StudentAbsenceSerializer(absence).data, status=status.HTTP_200_OK)
 
 
+class TeleversementJustificatifView(APIView):
+    """
+    Démarre le téléversement par morceaux d'un justificatif (voir `absences.televersement`).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = TeleversementJustificatifSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            televersement = creer_televersement(request.user, **serializer.validated_data)
+        except TeleversementInvalide as e:
+            return Response({"error": str(e)}, status=e.statut)
+
+        data = TeleversementJustificatifSerializer(televersement).data
+        data['taille_morceau_max'] = TAILLE_MORCEAU_MAX
+        return Response(data, status=status.HTTP_201_CREATED)
+
+
+class TeleversementJustificatifDetailView(APIView):
+    """
+    - GET : offset atteint, pour reprendre un envoi interrompu.
+    - PATCH : envoie un morceau (corps brut) à la position donnée par l'en-tête `Upload-Offset`.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, id):
+        televersement = TeleversementJustificatif.objects.filter(id=id, user=request.user).first()
+        if not televersement:
+            return Response({"error": "Téléversement non trouvé."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(TeleversementJustificatifSerializer(televersement).data, status=status.HTTP_200_OK)
+
+    def patch(self, request, id):
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            longueur = int(request.headers.get('Content-Length') or 0)
+        except (KeyError, ValueError):
+            return Response({"error": "Les en-têtes Upload-Offset et Content-Length sont requis."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            televersement = ecrire_morceau(id, request.user, offset, request._request, longueur)
+        except TeleversementInvalide as e:
+            data = {"error": str(e)}
+            if e.offset is not None:
+                data['offset'] = e.offset
+            return Response(data, status=e.statut)
+
+        return Response(TeleversementJustificatifSerializer(televersement).data, status=status.HTTP_200_OK)
+
+
+class AbsenceCursorPagination(CursorPagination):
+    """
+    Pagination par curseur sur (cree_le, id) : ni COUNT(*) ni OFFSET.
+    """
+    ordering = ('-cree_le', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
 class AdminAbsenceViewSet(viewsets.ModelViewSet):
     """
     ViewSet pour les administrateurs.
     - CRUD complet sur les absences.
+    - `list`: filtrable par statut, classe, module, filiere, date_debut et date_fin
+      (date du cours), paginée par curseur.
     - `approuver`: Marquer une absence comme approuvée.
     - `refuser`: Marquer une absence comme refusée.
+    - `traiter_lot`: Approuver ou refuser plusieurs absences en une requête.
     """
     queryset = Absence.objects.all()
     serializer_class = AdminAbsenceSerializer
     permission_classes = [IsAdminUser]
+    pagination_class = AbsenceCursorPagination
+
+    def get_queryset(self):
+        if self.action != 'list':
+            return Absence.objects.select_related('user')
+
+        filtre = FiltreAbsencesSerializer(data=self.request.query_params)
+        filtre.is_valid(raise_exception=True)
+        absences = Absence.objects.select_related(
+            'user', 'planning__horaire__module__classe'
+        ).only(
+            'id', 'statut', 'justificatif_texte', 'justificatif_document', 'cree_le', 'modifie_le',
+            'user__id', 'user__first_name', 'user__last_name', 'user__email',
+            'planning__id', 'planning__date',
+            'planning__horaire__id', 'planning__horaire__module__id', 'planning__horaire__module__name',
+            'planning__horaire__module__classe__id', 'planning__horaire__module__classe__name',
+        )
+        return filtrer_absences(absences, filtre.validated_data)
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return AdminAbsenceListSerializer
+        return super().get_serializer_class()
 
     @action(detail=True, methods=['post'])
     def approuver(self, request, pk=None):
@@ -124,4 +206,36 @@ class AdminAbsenceViewSet(viewsets.ModelViewSet):
         absence = self.get_object()
         absence.statut = 'REFUSEE'
         absence.save()
-        return Response(self.get_serializer(absence).data, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response(self.get_serializer(absence).data, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'])
+    def traiter_lot(self, request):
+        serializer = TraitementLotSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        resultat = traiter_absences_lot(data['action'], ids=data.get('ids'), filtre=data.get('filtre'))
+        return Response(resultat, status=status.HTTP_200_OK)
+
+
+class AbsenceExportView(APIView):
+    """
+    Export CSV ou XLSX des absences, avec les filtres de la liste des administrateurs.
+    `?en_tache=true` lance l'export en tâche de fond : le fichier est écrit dans
+    EXPORTS_ROOT et se télécharge par `taches/<id>/fichier/`.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        serializer = ExportAbsencesSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        if data['en_tache']:
+            parametres = {cle: valeur for cle, valeur in request.query_params.items() if cle != 'en_tache'}
+            tache = enfiler('absences.exporter', parametres, cree_par=request.user)
+            return Response({"message": "L'export est en cours de génération.", "tache_id": tache.id},
+                            status=status.HTTP_202_ACCEPTED)
+
+        nom = f"absences-{timezone.localdate().isoformat()}"
+        return reponse_export(request, nom, data['fichier'], ENTETES, lignes_absences(data))
@@ -0,0 +1,44 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from medias.traitement import DOSSIERS, fichiers_a_traiter, generer_variantes
+
+
+class Command(BaseCommand):
+    help = "Génère les variantes (vignette, aperçu) des images déjà présentes dans MEDIA_ROOT."
+
+    def add_arguments(self, parser):
+        parser.add_argument('dossiers', nargs='*', default=DOSSIERS,
+                            help="Dossiers relatifs à MEDIA_ROOT.")
+        parser.add_argument('--workers', type=int, default=4,
+                            help="Threads de traitement (Pillow libère le GIL pendant le décodage).")
+        parser.add_argument('--forcer', action='store_true', help="Régénère même les variantes à jour.")
+
+    def handle(self, *args, **options):
+        fichiers = list(fichiers_a_traiter(options['dossiers']))
+        debut = time.perf_counter()
+        crees = 0
+        erreurs = 0
+
+        def traiter(chemin):
+            return generer_variantes(chemin, forcer=options['forcer'])
+
+        with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as executor:
+            futures = [(chemin, executor.submit(traiter, chemin)) for chemin in fichiers]
+            for i, (chemin, future) in enumerate(futures, 1):
+                try:
+                    variantes = future.result()
+                except Exception as e:
+                    erreurs += 1
+                    self.stdout.write(f"  {chemin} : erreur ({e})")
+                    continue
+                crees += len(variantes)
+                if variantes:
+                    self.stdout.write(f"  {i}/{len(fichiers)} {chemin} : {', '.join(variantes)}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(fichiers)} image(s) examinée(s), {crees} variante(s) créée(s), {erreurs} erreur(s) "
+            f"en {time.perf_counter() - debut:.1f} s."
+        ))
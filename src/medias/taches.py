@@ -0,0 +1,12 @@
+"""
+Gestionnaires de tâches de fond de l'application medias.
+"""
+from taches.registre import tache
+
+from .traitement import generer_variantes
+
+
+@tache('medias.variantes')
+def variantes(t):
+    """Variantes (vignette, aperçu) d'une image déposée."""
+    return {"chemin": t.parametres['chemin'], "variantes": generer_variantes(t.parametres['chemin'])}
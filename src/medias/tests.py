@@ -0,0 +1,62 @@
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from rest_framework.test import APIClient
+
+from absences.models import Absence
+from absences.utils import generer_absences_pour_planning
+from pointage.bench import JeuDeDonnees
+
+from .traitement import chemin_variante, generer_variantes
+
+CHEMIN = 'justificatifs_absences/scan.png'
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class VariantesTests(TestCase):
+
+    def setUp(self):
+        source = Path(settings.MEDIA_ROOT) / CHEMIN
+        source.parent.mkdir(parents=True, exist_ok=True)
+        # Bruit : PNG lourd, dont les variantes JPEG sont nettement plus légères
+        Image.effect_noise((2000, 1500), 60).save(source)
+
+    def tearDown(self):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+
+    def test_generer_variantes(self):
+        self.assertEqual(generer_variantes(CHEMIN), ['vignette', 'apercu'])
+        # Variantes à jour : rien à refaire
+        self.assertEqual(generer_variantes(CHEMIN), [])
+
+        racine = Path(settings.MEDIA_ROOT)
+        with Image.open(racine / chemin_variante(CHEMIN, 'vignette')) as vignette:
+            self.assertEqual((vignette.format, vignette.size), ('JPEG', (320, 240)))
+        self.assertEqual(list(racine.rglob('*.tmp')), [])
+
+    def test_acces_aux_justificatifs(self):
+        generer_variantes(CHEMIN)
+        jeu = JeuDeDonnees(2).creer()
+        generer_absences_pour_planning(jeu.planning)
+        Absence.objects.filter(user=jeu.etudiants[0]).update(justificatif_document=CHEMIN)
+        administrateur = type(jeu.etudiants[0]).objects.create_superuser(
+            email=f"{jeu.prefixe}-admin@example.com", password='x'
+        )
+
+        client = APIClient()
+        url = reverse('media-variante', args=[CHEMIN])
+        for utilisateur, attendu in ((jeu.etudiants[0], 200), (administrateur, 200), (jeu.etudiants[1], 404)):
+            client.force_authenticate(utilisateur)
+            reponse = client.get(url, {'variante': 'vignette'})
+            self.assertEqual(reponse.status_code, attendu, utilisateur)
+            if attendu == 200:
+                self.assertEqual(reponse['Content-Type'], 'image/jpeg')
+                reponse.close()
+
+        client.force_authenticate(None)
+        self.assertEqual(client.get(url).status_code, 401)
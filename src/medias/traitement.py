@@ -0,0 +1,169 @@
+"""
+Variantes allégées des images stockées dans MEDIA_ROOT.
+
+Pour chaque image (photos, justificatifs scannés), des variantes
+redimensionnées et recompressées en JPEG sont écrites à côté de
+l'original, dans un sous-dossier `variantes/` :
+
+    photos/portrait.png
+    photos/variantes/portrait.png.vignette.jpg
+    photos/variantes/portrait.png.apercu.jpg
+
+Le nom complet de l'original (extension comprise) est conservé, pour que
+`a.jpg` et `a.png` n'aient pas les mêmes variantes. L'original n'est
+jamais modifié. Une variante qui ne serait pas plus légère que l'original
+n'est pas conservée : l'original est alors servi.
+
+Les variantes des justificatifs sont générées en tâche de fond dès leur
+dépôt (`planifier_variantes`, appelé par `absences.televersement`).
+L'application n'a pas d'envoi de photos : les images déposées autrement
+dans MEDIA_ROOT (photos) sont traitées par la commande `generer_variantes`,
+à lancer après un import ou à planifier.
+"""
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+SOUS_DOSSIER = 'variantes'
+EXTENSIONS_IMAGES = {'.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tif', '.tiff', '.gif'}
+
+# Variantes de la plus petite à la plus grande : largeur maximale (px) et qualité JPEG
+VARIANTES = getattr(settings, 'MEDIAS_VARIANTES', {
+    'vignette': {'LARGEUR': 320, 'QUALITE': 70},
+    'apercu': {'LARGEUR': 1600, 'QUALITE': 80},
+})
+
+# Dossiers de MEDIA_ROOT servis et traités (les exports, notamment, n'en font pas partie)
+DOSSIERS = getattr(settings, 'MEDIAS_DOSSIERS', ['photos', 'justificatifs_absences'])
+
+# Variante servie quand le client n'en demande aucune
+VARIANTE_DEFAUT = 'apercu'
+
+
+def est_image(chemin):
+    return Path(chemin).suffix.lower() in EXTENSIONS_IMAGES
+
+
+def chemin_absolu(chemin):
+    """
+    Chemin absolu d'un fichier relatif à MEDIA_ROOT, ou None s'il en sort.
+    """
+    racine = Path(settings.MEDIA_ROOT).resolve()
+    absolu = (racine / chemin).resolve()
+    if racine not in absolu.parents:
+        return None
+    return absolu
+
+
+def chemin_variante(chemin, variante):
+    """Chemin (relatif à MEDIA_ROOT) de la variante `variante` du fichier `chemin`."""
+    chemin = Path(chemin)
+    return str(chemin.parent / SOUS_DOSSIER / f"{chemin.name}.{variante}.jpg")
+
+
+def generer_variantes(chemin, forcer=False):
+    """
+    Crée les variantes manquantes d'une image.
+
+    Returns:
+        La liste des variantes créées.
+    """
+    from PIL import Image, ImageOps
+
+    source = chemin_absolu(chemin)
+    if source is None or not source.is_file() or not est_image(chemin):
+        return []
+
+    a_creer = [
+        nom for nom in VARIANTES
+        if forcer or not _est_a_jour(chemin_absolu(chemin_variante(chemin, nom)), source)
+    ]
+    if not a_creer:
+        return []
+
+    taille_originale = source.stat().st_size
+    crees = []
+    with Image.open(source) as image:
+        # Orientation EXIF appliquée une fois pour toutes (les variantes n'ont plus d'EXIF)
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'L'):
+            fond = Image.new('RGB', image.size, (255, 255, 255))
+            image = image.convert('RGBA')
+            fond.paste(image, mask=image.getchannel('A'))
+            image = fond
+
+        for nom in a_creer:
+            parametres = VARIANTES[nom]
+            variante = image.copy()
+            variante.thumbnail((parametres['LARGEUR'], parametres['LARGEUR'] * 4), Image.LANCZOS)
+
+            destination = chemin_absolu(chemin_variante(chemin, nom))
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            # Nom temporaire unique : la tâche et la commande peuvent traiter la même image en parallèle
+            with tempfile.NamedTemporaryFile(dir=destination.parent, suffix='.tmp', delete=False) as sortie:
+                variante.save(sortie, 'JPEG', quality=parametres['QUALITE'], optimize=True, progressive=True)
+            temporaire = Path(sortie.name)
+
+            if temporaire.stat().st_size >= taille_originale:
+                # Pas plus léger que l'original : inutile de la garder
+                temporaire.unlink()
+                destination.unlink(missing_ok=True)
+                continue
+            os.replace(temporaire, destination)
+            crees.append(nom)
+    return crees
+
+
+def _est_a_jour(variante, source):
+    return variante is not None and variante.exists() and variante.stat().st_mtime >= source.stat().st_mtime
+
+
+def choisir_fichier(chemin, variante=None, largeur=None):
+    """
+    Fichier à servir pour `chemin` : la variante demandée, la plus petite
+    variante d'au moins `largeur` pixels, ou par défaut l'aperçu. L'original
+    sert de repli et reste disponible avec `variante='original'`.
+
+    Returns:
+        Le chemin absolu du fichier à servir.
+    """
+    original = chemin_absolu(chemin)
+    if variante == 'original' or not est_image(chemin):
+        return original
+
+    if variante in VARIANTES:
+        candidates = list(VARIANTES)[list(VARIANTES).index(variante):]
+    elif largeur:
+        candidates = [nom for nom, parametres in VARIANTES.items() if parametres['LARGEUR'] >= largeur]
+    else:
+        candidates = [VARIANTE_DEFAUT]
+
+    for nom in candidates:
+        fichier = chemin_absolu(chemin_variante(chemin, nom))
+        if fichier is not None and fichier.exists():
+            return fichier
+    return original
+
+
+def planifier_variantes(chemin):
+    """Demande la génération des variantes d'un fichier qui vient d'être déposé."""
+    if not est_image(chemin):
+        return None
+    from taches.execution import enfiler
+    return enfiler('medias.variantes', {'chemin': chemin})
+
+
+def fichiers_a_traiter(dossiers):
+    """Images originales des dossiers donnés (relatifs à MEDIA_ROOT), hors variantes et fichiers partiels."""
+    racine = Path(settings.MEDIA_ROOT)
+    for dossier in dossiers:
+        for base, sous_dossiers, fichiers in os.walk(racine / dossier):
+            sous_dossiers[:] = [nom for nom in sous_dossiers if nom not in (SOUS_DOSSIER, 'televersements')]
+            for nom in fichiers:
+                if est_image(nom):
+                    yield str((Path(base) / nom).relative_to(racine))
@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import MediaView
+
+urlpatterns = [
+    path('medias/<path:chemin>', MediaView.as_view(), name='media-variante'),
+]
@@ -0,0 +1,47 @@
+import mimetypes
+
+from django.http import FileResponse
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+
+from absences.models import Absence
+from .traitement import DOSSIERS, SOUS_DOSSIER, VARIANTES, choisir_fichier
+
+
+class MediaView(APIView):
+    """
+    Sert un fichier de MEDIA_ROOT dans sa variante la plus légère adaptée :
+    - par défaut l'aperçu ;
+    - `?largeur=N` : la plus petite variante d'au moins N pixels ;
+    - `?variante=vignette|apercu|original`.
+    Un justificatif n'est accessible qu'aux administrateurs et à l'étudiant concerné.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, chemin):
+        variante = request.query_params.get('variante')
+        if variante and variante != 'original' and variante not in VARIANTES:
+            return Response({"error": f"Variante inconnue : {variante}."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            largeur = int(request.query_params.get('largeur', 0))
+        except ValueError:
+            return Response({"error": "largeur doit être un entier."}, status=status.HTTP_400_BAD_REQUEST)
+
+        parties = chemin.split('/')
+        if parties[0] not in DOSSIERS or SOUS_DOSSIER in parties or 'televersements' in parties:
+            return Response({"error": "Fichier non trouvé."}, status=status.HTTP_404_NOT_FOUND)
+
+        if chemin.startswith('justificatifs_absences/') and not request.user.is_staff:
+            if not Absence.objects.filter(user=request.user, justificatif_document=chemin).exists():
+                return Response({"error": "Fichier non trouvé."}, status=status.HTTP_404_NOT_FOUND)
+
+        fichier = choisir_fichier(chemin, variante=variante, largeur=largeur)
+        if fichier is None or not fichier.is_file():
+            return Response({"error": "Fichier non trouvé."}, status=status.HTTP_404_NOT_FOUND)
+
+        content_type = mimetypes.guess_type(fichier.name)[0] or 'application/octet-stream'
+        reponse = FileResponse(open(fichier, 'rb'), content_type=content_type)
+        reponse['Cache-Control'] = 'private, max-age=86400'
+        return reponse
@@ -1,3 +1,31 @@
+from django.forms import modelform_factory
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from absences.models import Absence
+from pointage.bench import JeuDeDonnees
+from users.models import User
+
+
+class ModulesDuProfesseurTests(TestCase):
+
+    def setUp(self):
+        self.jeu = JeuDeDonnees(1).creer()
+        self.jeu.professeur.modules.add(self.jeu.module)
+        self.client = APIClient()
+        self.client.force_authenticate(
+            User.objects.create_superuser(email=f"{self.jeu.prefixe}-admin@example.com", password='x')
+        )
+
+    def test_modules_du_professeur(self):
+        reponse = self.client.get(f'/api/v1/professeurs/{self.jeu.professeur.id}/modules/')
+        self.assertEqual(reponse.status_code, 200)
+        self.assertEqual([module['id'] for module in reponse.data], [self.jeu.module.id])
+
+    def test_utilisateur_qui_n_est_pas_professeur(self):
+        reponse = self.client.get(f'/api/v1/professeurs/{self.jeu.etudiants[0].id}/modules/')
+        self.assertEqual(reponse.status_code, 404)
+
+    def test_absences_reservees_aux_etudiants(self):
+        choix = modelform_factory(Absence, fields=['user'])().fields['user'].queryset
+        self.assertEqual(list(choix.filter(email__startswith=self.jeu.prefixe)), [self.jeu.etudiants[0]])
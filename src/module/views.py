@@ -7,6 +7,7 @@ from .serializers import ModuleSerializers
 from rest_framework.permissions import IsAuthenticated
 from .models import Module
 from users.permissions import IsAnyAdmin
+from users.models import User
 # Create your views here.
 
 @api_view(['POST','GET'])
@@ -53,7 +54,7 @@ def get_professor_modules(request, professor_id):
     """
     API pour récupérer les modules d'un professeur via son ID
     """
-    user = User.objects.filter(id=professor_id, roles__name='PROFESSOR').first()
+    user = User.objects.filter(id=professor_id, role__name='PROFESSOR').first()
 
     if not user:
         return Response({"message": f"Aucun professeur trouvé avec l'ID : {professor_id}"}, status=status.HTTP_404_NOT_FOUND)
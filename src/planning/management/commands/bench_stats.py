@@ -0,0 +1,127 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from FaceLoad.stats import compter_plannings, compter_utilisateurs_actifs
+from planning.models import Planning
+from pointage.bench import CompteurRequetes, JeuDeDonnees, percentile
+from users.models import User
+
+
+def anciens_kpis(today):
+    """KPIs plannings et utilisateurs du dashboard, calculés comme avant (un `.count()` par chiffre)."""
+    plannings_today = Planning.objects.filter(date=today)
+    return {
+        'students': User.get_students().filter(is_active=True).count(),
+        'professors': User.get_professors().filter(is_active=True).count(),
+        'total': plannings_today.count(),
+        'validated': plannings_today.filter(is_validated_by_admin=True).count(),
+        'cancelled': plannings_today.filter(is_validated_by_professor=True, is_validated_by_admin=False).count(),
+    }
+
+
+def nouveaux_kpis(today):
+    utilisateurs = compter_utilisateurs_actifs()
+    plannings_today = compter_plannings(Planning.objects.filter(date=today))
+    return {
+        'students': utilisateurs['etudiants'],
+        'professors': utilisateurs['professeurs'],
+        'total': plannings_today['total'],
+        'validated': plannings_today['valides_admin'],
+        'cancelled': plannings_today['annules'],
+    }
+
+
+def anciennes_stats_plannings(user):
+    """Chiffres de `get_planning_stats` calculés comme avant."""
+    user_plannings = Planning.objects.filter(user=user)
+    return {
+        'total': Planning.objects.count(),
+        'valides_professeur': Planning.objects.filter(is_validated_by_professor=True).count(),
+        'valides_admin': Planning.objects.filter(is_validated_by_admin=True).count(),
+        'en_attente': Planning.objects.filter(is_validated_by_professor=False, is_validated_by_admin=False).count(),
+        'mes_total': user_plannings.count(),
+        'mes_valides': user_plannings.filter(is_validated_by_professor=True).count(),
+        'mes_en_attente': user_plannings.filter(is_validated_by_professor=False, is_validated_by_admin=False).count(),
+    }
+
+
+def nouvelles_stats_plannings(user):
+    chiffres = compter_plannings(user=user)
+    chiffres.pop('annules')
+    return chiffres
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare les statistiques du dashboard et de get_planning_stats calculées par un `.count()` "
+        "par chiffre et par agrégation conditionnelle : nombre de requêtes, latence et égalité des résultats."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--plannings', type=int, default=100_000)
+        parser.add_argument('--etudiants', type=int, default=500)
+        parser.add_argument('--repetitions', type=int, default=50)
+
+    def handle(self, *args, **options):
+        donnees = JeuDeDonnees(options['etudiants'], avec_session=False).creer()
+        try:
+            self._creer_plannings(donnees, options['plannings'])
+            today = timezone.localdate()
+            scenarios = [
+                ('dashboard (KPIs)', lambda: anciens_kpis(today), lambda: nouveaux_kpis(today)),
+                ('get_planning_stats', lambda: anciennes_stats_plannings(donnees.professeur),
+                 lambda: nouvelles_stats_plannings(donnees.professeur)),
+            ]
+            for nom, ancien, nouveau in scenarios:
+                resultat_ancien = ancien()
+                resultat_nouveau = nouveau()
+                if resultat_ancien != resultat_nouveau:
+                    raise CommandError(f"{nom} : résultats différents\n  avant : {resultat_ancien}\n  après : {resultat_nouveau}")
+                self._afficher(f"{nom} avant", *self._mesurer(ancien, options['repetitions']))
+                self._afficher(f"{nom} après", *self._mesurer(nouveau, options['repetitions']))
+                self.stdout.write(f"  résultats identiques : {resultat_nouveau}")
+        finally:
+            self.stdout.write("Suppression des données de test...")
+            Planning.objects.filter(horaire=donnees.horaire).exclude(id=donnees.planning.id).delete()
+            donnees.supprimer()
+
+    def _creer_plannings(self, donnees, total):
+        aujourd_hui = timezone.localdate()
+        debut = time.perf_counter()
+        Planning.objects.bulk_create(
+            [
+                Planning(
+                    user=donnees.professeur,
+                    horaire=donnees.horaire,
+                    # Une partie des plannings tombe aujourd'hui pour les KPIs du jour
+                    date=aujourd_hui - timedelta(days=i % 200),
+                    is_validated_by_professor=random.random() < 0.7,
+                    is_validated_by_admin=random.random() < 0.4,
+                )
+                for i in range(total)
+            ],
+            batch_size=5000
+        )
+        self.stdout.write(f"{total} plannings créés en {time.perf_counter() - debut:.1f} s.")
+
+    def _mesurer(self, fonction, repetitions):
+        latences, requetes = [], []
+        for _ in range(repetitions):
+            compteur = CompteurRequetes()
+            debut = time.perf_counter()
+            with connection.execute_wrapper(compteur):
+                fonction()
+            latences.append(time.perf_counter() - debut)
+            requetes.append(compteur.total)
+        return latences, requetes
+
+    def _afficher(self, nom, latences, requetes):
+        self.stdout.write(
+            f"{nom:<28} p50={percentile(latences, 50) * 1000:>7.1f} ms  "
+            f"p95={percentile(latences, 95) * 1000:>7.1f} ms  requêtes={max(requetes)}"
+        )
@@ -9,11 +9,12 @@ from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from .models import Planning
 from module.models import Module
 from datetime import datetime, timedelta, date
-from absences.utils import generer_absences_pour_planning
+from taches.execution import enfiler
 from django.utils import timezone
 from users.models import User
 from django.db.models import Q
 from datetime import datetime, date
+from FaceLoad.stats import compter_plannings
 
 
 # Create your views here.
@@ -124,12 +125,12 @@ def valider_cours(request, id):
     planning.is_validated_by_professor = True
     planning.save()
 
-    # On déclenche la génération des absences
-    resultat = generer_absences_pour_planning(planning)
-    
-    message_final = f"Vore présence a été validé avec succès. {resultat.get('absences_creees', 0)} absence(s) enregistrée(s) pour cet cours."
+    # La génération des absences se fait en tâche de fond : suivre son état via /taches/<id>/
+    tache = enfiler('absences.generer', {'planning_id': planning.id}, cree_par=request.user)
 
-    return Response({"message": message_final}, status=status.HTTP_200_OK)
+    message_final = "Votre présence a été validé avec succès. Les absences de ce cours sont en cours de génération."
+
+    return Response({"message": message_final, "tache_id": tache.id}, status=status.HTTP_200_OK)
 
 
 
@@ -258,19 +259,20 @@ def get_planning_stats(request):
     """
     Récupère les statistiques des plannings.
     """
-    total_plannings = Planning.objects.count()
-    is_validated_by_admind_by_prof = Planning.objects.filter(is_validated_by_professor=True).count()
-    is_validated_by_admind_by_admin = Planning.objects.filter(is_validated_by_admin=True).count()
-    pending_plannings = Planning.objects.filter(is_validated_by_professor=False, is_validated_by_admin=False).count()
-
     # Statistiques par utilisateur connecté (si c'est un professeur)
+    est_professeur = hasattr(request.user, 'modules') and request.user.modules.exists()
+    chiffres = compter_plannings(user=request.user if est_professeur else None)
+    total_plannings = chiffres['total']
+    is_validated_by_admind_by_prof = chiffres['valides_professeur']
+    is_validated_by_admind_by_admin = chiffres['valides_admin']
+    pending_plannings = chiffres['en_attente']
+
     user_stats = {}
-    if hasattr(request.user, 'modules') and request.user.modules.exists():
-        user_plannings = Planning.objects.filter(user=request.user)
+    if est_professeur:
         user_stats = {
-            'mes_plannings_total': user_plannings.count(),
-            'mes_plannings_valides': user_plannings.filter(is_validated_by_professor=True).count(),
-            'mes_plannings_en_attente': user_plannings.filter(is_validated_by_professor=False, is_validated_by_admin=False).count(),
+            'mes_plannings_total': chiffres['mes_total'],
+            'mes_plannings_valides': chiffres['mes_valides'],
+            'mes_plannings_en_attente': chiffres['mes_en_attente'],
         }
 
     stats = {
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PointageConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'pointage'
+
+    def ready(self):
+        from . import signals  # noqa: F401
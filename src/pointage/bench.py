@@ -0,0 +1,195 @@
+"""
+Outils communs aux commandes de benchmark et de test de charge du pointage.
+
+Les données créées ici sont préfixées (`bench-...`) et supprimées à la fin
+de chaque exécution : les commandes peuvent tourner sur une base de
+développement sans la polluer.
+"""
+import math
+import queue
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from django.db import connections
+from django.utils import timezone
+
+from classe.models import Classe
+from horaire.models import Horaire
+from module.models import Module
+from planning.models import Planning
+from role.models import Role
+from users.models import User
+
+from .models import SessionPresence
+
+
+class JeuDeDonnees:
+    """
+    Une classe, son module, un cours en cours aujourd'hui, un professeur,
+    des étudiants et (sauf `avec_session=False`) une session de présence ouverte.
+    """
+
+    def __init__(self, nb_etudiants, latitude=12.6392, longitude=-8.0029, avec_session=True):
+        self.prefixe = f"bench-{uuid.uuid4().hex[:8]}"
+        self.nb_etudiants = nb_etudiants
+        self.latitude = latitude
+        self.longitude = longitude
+        self.avec_session = avec_session
+        self.classe = None
+        self.module = None
+        self.horaire = None
+        self.professeur = None
+        self.planning = None
+        self.session = None
+        self.etudiants = []
+
+    def creer(self):
+        now = timezone.localtime()
+        self.classe = Classe.objects.create(name=self.prefixe)
+        self.module = Module.objects.create(
+            name=self.prefixe,
+            start_date=now.date() - timedelta(days=30),
+            end_date=now.date() + timedelta(days=30),
+            classe=self.classe,
+        )
+        # Un cours qui couvre l'heure courante, pour que la création de session soit autorisée
+        self.horaire = Horaire.objects.create(
+            time_start_course=max(now - timedelta(hours=1), now.replace(hour=0, minute=0)).time(),
+            time_end_course=min(now + timedelta(hours=2), now.replace(hour=23, minute=59)).time(),
+            module=self.module,
+            jours='bench',
+            salle=self.prefixe,
+        )
+
+        role_professeur, _ = Role.objects.get_or_create(name='PROFESSOR')
+        role_etudiant, _ = Role.objects.get_or_create(name='STUDENT')
+        self.professeur = User.objects.create(
+            email=f"{self.prefixe}-prof@example.com",
+            role=role_professeur,
+        )
+        self.etudiants = User.objects.bulk_create([
+            User(email=f"{self.prefixe}-{i}@example.com", classe=self.classe, role=role_etudiant)
+            for i in range(self.nb_etudiants)
+        ])
+
+        self.planning = Planning.objects.create(user=self.professeur, horaire=self.horaire, date=now.date())
+        if self.avec_session:
+            self.creer_session()
+        return self
+
+    def creer_session(self):
+        self.session = SessionPresence.objects.create(
+            planning=self.planning,
+            code=self.prefixe[-8:].upper(),
+            latitude=self.latitude,
+            longitude=self.longitude,
+            end_time=timezone.now() + timedelta(minutes=30),
+        )
+        return self.session
+
+    def supprimer(self):
+        User.objects.filter(email__startswith=self.prefixe).delete()
+        for objet in (self.planning, self.horaire, self.module, self.classe):
+            if objet is not None and objet.pk is not None:
+                objet.delete()
+
+
+def supprimer_par_lots(queryset, taille_lot=2000):
+    """
+    Supprime les lignes d'un queryset par lots d'identifiants avec `.delete()` :
+    cascades et signaux post_delete (compteurs, faits) sont appliqués, sans
+    charger toute la table d'un coup.
+
+    Returns:
+        Le nombre de lignes supprimées.
+    """
+    queryset = queryset.order_by('id')
+    total = 0
+    while True:
+        ids = list(queryset.values_list('id', flat=True)[:taille_lot])
+        if not ids:
+            return total
+        queryset.model.objects.filter(id__in=ids).delete()
+        total += len(ids)
+
+
+def executer_en_parallele(fonction, elements, workers):
+    """
+    Soumet tous les éléments d'un coup à `workers` threads (l'équivalent des
+    workers d'un serveur) et mesure la latence de chaque appel depuis cette
+    soumission commune, file d'attente comprise.
+
+    Returns:
+        (latences en secondes, nombre d'erreurs, durée totale en secondes)
+    """
+    file = queue.Queue()
+    for element in elements:
+        file.put(element)
+
+    latences = []
+    erreurs = []
+    lock = threading.Lock()
+    depart = time.perf_counter()
+
+    def travailler():
+        try:
+            while True:
+                try:
+                    element = file.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    fonction(element)
+                except Exception as e:
+                    with lock:
+                        erreurs.append(e)
+                else:
+                    with lock:
+                        latences.append(time.perf_counter() - depart)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=travailler) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return latences, len(erreurs), time.perf_counter() - depart
+
+
+def percentile(valeurs, p):
+    """Percentile `p` (0-100) par la méthode du rang le plus proche."""
+    if not valeurs:
+        return 0.0
+    valeurs = sorted(valeurs)
+    rang = max(math.ceil(p / 100 * len(valeurs)) - 1, 0)
+    return valeurs[rang]
+
+
+def resumer(nom, latences, erreurs, duree):
+    """Ligne de rapport : débit, percentiles de latence et taux d'erreur."""
+    total = len(latences) + erreurs
+    debit = total / duree if duree > 0 else 0.0
+    return (
+        f"{nom:<24} {total:>6} req  {debit:>9.1f} req/s  "
+        f"p50={percentile(latences, 50) * 1000:>8.1f} ms  "
+        f"p95={percentile(latences, 95) * 1000:>8.1f} ms  "
+        f"p99={percentile(latences, 99) * 1000:>8.1f} ms  "
+        f"erreurs={erreurs} ({(erreurs / total * 100) if total else 0:.1f}%)"
+    )
+
+
+class CompteurRequetes:
+    """
+    Compte les requêtes SQL exécutées sur une connexion (via `execute_wrapper`).
+    """
+
+    def __init__(self):
+        self.total = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.total += 1
+        return execute(sql, params, many, context)
@@ -0,0 +1,76 @@
+"""
+Codes de présence rotatifs signés (façon TOTP).
+
+Un code est l'identifiant de la session en base 36 suivi d'une signature
+HMAC de (session, créneau de temps) tronquée à `LONGUEUR_SIGNATURE`
+caractères. Il change toutes les `POINTAGE_CODE_ROTATION_SECONDES` secondes.
+Le serveur retrouve la session et vérifie le code sans lecture en base ni
+recherche d'unicité. Une capture d'écran partagée devient inutilisable dès
+le créneau suivant.
+
+Le champ `SessionPresence.code` reste accepté pour les anciens clients.
+"""
+import time
+
+from django.conf import settings
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+
+ALPHABET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+LONGUEUR_SIGNATURE = 5
+LONGUEUR_MAX = 10  # longueur maximale acceptée par ValidatePresenceSerializer
+
+ROTATION_SECONDES = getattr(settings, 'POINTAGE_CODE_ROTATION_SECONDES', 30)
+# Nombre de créneaux précédents encore acceptés (temps de saisie, horloges décalées)
+TOLERANCE = getattr(settings, 'POINTAGE_CODE_TOLERANCE', 1)
+
+
+def _base36(nombre):
+    if nombre == 0:
+        return ALPHABET[0]
+    chiffres = []
+    while nombre:
+        nombre, reste = divmod(nombre, 36)
+        chiffres.append(ALPHABET[reste])
+    return ''.join(reversed(chiffres))
+
+
+def _creneau(now=None):
+    return int((now if now is not None else time.time()) // ROTATION_SECONDES)
+
+
+def _signature(session_id, creneau):
+    digest = salted_hmac('pointage.codes', f"{session_id}:{creneau}", algorithm='sha256').digest()
+    return _base36(int.from_bytes(digest[:8], 'big'))[-LONGUEUR_SIGNATURE:].rjust(LONGUEUR_SIGNATURE, '0')
+
+
+def generer_code(session_id, now=None):
+    """Code rotatif de la session pour le créneau courant (`now` en timestamp Unix)."""
+    return _base36(session_id) + _signature(session_id, _creneau(now))
+
+
+def secondes_restantes(now=None):
+    """Secondes avant la rotation suivante, pour que l'écran du professeur se rafraîchisse à temps."""
+    now = now if now is not None else time.time()
+    return ROTATION_SECONDES - int(now % ROTATION_SECONDES)
+
+
+def decoder_code(code, now=None):
+    """
+    Vérifie un code rotatif.
+
+    Returns:
+        L'identifiant de la session si la signature correspond au créneau
+        courant ou à l'un des `TOLERANCE` précédents, sinon None.
+    """
+    code = code.strip().upper()
+    if not LONGUEUR_SIGNATURE < len(code) <= LONGUEUR_MAX or any(c not in ALPHABET for c in code):
+        return None
+    prefixe, signature = code[:-LONGUEUR_SIGNATURE], code[-LONGUEUR_SIGNATURE:]
+    session_id = int(prefixe, 36)
+
+    creneau = _creneau(now)
+    for decalage in range(TOLERANCE + 1):
+        if constant_time_compare(signature, _signature(session_id, creneau - decalage)):
+            return session_id
+    return None
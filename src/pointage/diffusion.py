@@ -0,0 +1,95 @@
+"""
+Diffusion en direct des pointages aux professeurs (Server-Sent Events).
+
+Chaque flux ouvert par un professeur s'abonne à sa session. Les pointages
+créés (tampon d'ingestion, signal post_save) sont poussés à tous les
+abonnés de la session depuis le thread qui les écrit, via la boucle asyncio
+de chaque flux. La diffusion se fait entièrement dans le processus : un
+professeur reçoit les pointages traités par le worker ASGI qui sert son flux.
+"""
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+
+class Abonnement:
+    """
+    File d'événements d'un flux, rattachée à la boucle asyncio qui la lit.
+    """
+
+    def __init__(self, session_id, taille_file):
+        self.session_id = session_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=taille_file)
+
+    def pousser(self, evenement):
+        """Appelable depuis n'importe quel thread."""
+        try:
+            self.loop.call_soon_threadsafe(self._ajouter, evenement)
+        except RuntimeError:
+            # Boucle fermée : le flux est terminé, il sera désabonné par son `finally`
+            pass
+
+    def _ajouter(self, evenement):
+        try:
+            self.queue.put_nowait(evenement)
+        except asyncio.QueueFull:
+            logger.warning(f"Flux de la session #{self.session_id} saturé, événement ignoré.")
+
+
+class DiffuseurPresences:
+    """
+    Registre des abonnements par session.
+    """
+
+    def __init__(self, taille_file=1000):
+        self.taille_file = taille_file
+        self._lock = threading.Lock()
+        self._abonnes = defaultdict(set)
+
+    def abonner(self, session_id):
+        """À appeler depuis la boucle asyncio du flux."""
+        abonnement = Abonnement(session_id, self.taille_file)
+        with self._lock:
+            self._abonnes[session_id].add(abonnement)
+        return abonnement
+
+    def desabonner(self, abonnement):
+        with self._lock:
+            abonnes = self._abonnes.get(abonnement.session_id)
+            if abonnes is not None:
+                abonnes.discard(abonnement)
+                if not abonnes:
+                    del self._abonnes[abonnement.session_id]
+
+    def publier(self, session_id, evenement):
+        with self._lock:
+            abonnes = list(self._abonnes.get(session_id, ()))
+        for abonnement in abonnes:
+            abonnement.pousser(evenement)
+
+    def publier_pointages(self, pointages):
+        """
+        Publie des pointages nouvellement créés.
+
+        Args:
+            pointages: itérable de (session_id, user_id, timestamp).
+        """
+        if not self._abonnes:
+            return
+        for session_id, user_id, timestamp in pointages:
+            self.publier(session_id, {
+                'type': 'pointage',
+                'user_id': user_id,
+                'timestamp': timestamp.isoformat(),
+            })
+
+    def nombre_abonnes(self):
+        with self._lock:
+            return sum(len(abonnes) for abonnes in self._abonnes.values())
+
+
+diffuseur_presences = DiffuseurPresences()
@@ -0,0 +1,91 @@
+"""
+Désactivation des sessions de présence expirées.
+
+Une session reste `is_active=True` tant que personne ne la désactive. Le
+balayeur passe `is_active` à False par UPDATE groupés dès que `end_time`
+est dépassé : l'ensemble des sessions actives (et les index partiels
+associés) reste petit quel que soit l'historique, et un code historique
+peut être réutilisé une fois sa session close.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .index import index_sessions
+from .models import SessionPresence
+
+logger = logging.getLogger(__name__)
+
+TAILLE_LOT = 5000
+
+
+def expirer_sessions(now=None, taille_lot=TAILLE_LOT):
+    """
+    Désactive les sessions dont `end_time` est passé, par lots de `taille_lot`.
+
+    Returns:
+        Le nombre de sessions désactivées.
+    """
+    now = now or timezone.now()
+    total = 0
+    while True:
+        ids = list(
+            SessionPresence.objects
+            .filter(is_active=True, end_time__lt=now)
+            .values_list('id', flat=True)[:taille_lot]
+        )
+        if not ids:
+            break
+        total += SessionPresence.objects.filter(id__in=ids, is_active=True).update(is_active=False)
+        if len(ids) < taille_lot:
+            break
+
+    index_sessions.purger(now)
+    if total:
+        logger.info(f"{total} session(s) de présence expirée(s) désactivée(s).")
+    return total
+
+
+class BalayeurSessions(threading.Thread):
+    """
+    Thread de fond qui appelle `expirer_sessions` toutes les `intervalle` secondes.
+    """
+
+    def __init__(self, intervalle):
+        self.intervalle = intervalle
+        threading.Thread.__init__(self, name='pointage-balayeur', daemon=True)
+
+    def run(self):
+        while True:
+            close_old_connections()
+            try:
+                expirer_sessions()
+            except Exception as e:
+                logger.error(f"Erreur lors de l'expiration des sessions : {e}")
+            finally:
+                close_old_connections()
+            time.sleep(self.intervalle)
+
+
+_balayeur = None
+_balayeur_lock = threading.Lock()
+
+
+def demarrer_balayeur():
+    """
+    Démarre le balayeur du processus s'il ne tourne pas encore.
+    Sans effet si `POINTAGE_EXPIRATION_INTERVALLE` vaut None (expiration par
+    la commande `expirer_sessions`, via cron par exemple).
+    """
+    global _balayeur
+    intervalle = getattr(settings, 'POINTAGE_EXPIRATION_INTERVALLE', 60)
+    if intervalle is None or (_balayeur is not None and _balayeur.is_alive()):
+        return
+    with _balayeur_lock:
+        if _balayeur is None or not _balayeur.is_alive():
+            _balayeur = BalayeurSessions(intervalle)
+            _balayeur.start()
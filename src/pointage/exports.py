@@ -0,0 +1,39 @@
+"""
+Export des pointages (voir `FaceLoad.exports`).
+"""
+from FaceLoad.exports import TAILLE_LOT
+
+from .models import Pointage
+
+ENTETES = [
+    'id', 'etudiant_id', 'nom', 'prenom', 'email', 'session_id', 'date', 'module', 'classe', 'timestamp',
+]
+
+
+def filtrer_pointages(pointages, filtre):
+    """
+    Restreint un queryset de pointages par classe, module et date du cours.
+    """
+    if filtre.get('classe'):
+        pointages = pointages.filter(session__planning__horaire__module__classe_id=filtre['classe'])
+    if filtre.get('module'):
+        pointages = pointages.filter(session__planning__horaire__module_id=filtre['module'])
+    if filtre.get('date_debut'):
+        pointages = pointages.filter(session__planning__date__gte=filtre['date_debut'])
+    if filtre.get('date_fin'):
+        pointages = pointages.filter(session__planning__date__lte=filtre['date_fin'])
+    return pointages
+
+
+def lignes_pointages(filtre):
+    """Une ligne par pointage, dans l'ordre chronologique, lue par lots de `TAILLE_LOT`."""
+    return (
+        filtrer_pointages(Pointage.objects.all(), filtre)
+        .order_by('timestamp', 'id')
+        .values_list(
+            'id', 'user_id', 'user__last_name', 'user__first_name', 'user__email', 'session_id',
+            'session__planning__date', 'session__planning__horaire__module__name',
+            'session__planning__horaire__module__classe__name', 'timestamp',
+        )
+        .iterator(chunk_size=TAILLE_LOT)
+    )
@@ -0,0 +1,120 @@
+"""
+Vérification de la distance étudiant / salle de cours.
+
+À l'échelle d'une salle (une centaine de mètres), une projection
+équirectangulaire locale centrée sur la position du professeur est
+précise au centimètre près : on précalcule le nombre de mètres par degré
+de latitude et de longitude (ellipsoïde WGS84) à la création de la session,
+puis chaque pointage se résume à deux soustractions et deux multiplications.
+Le calcul géodésique exact (geopy) n'est refait que dans une fine bande
+autour du rayon, là où l'approximation pourrait changer la réponse.
+"""
+import math
+
+from django.conf import settings
+from geopy.distance import geodesic
+
+
+RAYON_PAR_DEFAUT = getattr(settings, 'POINTAGE_RAYON_METRES', 100)
+
+# Largeur relative de la bande autour du rayon où l'on revient au calcul exact
+MARGE_PAR_DEFAUT = 0.02
+
+
+def metres_par_degre(latitude):
+    """Longueur d'un degré de latitude et de longitude (en mètres) à cette latitude, sur WGS84."""
+    phi = math.radians(latitude)
+    par_degre_lat = (
+        111132.92
+        - 559.82 * math.cos(2 * phi)
+        + 1.175 * math.cos(4 * phi)
+        - 0.0023 * math.cos(6 * phi)
+    )
+    par_degre_lon = (
+        111412.84 * math.cos(phi)
+        - 93.5 * math.cos(3 * phi)
+        + 0.118 * math.cos(5 * phi)
+    )
+    return par_degre_lat, par_degre_lon
+
+
+class Geofence:
+    """
+    Disque de `rayon` mètres autour d'un point, avec ses constantes de projection précalculées.
+    """
+    __slots__ = (
+        'latitude', 'longitude', 'rayon',
+        'par_degre_lat', 'par_degre_lon',
+        'delta_lat_max', 'delta_lon_max',
+        'interieur2', 'exterieur2',
+    )
+
+    def __init__(self, latitude, longitude, rayon=RAYON_PAR_DEFAUT, marge=MARGE_PAR_DEFAUT):
+        self.latitude = latitude
+        self.longitude = longitude
+        self.rayon = rayon
+        self.par_degre_lat, self.par_degre_lon = metres_par_degre(latitude)
+
+        # Boîte englobante (marge comprise) : tout point hors de la boîte est dehors
+        exterieur = rayon * (1 + marge)
+        self.delta_lat_max = exterieur / self.par_degre_lat
+        self.delta_lon_max = exterieur / max(self.par_degre_lon, 1e-9)
+
+        # Carrés des bornes de la bande d'incertitude, pour éviter la racine carrée
+        self.interieur2 = (rayon * (1 - marge)) ** 2
+        self.exterieur2 = exterieur ** 2
+
+    def _deltas(self, latitude, longitude):
+        delta_lat = latitude - self.latitude
+        # Ramène l'écart de longitude dans [-180, 180[ (passage de l'antiméridien)
+        delta_lon = (longitude - self.longitude + 180) % 360 - 180
+        return delta_lat, delta_lon
+
+    def contient(self, latitude, longitude):
+        """
+        Indique si le point est dans le rayon.
+
+        Returns:
+            (True/False, distance approximative en mètres)
+        """
+        delta_lat, delta_lon = self._deltas(latitude, longitude)
+        dy = delta_lat * self.par_degre_lat
+        dx = delta_lon * self.par_degre_lon
+        if abs(delta_lat) > self.delta_lat_max or abs(delta_lon) > self.delta_lon_max:
+            return False, math.hypot(dx, dy)
+
+        distance2 = dx * dx + dy * dy
+        if distance2 <= self.interieur2:
+            return True, math.sqrt(distance2)
+        if distance2 > self.exterieur2:
+            return False, math.sqrt(distance2)
+
+        # Proche du bord : on tranche avec la distance géodésique exacte
+        distance = geodesic((latitude, longitude), (self.latitude, self.longitude)).meters
+        return distance <= self.rayon, distance
+
+    def contient_lot(self, latitudes, longitudes):
+        """
+        Version vectorisée (NumPy) de `contient` pour un lot de coordonnées.
+
+        Returns:
+            (tableau de booléens, tableau des distances en mètres)
+        """
+        import numpy as np
+
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+
+        dy = (latitudes - self.latitude) * self.par_degre_lat
+        dx = ((longitudes - self.longitude + 180) % 360 - 180) * self.par_degre_lon
+        distance2 = dx * dx + dy * dy
+
+        distances = np.sqrt(distance2)
+        dedans = distance2 <= self.interieur2
+
+        bande = np.flatnonzero((distance2 > self.interieur2) & (distance2 <= self.exterieur2))
+        for i in bande:
+            distances[i] = geodesic((latitudes[i], longitudes[i]), (self.latitude, self.longitude)).meters
+            dedans[i] = distances[i] <= self.rayon
+
+        return dedans, distances
@@ -0,0 +1,155 @@
+"""
+Validation par lot des pointages collectés hors ligne.
+
+Un téléphone d'étudiant ou l'appareil d'un professeur enregistre les
+scans (code, position, horodatage, étudiant) sans réseau puis les envoie
+en une seule requête. Tout le lot est traité en une passe : une requête
+pour les sessions, une pour les classes des étudiants, un contrôle de
+distance vectorisé par session et une seule insertion groupée.
+
+L'horodatage d'un pointage vient du client : il n'est cru que dans des
+limites fixées par l'heure de réception du serveur. Un lot envoyé par un
+étudiant doit arriver avant la fin de la session ; celui d'un professeur
+(appareil resté hors ligne pendant le cours) au plus
+`POINTAGE_HORS_LIGNE_DELAI_MINUTES` après la fin de la session.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from users.models import User
+
+from .codes import decoder_code
+from .geofence import Geofence
+from .ingestion import inserer_pointages
+from .models import SessionPresence
+
+# Avance d'horloge tolérée pour un horodatage envoyé par un téléphone
+DECALAGE_HORLOGE_MAX = timedelta(minutes=2)
+
+# Délai après la fin d'une session pendant lequel l'appareil d'un professeur peut encore envoyer ses pointages
+DELAI_ENVOI_MAX = timedelta(minutes=getattr(settings, 'POINTAGE_HORS_LIGNE_DELAI_MINUTES', 60))
+
+CREE = 'cree'
+DEJA_ENREGISTRE = 'deja_enregistre'
+REFUSE = 'refuse'
+
+
+def _resoudre_sessions(pointages):
+    """
+    Associe à chaque pointage la session dont le code et la période correspondent
+    (sessions actives ou déjà expirées), en une requête.
+    """
+    session_ids = {}
+    codes_historiques = set()
+    for i, pointage in enumerate(pointages):
+        session_id = decoder_code(pointage['code'], pointage['timestamp'].timestamp())
+        if session_id is not None:
+            session_ids[i] = session_id
+        else:
+            codes_historiques.add(pointage['code'])
+
+    debut = min(pointage['timestamp'] for pointage in pointages)
+    fin = max(pointage['timestamp'] for pointage in pointages)
+    sessions = list(
+        SessionPresence.objects
+        .select_related('planning__horaire__module')
+        .filter(
+            Q(id__in=set(session_ids.values()))
+            | Q(code__in=codes_historiques, start_time__lte=fin, end_time__gte=debut)
+        )
+    )
+    par_id = {session.id: session for session in sessions}
+    par_code = defaultdict(list)
+    for session in sessions:
+        par_code[session.code].append(session)
+
+    resolues = []
+    for i, pointage in enumerate(pointages):
+        if i in session_ids:
+            resolues.append(par_id.get(session_ids[i]))
+            continue
+        # Un code historique peut avoir servi à plusieurs sessions successives
+        resolues.append(next(
+            (s for s in par_code.get(pointage['code'], ()) if s.start_time <= pointage['timestamp'] <= s.end_time),
+            None
+        ))
+    return resolues
+
+
+def valider_pointages_hors_ligne(pointages, demandeur, est_professeur):
+    """
+    Args:
+        pointages: Liste de dictionnaires validés (code, latitude, longitude, timestamp, user).
+        demandeur: L'utilisateur qui envoie le lot.
+        est_professeur: True si le lot vient de l'appareil d'un professeur, qui peut
+            pointer pour les étudiants de ses propres sessions. Sinon chaque pointage
+            est celui du demandeur.
+
+    Returns:
+        Une liste de résultats, dans l'ordre des pointages reçus.
+    """
+    if not pointages:
+        return []
+
+    now = timezone.now()
+    resultats = [{'index': i, 'statut': None} for i in range(len(pointages))]
+    sessions = _resoudre_sessions(pointages)
+
+    def refuser(i, erreur):
+        resultats[i]['statut'] = REFUSE
+        resultats[i]['error'] = erreur
+
+    user_ids = [pointage.get('user') if est_professeur else demandeur.id for pointage in pointages]
+    classes = dict(User.objects.filter(id__in={u for u in user_ids if u}).values_list('id', 'classe_id'))
+
+    # Contrôles sans lecture supplémentaire, puis regroupement par session pour le calcul de distance
+    par_session = defaultdict(list)
+    for i, (pointage, session, user_id) in enumerate(zip(pointages, sessions, user_ids)):
+        if session is None:
+            refuser(i, 'Code de session invalide ou expiré.')
+        elif est_professeur and session.planning.user_id != demandeur.id:
+            refuser(i, 'Vous n\'etes pas autorise a pointer pour ce cours.')
+        elif not (session.start_time <= pointage['timestamp'] <= session.end_time) or pointage['timestamp'] > now + DECALAGE_HORLOGE_MAX:
+            refuser(i, 'Pointage en dehors de la période de la session.')
+        elif not est_professeur and now > session.end_time:
+            # Un code partagé ou une capture d'écran ne peut pas servir après le cours
+            refuser(i, 'La session est terminée : pointage hors ligne refusé.')
+        elif now > session.end_time + DELAI_ENVOI_MAX:
+            refuser(i, 'Pointage envoyé trop longtemps après la fin de la session.')
+        elif user_id not in classes:
+            refuser(i, 'Étudiant inconnu.')
+        elif not session.planning.module or not session.planning.module.classe_id:
+            refuser(i, 'Impossible de vérifier la classe pour ce cours.')
+        elif classes[user_id] != session.planning.module.classe_id:
+            refuser(i, 'Vous n\'etes pas inscrit a ce cours.')
+        else:
+            par_session[session.id].append(i)
+
+    acceptes = []
+    for session_id, indices in par_session.items():
+        session = sessions[indices[0]]
+        geofence = Geofence(session.latitude, session.longitude)
+        dedans, distances = geofence.contient_lot(
+            [pointages[i]['latitude'] for i in indices],
+            [pointages[i]['longitude'] for i in indices],
+        )
+        for i, ok, distance in zip(indices, dedans, distances):
+            if ok:
+                acceptes.append(i)
+            else:
+                refuser(i, 'Vous êtes trop loin de la salle de classe.')
+                resultats[i]['distance_meters'] = round(float(distance))
+
+    # Une seule insertion groupée pour tout le lot
+    crees = inserer_pointages((sessions[i].id, user_ids[i]) for i in acceptes)
+    vues = set()
+    for i in acceptes:
+        paire = (sessions[i].id, user_ids[i])
+        resultats[i]['statut'] = CREE if crees[paire] and paire not in vues else DEJA_ENREGISTRE
+        vues.add(paire)
+
+    return resultats
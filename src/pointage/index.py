@@ -0,0 +1,223 @@
+"""
+Index en mémoire des sessions de présence actives.
+
+Chaque session ouverte par un professeur est enregistrée ici à sa création,
+avec tout ce qu'il faut pour valider un pointage (coordonnées, heure de fin,
+classe attendue). Un pointage étudiant peut ainsi être validé sans aucune
+lecture en base avant l'insertion finale.
+
+L'index est local au processus. Si `POINTAGE_INDEX_CACHE` désigne un alias
+de `CACHES` (Redis, Memcached...), les entrées y sont aussi copiées pour que
+les autres workers puissent les retrouver sans passer par la base.
+"""
+import threading
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from .codes import decoder_code
+from .geofence import Geofence
+from .models import SessionPresence
+
+
+CACHE_KEY_PREFIX = 'pointage:session:'
+
+
+class SessionActive:
+    """
+    Instantané d'une session de présence ouverte, avec son geofence précalculé.
+    """
+    __slots__ = ('id', 'code', 'planning_id', 'classe_id', 'latitude', 'longitude', 'end_time', 'geofence')
+    champs = ('id', 'code', 'planning_id', 'classe_id', 'latitude', 'longitude', 'end_time')
+
+    def __init__(self, id, code, planning_id, classe_id, latitude, longitude, end_time):
+        self.id = id
+        self.code = code
+        self.planning_id = planning_id
+        self.classe_id = classe_id
+        self.latitude = latitude
+        self.longitude = longitude
+        self.end_time = end_time
+        self.geofence = Geofence(latitude, longitude)
+
+    @classmethod
+    def depuis_session(cls, session, classe_id):
+        return cls(
+            id=session.id,
+            code=session.code,
+            planning_id=session.planning_id,
+            classe_id=classe_id,
+            latitude=session.latitude,
+            longitude=session.longitude,
+            end_time=session.end_time,
+        )
+
+    @classmethod
+    def depuis_dict(cls, data):
+        data = dict(data)
+        data['end_time'] = datetime.fromisoformat(data['end_time'])
+        return cls(**data)
+
+    def to_dict(self):
+        data = {name: getattr(self, name) for name in self.champs}
+        data['end_time'] = self.end_time.isoformat()
+        return data
+
+    def est_expiree(self, now=None):
+        return self.end_time < (now or timezone.now())
+
+
+class IndexSessionsActives:
+    """
+    Sessions actives indexées par identifiant (codes rotatifs) et par code
+    historique, protégées par un verrou (les vues peuvent tourner dans
+    plusieurs threads).
+    """
+
+    def __init__(self, cache_alias=None):
+        self.cache_alias = cache_alias
+        self._lock = threading.Lock()
+        self._par_id = {}
+        self._id_par_code = {}
+
+    @property
+    def _cache(self):
+        return caches[self.cache_alias] if self.cache_alias else None
+
+    def ajouter(self, entree, now=None):
+        now = now or timezone.now()
+        with self._lock:
+            self._purger(now)
+            self._par_id[entree.id] = entree
+            self._id_par_code[entree.code] = entree.id
+
+        cache = self._cache
+        if cache is not None:
+            timeout = max(int((entree.end_time - now).total_seconds()) + 1, 1)
+            cache.set_many({
+                f"{CACHE_KEY_PREFIX}{entree.id}": entree.to_dict(),
+                f"{CACHE_KEY_PREFIX}code:{entree.code}": entree.id,
+            }, timeout)
+
+    def obtenir(self, code, now=None):
+        """
+        Retourne la session active pour ce code historique, ou None si elle est
+        inconnue ou expirée.
+        """
+        with self._lock:
+            session_id = self._id_par_code.get(code)
+        if session_id is None:
+            cache = self._cache
+            if cache is None:
+                return None
+            session_id = cache.get(f"{CACHE_KEY_PREFIX}code:{code}")
+            if session_id is None:
+                return None
+        return self.obtenir_par_id(session_id, now)
+
+    def obtenir_par_id(self, session_id, now=None):
+        """
+        Retourne la session active pour cet identifiant, ou None si elle est
+        inconnue ou expirée. Une entrée expirée est retirée au passage.
+        """
+        now = now or timezone.now()
+        with self._lock:
+            entree = self._par_id.get(session_id)
+            if entree is not None and entree.est_expiree(now):
+                self._retirer(entree)
+                return None
+        if entree is not None:
+            return entree
+
+        cache = self._cache
+        if cache is None:
+            return None
+        data = cache.get(f"{CACHE_KEY_PREFIX}{session_id}")
+        if data is None:
+            return None
+        entree = SessionActive.depuis_dict(data)
+        if entree.est_expiree(now):
+            return None
+        with self._lock:
+            self._par_id[entree.id] = entree
+            self._id_par_code[entree.code] = entree.id
+        return entree
+
+    def retirer(self, session_id):
+        with self._lock:
+            entree = self._par_id.get(session_id)
+            if entree is not None:
+                self._retirer(entree)
+        cache = self._cache
+        if cache is not None:
+            keys = [f"{CACHE_KEY_PREFIX}{session_id}"]
+            if entree is not None:
+                keys.append(f"{CACHE_KEY_PREFIX}code:{entree.code}")
+            cache.delete_many(keys)
+
+    def purger(self, now=None):
+        with self._lock:
+            return self._purger(now or timezone.now())
+
+    def vider(self):
+        with self._lock:
+            self._par_id.clear()
+            self._id_par_code.clear()
+
+    def _retirer(self, entree):
+        self._par_id.pop(entree.id, None)
+        if self._id_par_code.get(entree.code) == entree.id:
+            del self._id_par_code[entree.code]
+
+    def _purger(self, now):
+        expirees = [entree for entree in self._par_id.values() if entree.est_expiree(now)]
+        for entree in expirees:
+            self._retirer(entree)
+        return len(expirees)
+
+    def __len__(self):
+        return len(self._par_id)
+
+
+index_sessions = IndexSessionsActives(getattr(settings, 'POINTAGE_INDEX_CACHE', None))
+
+
+def indexer_session(session, classe_id):
+    """Ajoute une session fraîchement créée à l'index."""
+    entree = SessionActive.depuis_session(session, classe_id)
+    index_sessions.ajouter(entree)
+    return entree
+
+
+def trouver_session_active(code, now=None):
+    """
+    Cherche la session active correspondant au code, rotatif ou historique :
+    d'abord dans l'index, puis en base (une seule requête) pour les sessions
+    créées par un autre processus ou avant un redémarrage.
+    """
+    now = now or timezone.now()
+    session_id = decoder_code(code, now.timestamp())
+    if session_id is not None:
+        entree = index_sessions.obtenir_par_id(session_id, now)
+        filtre = {'id': session_id}
+    else:
+        entree = index_sessions.obtenir(code, now)
+        filtre = {'code': code}
+    if entree is not None:
+        return entree
+
+    session = (
+        SessionPresence.objects
+        .select_related('planning__horaire__module')
+        .filter(is_active=True, end_time__gte=now, **filtre)
+        .first()
+    )
+    if session is None:
+        return None
+
+    module = session.planning.module
+    entree = SessionActive.depuis_session(session, module.classe_id if module else None)
+    index_sessions.ajouter(entree, now)
+    return entree
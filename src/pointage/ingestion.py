@@ -0,0 +1,221 @@
+"""
+Ingestion des pointages par micro-lots.
+
+Les pointages acceptés par `ValidatePresenceView` sont placés dans une file.
+Un thread dédié les vide par lots avec un seul
+`INSERT … ON CONFLICT DO NOTHING RETURNING` : la base renvoie les couples
+qu'elle vient réellement d'insérer. Chaque requête HTTP attend la fin de son
+lot et peut donc répondre définitivement "créé" ou "déjà enregistré", sans
+risque d'IntegrityError quand deux essais du même étudiant arrivent en même
+temps.
+
+Une demande encore en file à l'expiration du délai d'attente en est retirée
+(`TimeoutError`, rien n'est écrit) ; une demande dont le lot est déjà en
+cours d'écriture n'est plus annulable et lève `PointageEnAttente`.
+
+L'insertion et les abonnés du signal `pointages_crees` (compteurs de
+présence...) s'exécutent dans une même transaction : un échec ne laisse pas
+de pointages sans leurs compteurs.
+"""
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .diffusion import diffuseur_presences
+from .models import Pointage
+from .signals import pointages_crees
+
+logger = logging.getLogger(__name__)
+
+# Couples par INSERT (3 paramètres chacun, sous les limites de PostgreSQL et SQLite)
+TAILLE_INSERTION = 1000
+
+
+def _inserer(paires, timestamp):
+    """
+    INSERT … ON CONFLICT DO NOTHING RETURNING : la base indique elle-même les
+    lignes qu'elle vient d'insérer, ce qui est exact même quand un autre
+    écrivain insère le même couple au même instant.
+
+    Returns:
+        L'ensemble des (session_id, user_id) insérés.
+    """
+    table = connection.ops.quote_name(Pointage._meta.db_table)
+    colonnes = [connection.ops.quote_name(Pointage._meta.get_field(nom).column) for nom in ('session', 'user', 'timestamp')]
+    horodatage = Pointage._meta.get_field('timestamp').get_db_prep_value(timestamp, connection)
+    valeurs = ', '.join(['(%s, %s, %s)'] * len(paires))
+    parametres = [valeur for session_id, user_id in paires for valeur in (session_id, user_id, horodatage)]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({', '.join(colonnes)}) VALUES {valeurs} "
+            f"ON CONFLICT ({colonnes[0]}, {colonnes[1]}) DO NOTHING "
+            f"RETURNING {colonnes[0]}, {colonnes[1]}",
+            parametres,
+        )
+        return {tuple(ligne) for ligne in cursor.fetchall()}
+
+
+def inserer_pointages(paires):
+    """
+    Insère les pointages (session_id, user_id) en une seule requête, en ignorant
+    ceux qui existent déjà.
+
+    Returns:
+        Un dictionnaire {(session_id, user_id): True si créé par cet appel, False sinon}.
+    """
+    paires = list(dict.fromkeys(paires))
+    if not paires:
+        return {}
+
+    timestamp = timezone.now()
+    with transaction.atomic():
+        crees = set()
+        for i in range(0, len(paires), TAILLE_INSERTION):
+            crees |= _inserer(paires[i:i + TAILLE_INSERTION], timestamp)
+        resultats = {paire: paire in crees for paire in paires}
+
+        # L'INSERT brut n'envoie pas post_save : les autres applications s'abonnent à
+        # `pointages_crees`, et on prévient nous-mêmes les flux des professeurs
+        nouveaux = [(session_id, user_id, timestamp) for session_id, user_id in paires if (session_id, user_id) in crees]
+        if nouveaux:
+            pointages_crees.send(sender=Pointage, paires=[(session_id, user_id) for session_id, user_id, _ in nouveaux])
+            transaction.on_commit(lambda: diffuseur_presences.publier_pointages(nouveaux))
+    return resultats
+
+
+class PointageEnAttente(Exception):
+    """Le lot du pointage est en cours d'écriture mais n'a pas fini dans le délai."""
+
+
+class DemandePointage:
+    """
+    Un pointage en attente dans la file, avec l'événement sur lequel la requête HTTP attend.
+    `etat` : EN_FILE, puis ECRITURE (pris dans un lot) ou ANNULEE (délai dépassé avant).
+    """
+    __slots__ = ('session_id', 'user_id', 'created', 'error', 'event', 'etat')
+
+    def __init__(self, session_id, user_id):
+        self.session_id = session_id
+        self.user_id = user_id
+        self.created = None
+        self.error = None
+        self.event = threading.Event()
+        self.etat = 'EN_FILE'
+
+
+class TamponPointages:
+    """
+    File de pointages vidée par un thread de fond, par lots d'au plus
+    `taille_lot` éléments ou toutes les `delai` secondes.
+    """
+
+    def __init__(self, taille_lot=200, delai=0.02, timeout=10):
+        self.taille_lot = taille_lot
+        self.delai = delai
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        # Protège les changements d'état des demandes (annulation / prise dans un lot)
+        self._lock_etat = threading.Lock()
+        self._thread = None
+
+    def enregistrer(self, session_id, user_id):
+        """
+        Met le pointage en file et attend l'écriture de son lot.
+
+        Returns:
+            True si le pointage a été créé, False s'il existait déjà.
+
+        Raises:
+            TimeoutError: Le pointage a été retiré de la file sans être écrit.
+            PointageEnAttente: Le pointage est en cours d'écriture (il sera enregistré).
+        """
+        demande = DemandePointage(session_id, user_id)
+        self._demarrer()
+        self._queue.put(demande)
+
+        if not demande.event.wait(self.timeout):
+            with self._lock_etat:
+                annulee = demande.etat == 'EN_FILE'
+                if annulee:
+                    demande.etat = 'ANNULEE'
+            if annulee:
+                raise TimeoutError("Le pointage n'a pas pu être enregistré à temps.")
+            # Déjà pris dans un lot : on laisse une seconde chance à l'écriture
+            if not demande.event.wait(self.timeout):
+                raise PointageEnAttente("Le pointage est en cours d'enregistrement.")
+        if demande.error is not None:
+            raise demande.error
+        return demande.created
+
+    def _demarrer(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='pointage-tampon', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            lot = [self._queue.get()]
+            limite = time.monotonic() + self.delai
+            while len(lot) < self.taille_lot:
+                restant = limite - time.monotonic()
+                if restant <= 0:
+                    break
+                try:
+                    lot.append(self._queue.get(timeout=restant))
+                except queue.Empty:
+                    break
+            self._vider(lot)
+
+    def _vider(self, lot):
+        with self._lock_etat:
+            lot = [demande for demande in lot if demande.etat != 'ANNULEE']
+            for demande in lot:
+                demande.etat = 'ECRITURE'
+        if not lot:
+            return
+        close_old_connections()
+        try:
+            resultats = inserer_pointages((d.session_id, d.user_id) for d in lot)
+        except Exception as e:
+            logger.error(f"Échec de l'écriture d'un lot de {len(lot)} pointage(s) : {e}")
+            for demande in lot:
+                demande.error = e
+        else:
+            # Un même étudiant peut apparaître deux fois dans un lot (double envoi) :
+            # seule la première demande est considérée comme la création.
+            vues = set()
+            for demande in lot:
+                paire = (demande.session_id, demande.user_id)
+                demande.created = resultats[paire] and paire not in vues
+                vues.add(paire)
+        finally:
+            for demande in lot:
+                demande.event.set()
+
+
+_config = getattr(settings, 'POINTAGE_TAMPON', {})
+tampon_pointages = TamponPointages(
+    taille_lot=_config.get('TAILLE_LOT', 200),
+    delai=_config.get('DELAI', 0.02),
+    timeout=_config.get('TIMEOUT', 10),
+)
+
+
+def enregistrer_pointage(session_id, user_id):
+    """
+    Enregistre un pointage et retourne True s'il vient d'être créé.
+    Passe par le tampon si `POINTAGE_TAMPON['ACTIF']`, sinon écrit directement
+    (utile pour les tests, dont la transaction n'est pas visible d'un autre thread).
+    """
+    if _config.get('ACTIF', True):
+        return tampon_pointages.enregistrer(session_id, user_id)
+    return inserer_pointages([(session_id, user_id)])[(session_id, user_id)]
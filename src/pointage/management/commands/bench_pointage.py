@@ -0,0 +1,50 @@
+import random
+
+from django.core.management.base import BaseCommand
+
+from pointage.bench import JeuDeDonnees, executer_en_parallele, resumer
+from pointage.ingestion import TamponPointages
+from pointage.models import Pointage
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare l'écriture des pointages par get_or_create (chemin historique) "
+        "et par micro-lots bulk_create(ignore_conflicts=True), pour N étudiants simultanés."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--etudiants', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=50,
+                            help="Threads simulant les workers du serveur (connexions simultanées à la base).")
+        parser.add_argument('--doublons', type=float, default=0.1,
+                            help="Part des étudiants qui renvoient leur pointage (double clic, nouvel essai réseau).")
+        parser.add_argument('--taille-lot', type=int, default=200)
+        parser.add_argument('--delai', type=float, default=0.02)
+
+    def handle(self, *args, **options):
+        donnees = JeuDeDonnees(options['etudiants']).creer()
+        try:
+            session_id = donnees.session.id
+            user_ids = [etudiant.id for etudiant in donnees.etudiants]
+            envois = user_ids + random.sample(user_ids, int(len(user_ids) * options['doublons']))
+            random.shuffle(envois)
+
+            def chemin_historique(user_id):
+                Pointage.objects.get_or_create(session_id=session_id, user_id=user_id)
+
+            tampon = TamponPointages(taille_lot=options['taille_lot'], delai=options['delai'])
+
+            def chemin_tampon(user_id):
+                tampon.enregistrer(session_id, user_id)
+
+            self.stdout.write(
+                f"{len(envois)} pointages ({len(user_ids)} étudiants), {options['workers']} workers"
+            )
+            for nom, fonction in (('get_or_create', chemin_historique), ('tampon bulk_create', chemin_tampon)):
+                Pointage.objects.filter(session_id=session_id).delete()
+                latences, erreurs, duree = executer_en_parallele(fonction, envois, options['workers'])
+                enregistres = Pointage.objects.filter(session_id=session_id).count()
+                self.stdout.write(resumer(nom, latences, erreurs, duree) + f"  lignes={enregistres}")
+        finally:
+            donnees.supprimer()
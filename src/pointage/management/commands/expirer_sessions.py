@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from pointage.expiration import expirer_sessions
+
+
+class Command(BaseCommand):
+    help = "Désactive les sessions de présence dont l'heure de fin est dépassée."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--intervalle', type=int, default=None,
+                            help="Relance l'expiration toutes les N secondes au lieu d'une seule passe.")
+
+    def handle(self, *args, **options):
+        while True:
+            total = expirer_sessions()
+            self.stdout.write(f"{total} session(s) désactivée(s).")
+            if options['intervalle'] is None:
+                return
+            time.sleep(options['intervalle'])
@@ -0,0 +1,155 @@
+import random
+import threading
+from collections import Counter
+from datetime import time
+from types import SimpleNamespace
+
+from django.db import connection
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from pointage.bench import CompteurRequetes, JeuDeDonnees, executer_en_parallele, percentile, resumer
+from users.permissions import IsProfessor, IsStudent
+
+# Le cours de test finit au plus tard à 23:59 et la session doit être lancée
+# au moins 30 minutes avant la fin (CreateSessionPresenceView)
+HEURE_LIMITE = time(23, 29)
+
+
+class Scenario:
+    """
+    Résultats d'une phase : codes HTTP et requêtes SQL par appel.
+    """
+
+    def __init__(self, nom):
+        self.nom = nom
+        self.statuts = Counter()
+        self.requetes = []
+        self._lock = threading.Lock()
+
+    def enregistrer(self, statut, requetes):
+        with self._lock:
+            self.statuts[statut] += 1
+            self.requetes.append(requetes)
+
+
+class Command(BaseCommand):
+    help = (
+        "Test de charge des pointages : crée des classes, étudiants et plannings de test, "
+        "lance les sessions via CreateSessionPresenceView puis fait pointer tous les étudiants "
+        "en parallèle via ValidatePresenceView (client de test Django, sans service externe)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--classes', type=int, default=5)
+        parser.add_argument('--etudiants', type=int, default=100, help="Étudiants par classe.")
+        parser.add_argument('--workers', type=int, default=50,
+                            help="Requêtes traitées simultanément (workers du serveur).")
+        parser.add_argument('--code', choices=['rotatif', 'historique'], default='rotatif')
+        parser.add_argument('--hors-zone', type=float, default=0.05,
+                            help="Part des étudiants qui pointent loin de la salle (refus attendu).")
+        parser.add_argument('--doublons', type=float, default=0.05,
+                            help="Part des étudiants qui renvoient leur pointage.")
+
+    def handle(self, *args, **options):
+        if timezone.localtime().time() > HEURE_LIMITE:
+            raise CommandError(
+                f"Après {HEURE_LIMITE:%H:%M}, aucun cours de test ne peut finir 30 minutes plus tard "
+                f"le même jour : les sessions seraient refusées. Relancez après minuit."
+            )
+
+        jeux = []
+        try:
+            for _ in range(options['classes']):
+                jeux.append(JeuDeDonnees(options['etudiants'], avec_session=False).creer())
+            self._verifier_roles(jeux[0])
+            self.stdout.write(
+                f"{len(jeux)} classe(s) x {options['etudiants']} étudiant(s), {options['workers']} workers"
+            )
+
+            codes = self._lancer_sessions(jeux, options)
+            self._pointer(jeux, codes, options)
+        finally:
+            for jeu in jeux:
+                jeu.supprimer()
+
+    def _verifier_roles(self, jeu):
+        """Arrête le test avant la charge si les permissions refusent les rôles des données de test."""
+        for permission, user in ((IsProfessor(), jeu.professeur), (IsStudent(), jeu.etudiants[0])):
+            try:
+                accepte = permission.has_permission(SimpleNamespace(user=user), None)
+            except Exception as e:
+                raise CommandError(f"{type(permission).__name__} échoue sur les données de test : {e}")
+            if not accepte:
+                raise CommandError(
+                    f"{type(permission).__name__} refuse {user.email} (rôle {user.role.name}) : "
+                    f"toutes les requêtes seraient rejetées."
+                )
+
+    def _appeler(self, scenario, user, methode, url, data):
+        client = APIClient(SERVER_NAME='localhost', raise_request_exception=False)
+        client.force_authenticate(user=user)
+        compteur = CompteurRequetes()
+        with connection.execute_wrapper(compteur):
+            reponse = getattr(client, methode)(url, data, format='json')
+        scenario.enregistrer(reponse.status_code, compteur.total)
+        if reponse.status_code >= 500:
+            raise RuntimeError(f"{url} a répondu {reponse.status_code}")
+        return reponse
+
+    def _lancer_sessions(self, jeux, options):
+        scenario = Scenario('CreateSessionPresence')
+        codes = {}
+
+        def lancer(jeu):
+            reponse = self._appeler(scenario, jeu.professeur, 'post', '/api/v1/session/create/', {
+                'planning_id': jeu.planning.id,
+                'latitude': jeu.latitude,
+                'longitude': jeu.longitude,
+            })
+            if reponse.status_code == 201:
+                codes[jeu.prefixe] = reponse.data['code_rotatif' if options['code'] == 'rotatif' else 'code']
+
+        latences, erreurs, duree = executer_en_parallele(lancer, jeux, options['workers'])
+        self._rapport(scenario, latences, erreurs, duree)
+
+        # Les classes dont la session n'a pas pu être lancée par l'API pointent quand même
+        for jeu in jeux:
+            if jeu.prefixe not in codes:
+                codes[jeu.prefixe] = jeu.creer_session().code
+        return codes
+
+    def _pointer(self, jeux, codes, options):
+        scenario = Scenario('ValidatePresence')
+        envois = []
+        for jeu in jeux:
+            for etudiant in jeu.etudiants:
+                loin = random.random() < options['hors_zone']
+                ecart = 0.01 if loin else 0.0004
+                envoi = (jeu, etudiant, {
+                    'code': codes[jeu.prefixe],
+                    'latitude': jeu.latitude + random.uniform(-ecart, ecart),
+                    'longitude': jeu.longitude + random.uniform(-ecart, ecart),
+                })
+                envois.append(envoi)
+                if random.random() < options['doublons']:
+                    envois.append(envoi)
+        random.shuffle(envois)
+
+        def pointer(envoi):
+            _, etudiant, data = envoi
+            self._appeler(scenario, etudiant, 'post', '/api/v1/validate/', data)
+
+        latences, erreurs, duree = executer_en_parallele(pointer, envois, options['workers'])
+        self._rapport(scenario, latences, erreurs, duree)
+
+    def _rapport(self, scenario, latences, erreurs, duree):
+        self.stdout.write(resumer(scenario.nom, latences, erreurs, duree))
+        if scenario.requetes:
+            self.stdout.write(
+                f"{'':<24} requêtes SQL par appel : moyenne={sum(scenario.requetes) / len(scenario.requetes):.1f}  "
+                f"p99={percentile(scenario.requetes, 99)}  max={max(scenario.requetes)}"
+                f"  (hors écritures du tampon, thread séparé)"
+            )
+        self.stdout.write(f"{'':<24} codes HTTP : {dict(sorted(scenario.statuts.items()))}")
@@ -0,0 +1,151 @@
+import asyncio
+import json
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework_simplejwt.tokens import AccessToken
+
+from pointage.bench import JeuDeDonnees, percentile
+from pointage.ingestion import inserer_pointages
+
+
+class StatistiquesFlux:
+    def __init__(self):
+        self.statuts = []
+        self.temps_liste = []
+        self.latences = []
+        self.evenements = 0
+        self.erreurs = []
+
+
+class Command(BaseCommand):
+    help = (
+        "Ouvre N flux de présences simultanés (SSE) directement sur l'application ASGI, "
+        "fait pointer les étudiants d'une session de test et mesure la diffusion."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--flux', type=int, default=200, help="Nombre de flux professeurs simultanés.")
+        parser.add_argument('--etudiants', type=int, default=100)
+        parser.add_argument('--intervalle', type=float, default=0.01,
+                            help="Secondes entre deux pointages injectés.")
+        parser.add_argument('--timeout', type=float, default=60)
+
+    def handle(self, *args, **options):
+        donnees = JeuDeDonnees(options['etudiants']).creer()
+        try:
+            token = str(AccessToken.for_user(donnees.professeur))
+            stats = asyncio.run(self._executer(donnees, token, options))
+        finally:
+            donnees.supprimer()
+
+        attendus = options['flux'] * options['etudiants']
+        ouverts = stats.statuts.count(200)
+        self.stdout.write(
+            f"flux ouverts      {ouverts}/{options['flux']} "
+            f"(statuts: {sorted(set(stats.statuts))}, erreurs: {len(stats.erreurs)})"
+        )
+        self.stdout.write(
+            f"liste initiale    p50={percentile(stats.temps_liste, 50) * 1000:.1f} ms  "
+            f"p99={percentile(stats.temps_liste, 99) * 1000:.1f} ms"
+        )
+        self.stdout.write(f"événements reçus  {stats.evenements}/{attendus}")
+        self.stdout.write(
+            f"diffusion         p50={percentile(stats.latences, 50) * 1000:.1f} ms  "
+            f"p99={percentile(stats.latences, 99) * 1000:.1f} ms"
+        )
+
+    async def _executer(self, donnees, token, options):
+        from FaceLoad.asgi import application
+
+        stats = StatistiquesFlux()
+        ecrits = {}
+        fin = asyncio.Event()
+        prets = asyncio.Semaphore(0)
+        depart = time.perf_counter()
+
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': f"/api/v1/presences/stream/{donnees.session.id}/",
+            'raw_path': f"/api/v1/presences/stream/{donnees.session.id}/".encode(),
+            'query_string': f"token={token}".encode(),
+            'root_path': '',
+            'headers': [(b'host', b'localhost')],
+            'client': ('127.0.0.1', 0),
+            'server': ('localhost', 80),
+        }
+
+        async def ouvrir_flux():
+            requete_lue = False
+            liste_recue = False
+            tampon = ''
+
+            async def receive():
+                nonlocal requete_lue
+                if not requete_lue:
+                    requete_lue = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                await fin.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                nonlocal tampon, liste_recue
+                if message['type'] == 'http.response.start':
+                    stats.statuts.append(message['status'])
+                    return
+                tampon += message.get('body', b'').decode()
+                while '\n\n' in tampon:
+                    bloc, tampon = tampon.split('\n\n', 1)
+                    lignes = dict(
+                        ligne.split(': ', 1) for ligne in bloc.split('\n') if ligne and not ligne.startswith(':')
+                    )
+                    if lignes.get('event') == 'roster':
+                        stats.temps_liste.append(time.perf_counter() - depart)
+                        liste_recue = True
+                        prets.release()
+                    elif lignes.get('event') == 'pointage':
+                        user_id = json.loads(lignes['data'])['user_id']
+                        stats.latences.append(time.perf_counter() - ecrits[user_id])
+                        stats.evenements += 1
+
+            try:
+                await application(dict(scope), receive, send)
+            except Exception as e:
+                stats.erreurs.append(e)
+            finally:
+                # Un flux refusé ou interrompu ne doit pas bloquer le démarrage des pointages
+                if not liste_recue:
+                    prets.release()
+
+        taches = [asyncio.create_task(ouvrir_flux()) for _ in range(options['flux'])]
+        try:
+            for _ in taches:
+                await asyncio.wait_for(prets.acquire(), options['timeout'])
+
+            # Les pointages sont écrits depuis un autre thread, comme le tampon d'ingestion
+            def pointer():
+                for etudiant in donnees.etudiants:
+                    ecrits[etudiant.id] = time.perf_counter()
+                    inserer_pointages([(donnees.session.id, etudiant.id)])
+                    time.sleep(options['intervalle'])
+
+            thread = threading.Thread(target=pointer)
+            thread.start()
+            await asyncio.get_running_loop().run_in_executor(None, thread.join)
+
+            limite = time.perf_counter() + options['timeout']
+            attendus = options['flux'] * len(donnees.etudiants)
+            while stats.evenements < attendus and time.perf_counter() < limite:
+                await asyncio.sleep(0.1)
+        finally:
+            fin.set()
+            for tache in taches:
+                tache.cancel()
+            await asyncio.gather(*taches, return_exceptions=True)
+
+        return stats
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.16 on 2026-10-18 14:14
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def desactiver_sessions_expirees(apps, schema_editor):
+    SessionPresence = apps.get_model('pointage', 'SessionPresence')
+    SessionPresence.objects.filter(is_active=True, end_time__lt=timezone.now()).update(is_active=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pointage', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(desactiver_sessions_expirees, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='sessionpresence',
+            name='code',
+            field=models.CharField(max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='sessionpresence',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['planning'], name='session_planning_actif_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='sessionpresence',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_active', True)), fields=('code',), name='session_code_actif_uniq'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.16 on 2026-10-18 14:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pointage', '0003_session_partial_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pointage',
+            index=models.Index(fields=['-timestamp', '-id'], name='pointage_timestamp_id_idx'),
+        ),
+    ]
@@ -7,13 +7,23 @@ class SessionPresence(models.Model):
     Représente une session d'appel lancée par un professeur.
     """
     planning = models.ForeignKey(Planning, on_delete=models.CASCADE, related_name='sessions_presence')
-    code = models.CharField(max_length=10, unique=True)
+    code = models.CharField(max_length=10)
     latitude = models.FloatField()
     longitude = models.FloatField()
     start_time = models.DateTimeField(auto_now_add=True)
     end_time = models.DateTimeField()
     is_active = models.BooleanField(default=True)
 
+    class Meta:
+        constraints = [
+            # Un code n'est unique que parmi les sessions actives : il redevient libre à l'expiration
+            models.UniqueConstraint(fields=['code'], condition=models.Q(is_active=True), name='session_code_actif_uniq'),
+        ]
+        indexes = [
+            # Index partiels : seules les sessions actives (quelques-unes à la fois) y figurent
+            models.Index(fields=['planning'], condition=models.Q(is_active=True), name='session_planning_actif_idx'),
+        ]
+
     def __str__(self):
         return f"Session pour {self.planning} - Code: {self.code}"
 
@@ -28,6 +38,10 @@ class Pointage(models.Model):
     class Meta:
         # Assure qu'un étudiant ne peut pointer qu'une seule fois par session
         unique_together = ('session', 'user')
+        indexes = [
+            # Pagination par curseur de PointageListView
+            models.Index(fields=['-timestamp', '-id'], name='pointage_timestamp_id_idx'),
+        ]
 
     def __str__(self):
         return f"Pointage de {self.user.username} pour la session {self.session.id}"
\ No newline at end of file
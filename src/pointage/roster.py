@@ -0,0 +1,63 @@
+"""
+Calcul de l'appel d'un cours : étudiants attendus, présents et absents.
+
+Deux requêtes quel que soit l'effectif : les étudiants de la classe (avec
+leur classe et filière via `select_related`) et les identifiants des
+étudiants ayant pointé. Le reste se fait sur des ensembles Python. Un
+cours sans classe (module supprimé ou non rattaché) n'attend personne.
+Utilisé par la liste des présences du professeur et son flux en direct.
+"""
+from users.models import User
+
+from .models import Pointage
+
+
+class Roster:
+    """
+    Résultat de l'appel pour une classe et un ensemble de sessions.
+    """
+
+    def __init__(self, etudiants, pointes_ids):
+        self.etudiants = etudiants
+        self.attendus_ids = {etudiant.id for etudiant in etudiants}
+        # Un pointage d'un étudiant d'une autre classe ne compte pas comme présence
+        self.presents_ids = self.attendus_ids & set(pointes_ids)
+        self.absents_ids = self.attendus_ids - self.presents_ids
+
+    def lignes(self):
+        """Une ligne par étudiant attendu, au format de `StudentPresenceSerializer`."""
+        return [
+            {
+                'id': etudiant.id,
+                'first_name': etudiant.first_name,
+                'last_name': etudiant.last_name,
+                'classe': etudiant.classe.name if etudiant.classe else None,
+                'filiere': etudiant.filiere.name if etudiant.filiere else None,
+                'status': "Présent" if etudiant.id in self.presents_ids else "Absent",
+            }
+            for etudiant in self.etudiants
+        ]
+
+
+def construire_roster(classe_id, sessions):
+    """
+    Args:
+        classe_id: La classe dont les étudiants sont attendus (None : roster vide, sans requête).
+        sessions: Les sessions de présence à prendre en compte (queryset,
+            évalué en sous-requête, ou liste d'identifiants).
+
+    Returns:
+        Un `Roster`.
+    """
+    if classe_id is None:
+        return Roster([], [])
+
+    etudiants = list(
+        User.get_students()
+        .filter(classe_id=classe_id)
+        .select_related('classe', 'filiere')
+        .only('id', 'first_name', 'last_name', 'classe__name', 'filiere__name')
+        .order_by('last_name', 'first_name')
+    )
+    pointes_ids = Pointage.objects.filter(session__in=sessions).values_list('user_id', flat=True)
+    return Roster(etudiants, pointes_ids)
@@ -17,6 +17,17 @@ class ValidatePresenceSerializer(serializers.Serializer):
     latitude = serializers.FloatField()
     longitude = serializers.FloatField()
 
+class PointageHorsLigneSerializer(serializers.Serializer):
+    code = serializers.CharField(max_length=10)
+    latitude = serializers.FloatField()
+    longitude = serializers.FloatField()
+    timestamp = serializers.DateTimeField()
+    # Étudiant concerné, requis quand le lot vient de l'appareil d'un professeur
+    user = serializers.IntegerField(required=False)
+
+class ValidatePresenceBatchSerializer(serializers.Serializer):
+    pointages = PointageHorsLigneSerializer(many=True, allow_empty=False, max_length=1000)
+
 class PointageSerializer(serializers.ModelSerializer):
     user = UserSerializer()
     session = SessionPresenceSerializer()
@@ -25,6 +36,21 @@ class PointageSerializer(serializers.ModelSerializer):
         model = Pointage
         fields = ('id', 'user', 'session', 'timestamp')
 
+class PointageListSerializer(serializers.ModelSerializer):
+    """
+    Version compacte pour les listes : identifiants, noms et résumé de la séance,
+    sans les détails imbriqués de `UserSerializer`.
+    """
+    first_name = serializers.CharField(source='user.first_name', read_only=True)
+    last_name = serializers.CharField(source='user.last_name', read_only=True)
+    planning_id = serializers.IntegerField(source='session.planning_id', read_only=True)
+    date = serializers.DateField(source='session.planning.date', read_only=True)
+    module = serializers.CharField(source='session.planning.horaire.module.name', read_only=True, default=None)
+
+    class Meta:
+        model = Pointage
+        fields = ('id', 'user_id', 'first_name', 'last_name', 'session_id', 'planning_id', 'date', 'module', 'timestamp')
+
 class StudentPresenceSerializer(serializers.Serializer):
     id = serializers.IntegerField()
     first_name = serializers.CharField()
@@ -32,3 +58,14 @@ class StudentPresenceSerializer(serializers.Serializer):
     classe = serializers.CharField()
     filiere = serializers.CharField()
     status = serializers.CharField()
+
+class ExportPointagesSerializer(serializers.Serializer):
+    """
+    Paramètres de l'export des pointages : filtres, format et exécution en tâche de fond.
+    """
+    classe = serializers.IntegerField(required=False)
+    module = serializers.IntegerField(required=False)
+    date_debut = serializers.DateField(required=False)
+    date_fin = serializers.DateField(required=False)
+    fichier = serializers.ChoiceField(choices=['csv', 'xlsx'], default='csv')
+    en_tache = serializers.BooleanField(default=False)
@@ -0,0 +1,22 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import Signal, receiver
+
+from .diffusion import diffuseur_presences
+from .models import Pointage
+
+# Envoyé par `pointage.ingestion` dans la transaction d'un lot (bulk_create n'envoie pas post_save).
+# Argument `paires` : liste des (session_id, user_id) créés par ce lot.
+pointages_crees = Signal()
+
+
+@receiver(post_save, sender=Pointage)
+def diffuser_pointage(sender, instance, created, **kwargs):
+    """
+    Pousse les pointages créés un par un (admin, get_or_create...) vers les flux des professeurs.
+    Les écritures par lots publient directement depuis `pointage.ingestion`.
+    """
+    if created:
+        transaction.on_commit(lambda: diffuseur_presences.publier_pointages(
+            [(instance.session_id, instance.user_id, instance.timestamp)]
+        ))
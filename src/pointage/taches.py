@@ -0,0 +1,22 @@
+"""
+Gestionnaires de tâches de fond de l'application pointage.
+"""
+import uuid
+
+from django.urls import reverse
+
+from FaceLoad.exports import ecrire_export
+from taches.registre import tache
+
+from .exports import ENTETES, lignes_pointages
+from .serializers import ExportPointagesSerializer
+
+
+@tache('pointage.exporter')
+def exporter_pointages(t):
+    """Export des présences écrit dans EXPORTS_ROOT, téléchargeable par `taches/<id>/fichier/`."""
+    serializer = ExportPointagesSerializer(data=t.parametres)
+    serializer.is_valid(raise_exception=True)
+    data = serializer.validated_data
+    fichier, lignes = ecrire_export(f"presences-{t.id}-{uuid.uuid4().hex[:12]}", data['fichier'], ENTETES, lignes_pointages(data))
+    return {"fichier": fichier, "lignes": lignes, "telechargement": reverse('tache-fichier', args=[t.id])}
@@ -1,3 +1,141 @@
-from django.test import TestCase
+import random
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase
+from geopy.distance import geodesic
+
+from . import codes
+from .bench import JeuDeDonnees
+from .geofence import Geofence, metres_par_degre
+from .index import index_sessions, trouver_session_active
+from .models import Pointage
+from .roster import construire_roster
+from .views import construire_liste_presences
+
+
+class RosterTests(TestCase):
+
+    def creer_jeu(self, nb_etudiants, nb_presents):
+        jeu = JeuDeDonnees(nb_etudiants).creer()
+        Pointage.objects.bulk_create([
+            Pointage(user=etudiant, session=jeu.session) for etudiant in jeu.etudiants[:nb_presents]
+        ])
+        return jeu
+
+    def test_nombre_de_requetes_independant_de_l_effectif(self):
+        petit = self.creer_jeu(5, 2)
+        grand = self.creer_jeu(120, 60)
+
+        with self.assertNumQueries(2):
+            lignes = construire_liste_presences(petit.session)
+        self.assertEqual(len(lignes), 5)
+
+        with self.assertNumQueries(2):
+            lignes = construire_liste_presences(grand.session)
+        self.assertEqual(len(lignes), 120)
+        self.assertEqual(sum(ligne['status'] == "Présent" for ligne in lignes), 60)
+
+    def test_cours_sans_classe(self):
+        jeu = self.creer_jeu(3, 1)
+        with self.assertNumQueries(0):
+            roster = construire_roster(None, [jeu.session.id])
+        self.assertEqual(roster.lignes(), [])
+
+
+class CodesRotatifsTests(TestCase):
+
+    # Début d'un créneau, pour placer les vérifications de part et d'autre des rotations
+    debut = 1_700_000_000 // codes.ROTATION_SECONDES * codes.ROTATION_SECONDES
+
+    def test_aller_retour(self):
+        code = codes.generer_code(4242, self.debut)
+        self.assertLessEqual(len(code), codes.LONGUEUR_MAX)
+        self.assertEqual(codes.decoder_code(code, self.debut), 4242)
+        # Saisie approximative : minuscules et espaces
+        self.assertEqual(codes.decoder_code(f" {code.lower()} ", self.debut + 1), 4242)
+        self.assertEqual(codes.secondes_restantes(self.debut + 1), codes.ROTATION_SECONDES - 1)
+
+    def test_fenetre_de_tolerance(self):
+        code = codes.generer_code(7, self.debut)
+        rotation = codes.ROTATION_SECONDES
+        self.assertEqual(codes.decoder_code(code, self.debut + rotation * codes.TOLERANCE), 7)
+        self.assertIsNone(codes.decoder_code(code, self.debut + rotation * (codes.TOLERANCE + 1)))
+        # Un code du créneau suivant n'est pas encore valable
+        self.assertIsNone(codes.decoder_code(code, self.debut - 1))
+        self.assertNotEqual(codes.generer_code(7, self.debut + rotation), code)
+
+    def test_code_altere(self):
+        code = codes.generer_code(7, self.debut)
+        dernier = 'A' if code[-1] != 'A' else 'B'
+        self.assertIsNone(codes.decoder_code(code[:-1] + dernier, self.debut))
+        # Signature d'une session recopiée sur une autre
+        self.assertIsNone(codes.decoder_code('8' + code[1:], self.debut))
+        for invalide in ('', code[-codes.LONGUEUR_SIGNATURE:], code + 'A' * codes.LONGUEUR_MAX, code[:-1] + '-'):
+            self.assertIsNone(codes.decoder_code(invalide, self.debut))
+
+    def test_code_historique_accepte(self):
+        index_sessions.vider()
+        jeu = JeuDeDonnees(1).creer()
+        self.assertIsNone(codes.decoder_code(jeu.session.code, time.time()))
+        self.assertEqual(trouver_session_active(jeu.session.code).id, jeu.session.id)
+        # Session lue en base, puis dans l'index
+        index_sessions.vider()
+        self.assertEqual(trouver_session_active(codes.generer_code(jeu.session.id)).id, jeu.session.id)
+        self.assertEqual(trouver_session_active(codes.generer_code(jeu.session.id)).id, jeu.session.id)
+        self.assertIsNone(trouver_session_active(codes.generer_code(jeu.session.id + 1000)))
+
+
+class GeofenceTests(SimpleTestCase):
+
+    latitude, longitude = 12.6392, -8.0029
+
+    def setUp(self):
+        self.geofence = Geofence(self.latitude, self.longitude, rayon=100)
+
+    def point(self, nord, est):
+        """Point à `nord` et `est` mètres du centre."""
+        par_degre_lat, par_degre_lon = metres_par_degre(self.latitude)
+        return self.latitude + nord / par_degre_lat, self.longitude + est / par_degre_lon
+
+    def exacte(self, latitude, longitude):
+        return geodesic((latitude, longitude), (self.latitude, self.longitude)).meters
+
+    def test_dedans_dehors(self):
+        with mock.patch('pointage.geofence.geodesic') as calcul_exact:
+            self.assertEqual(self.geofence.contient(*self.point(0, 0)), (True, 0))
+            dedans, distance = self.geofence.contient(*self.point(60, -40))
+            self.assertTrue(dedans)
+            self.assertAlmostEqual(distance, self.exacte(*self.point(60, -40)), delta=0.01)
+            self.assertFalse(self.geofence.contient(*self.point(0, 103))[0])
+            self.assertFalse(self.geofence.contient(*self.point(5000, 0))[0])
+        # Hors de la bande, l'approximation suffit
+        calcul_exact.assert_not_called()
+
+    def test_bande_autour_du_rayon(self):
+        for metres in (98.5, 99.9, 100.1, 101.5):
+            latitude, longitude = self.point(metres * 0.6, metres * 0.8)
+            with self.subTest(metres=metres), mock.patch('pointage.geofence.geodesic', wraps=geodesic) as calcul_exact:
+                dedans, distance = self.geofence.contient(latitude, longitude)
+                calcul_exact.assert_called_once()
+                self.assertEqual(distance, self.exacte(latitude, longitude))
+                self.assertEqual(dedans, metres <= 100)
+
+    def test_antimeridien(self):
+        geofence = Geofence(0, 179.9998, rayon=100)
+        self.assertTrue(geofence.contient(0, -179.9998)[0])
+        self.assertFalse(geofence.contient(0, -179.999)[0])
+
+    def test_lot_identique_au_calcul_unitaire(self):
+        aleatoire = random.Random(3)
+        points = [self.point(aleatoire.uniform(-150, 150), aleatoire.uniform(-150, 150)) for _ in range(500)]
+        # Quelques points dans la bande de 2 %
+        points += [self.point(metres, 0) for metres in (98.5, 99.9, 100.1, 101.5)]
+        latitudes, longitudes = zip(*points)
+
+        dedans, distances = self.geofence.contient_lot(latitudes, longitudes)
+        for i, (latitude, longitude) in enumerate(points):
+            attendu, distance = self.geofence.contient(latitude, longitude)
+            self.assertEqual(bool(dedans[i]), attendu)
+            self.assertAlmostEqual(distances[i], distance, places=6)
+        self.assertTrue(0 < dedans.sum() < len(points))
@@ -1,17 +1,25 @@
 from django.urls import path
 from .views import (
     CreateSessionPresenceView, 
+    SessionCodeView,
     ValidatePresenceView, 
+    ValidatePresenceBatchView,
     PointageListView, 
+    PointageExportView,
     list_presences_today_view,
+    presences_stream_view,
     StudentPointageHistoryView
 )
 
 urlpatterns = [
     path('session/create/', CreateSessionPresenceView.as_view(), name='create-session'),
+    path('session/<int:id>/code/', SessionCodeView.as_view(), name='session-code'),
     path('validate/', ValidatePresenceView.as_view(), name='validate-presence'),
+    path('validate/batch/', ValidatePresenceBatchView.as_view(), name='validate-presence-batch'),
     path('presences/', PointageListView.as_view(), name='list-presences'),
+    path('presences/export/', PointageExportView.as_view(), name='export-presences'),
     path('presences/today/', list_presences_today_view, name='list-presences-today'),
+    path('presences/stream/<int:id>/', presences_stream_view, name='presences-stream'),
     path('my-history-pointage/', StudentPointageHistoryView.as_view(), name='student-pointage-history'),
 
 ]
@@ -3,18 +3,36 @@ from rest_framework.response import Response
 from rest_framework import status, generics
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils import timezone
+from asgiref.sync import sync_to_async
 from datetime import datetime, timedelta
+import asyncio
+import json
 import random
 import string
-from geopy.distance import geodesic
 
 from .models import SessionPresence, Pointage, Planning
-from .serializers import CreateSessionPresenceSerializer, ValidatePresenceSerializer, SessionPresenceSerializer, PointageSerializer, StudentPresenceSerializer
-from users.models import User
+from .serializers import CreateSessionPresenceSerializer, ValidatePresenceSerializer, ValidatePresenceBatchSerializer, SessionPresenceSerializer, PointageSerializer, PointageListSerializer, StudentPresenceSerializer, ExportPointagesSerializer
+from .codes import generer_code, secondes_restantes
+from .index import indexer_session, trouver_session_active
+from .ingestion import PointageEnAttente, enregistrer_pointage
+from .diffusion import diffuseur_presences
+from .roster import construire_roster
+from .expiration import demarrer_balayeur
+from .hors_ligne import CREE, DEJA_ENREGISTRE, REFUSE, valider_pointages_hors_ligne
+from .exports import ENTETES, lignes_pointages
+from FaceLoad.exports import reponse_export
+from taches.execution import enfiler
 from users.permissions import IsProfessor, IsStudent
 
+# Commentaire SSE envoyé en l'absence d'événement, pour que les proxies ne coupent pas le flux
+FLUX_KEEPALIVE_SECONDES = 15
+
 def generate_unique_code():
     """Génère un code alphanumérique unique de 6 caractères."""
     while True:
@@ -35,7 +53,7 @@ class CreateSessionPresenceView(APIView):
             planning_id = validated_data['planning_id']
 
             try:
-                planning = Planning.objects.get(id=planning_id)
+                planning = Planning.objects.select_related('horaire__module').get(id=planning_id)
             except Planning.DoesNotExist:
                 return Response({'error': 'Planning non trouvé.'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -60,11 +78,40 @@ class CreateSessionPresenceView(APIView):
                 end_time=timezone.now() + timedelta(minutes=5)
             )
 
-            response_serializer = SessionPresenceSerializer(session)
-            return Response(response_serializer.data, status=status.HTTP_201_CREATED)
+            # On garde la session en mémoire pour valider les pointages sans relire la base
+            module = planning.module
+            indexer_session(session, module.classe_id if module else None)
+            demarrer_balayeur()
+
+            response_data = SessionPresenceSerializer(session).data
+            response_data['code_rotatif'] = generer_code(session.id)
+            response_data['expire_dans'] = secondes_restantes()
+            return Response(response_data, status=status.HTTP_201_CREATED)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class SessionCodeView(APIView):
+    """
+    Vue pour que le professeur affiche le code rotatif courant de sa session.
+    Le client rappelle cette vue quand `expire_dans` arrive à zéro.
+    """
+    permission_classes = [IsProfessor]
+
+    def get(self, request, id, *args, **kwargs):
+        session_ouverte = SessionPresence.objects.filter(
+            id=id,
+            planning__user=request.user,
+            is_active=True,
+            end_time__gte=timezone.now()
+        ).exists()
+        if not session_ouverte:
+            return Response({'error': 'Session non trouvée ou expirée.'}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            'code_rotatif': generer_code(id),
+            'expire_dans': secondes_restantes()
+        }, status=status.HTTP_200_OK)
+
 class ValidatePresenceView(APIView):
     """
     Vue pour qu'un étudiant puisse valider sa présence.
@@ -78,33 +125,32 @@ class ValidatePresenceView(APIView):
             code = validated_data['code']
             student_coords = (validated_data['latitude'], validated_data['longitude'])
 
-            try:
-                session = SessionPresence.objects.get(code=code, is_active=True, end_time__gte=timezone.now())
-            except SessionPresence.DoesNotExist:
+            session = trouver_session_active(code)
+            if session is None:
                 return Response({'error': 'Code de session invalide ou expiré.'}, status=status.HTTP_404_NOT_FOUND)
 
-            professor_coords = (session.latitude, session.longitude)
-            distance = geodesic(student_coords, professor_coords).meters
+            dans_la_salle, distance = session.geofence.contient(*student_coords)
 
-            if distance > 100:
+            if not dans_la_salle:
                 return Response({
                     'error': 'Vous êtes trop loin de la salle de classe.',
                     'distance_meters': round(distance)
                 }, status=status.HTTP_403_FORBIDDEN)
 
-            # Vérifier si l'étudiant est inscrit au cours
-            planning = session.planning
-            module_du_cours = planning.module
-            if not module_du_cours or not module_du_cours.classe:
+            # Vérifier si l'étudiant est inscrit au cours (classe du module, connue de l'index)
+            if not session.classe_id:
                 return Response({'error': 'Impossible de vérifier la classe pour ce cours.'}, status=status.HTTP_400_BAD_REQUEST)
 
-            if request.user.classe != module_du_cours.classe:
+            if request.user.classe_id != session.classe_id:
                  return Response({'error': 'Vous n\'etes pas inscrit a ce cours.'}, status=status.HTTP_403_FORBIDDEN)
 
-            pointage, created = Pointage.objects.get_or_create(
-                session=session,
-                user=request.user
-            )
+            try:
+                created = enregistrer_pointage(session.id, request.user.id)
+            except TimeoutError:
+                # Retiré de la file sans être écrit : l'étudiant peut renvoyer sans risque
+                return Response({'error': 'Le service est surchargé, veuillez réessayer.'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            except PointageEnAttente:
+                return Response({'message': 'Presence recue, enregistrement en cours.'}, status=status.HTTP_202_ACCEPTED)
 
             if not created:
                 return Response({'message': 'Votre presence a deja ete enregistree.'}, status=status.HTTP_200_OK)
@@ -113,17 +159,95 @@ class ValidatePresenceView(APIView):
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class ValidatePresenceBatchView(APIView):
+    """
+    Vue pour envoyer en une fois des pointages collectés hors ligne, par le
+    téléphone d'un étudiant (ses propres pointages) ou par l'appareil d'un
+    professeur (les étudiants de ses sessions, champ `user` obligatoire).
+    Retourne un résultat par pointage, dans l'ordre d'envoi.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        serializer = ValidatePresenceBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        pointages = serializer.validated_data['pointages']
+        est_professeur = IsProfessor().has_permission(request, self)
+        if est_professeur:
+            if any(pointage.get('user') is None for pointage in pointages):
+                return Response({'error': 'Le champ "user" est requis pour chaque pointage.'}, status=status.HTTP_400_BAD_REQUEST)
+        elif not IsStudent().has_permission(request, self):
+            return Response({'error': 'Accès réservé aux étudiants et aux professeurs.'}, status=status.HTTP_403_FORBIDDEN)
+
+        resultats = valider_pointages_hors_ligne(pointages, request.user, est_professeur)
+        return Response({
+            'crees': sum(1 for r in resultats if r['statut'] == CREE),
+            'deja_enregistres': sum(1 for r in resultats if r['statut'] == DEJA_ENREGISTRE),
+            'refuses': sum(1 for r in resultats if r['statut'] == REFUSE),
+            'resultats': resultats
+        }, status=status.HTTP_200_OK)
+
+class PointageCursorPagination(CursorPagination):
+    """
+    Pagination par curseur sur (timestamp, id) : ni COUNT(*) ni OFFSET,
+    le temps de réponse ne dépend pas de la taille de l'historique.
+    """
+    ordering = ('-timestamp', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
 class PointageListView(generics.ListAPIView):
     """
-    Vue pour lister toutes les présences des étudiants, avec pagination.
+    Vue pour lister toutes les présences des étudiants, avec pagination par curseur.
     Accessible uniquement par les administrateurs.
     """
-    serializer_class = PointageSerializer
+    serializer_class = PointageListSerializer
     permission_classes = [IsAdminUser]
-    pagination_class = PageNumberPagination
+    pagination_class = PointageCursorPagination
 
     def get_queryset(self):
-        return Pointage.objects.select_related('user', 'session__planning').all().order_by('-timestamp')
+        return Pointage.objects.select_related(
+            'user', 'session__planning__horaire__module'
+        ).only(
+            'id', 'timestamp',
+            'user__id', 'user__first_name', 'user__last_name',
+            'session__id', 'session__planning__id', 'session__planning__date',
+            'session__planning__horaire__id', 'session__planning__horaire__module__id',
+            'session__planning__horaire__module__name',
+        )
+
+class PointageExportView(APIView):
+    """
+    Export CSV ou XLSX des présences, filtrable par classe, module et période.
+    `?en_tache=true` lance l'export en tâche de fond (fichier téléchargeable par `taches/<id>/fichier/`).
+    Accessible uniquement par les administrateurs.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        serializer = ExportPointagesSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        if data['en_tache']:
+            parametres = {cle: valeur for cle, valeur in request.query_params.items() if cle != 'en_tache'}
+            tache = enfiler('pointage.exporter', parametres, cree_par=request.user)
+            return Response({"message": "L'export est en cours de génération.", "tache_id": tache.id},
+                            status=status.HTTP_202_ACCEPTED)
+
+        nom = f"presences-{timezone.localdate().isoformat()}"
+        return reponse_export(request, nom, data['fichier'], ENTETES, lignes_pointages(data))
+
+def construire_liste_presences(session):
+    """
+    Liste des étudiants attendus pour une session, avec leur statut de présence.
+    """
+    module = session.planning.module
+    roster = construire_roster(module.classe_id if module else None, [session.id])
+    return StudentPresenceSerializer(roster.lignes(), many=True).data
 
 @api_view(['GET'])
 @permission_classes([IsProfessor])
@@ -136,38 +260,18 @@ def list_presences_today_view(request):
     today = now.date()
     current_time = now.time()
 
-    try:
-        session = SessionPresence.objects.get(
-            planning__user=request.user,
-            planning__date=today,
-            planning__horaire__time_start_course__lte=current_time,
-            planning__horaire__time_end_course__gte=current_time,
-            is_active=True
-        )
-    except SessionPresence.DoesNotExist:
+    # Les sessions sont désactivées à leur expiration (5 minutes) : on prend la
+    # dernière session lancée pour le cours en cours, active ou non.
+    session = SessionPresence.objects.select_related('planning__horaire__module').filter(
+        planning__user=request.user,
+        planning__date=today,
+        planning__horaire__time_start_course__lte=current_time,
+        planning__horaire__time_end_course__gte=current_time
+    ).order_by('-start_time').first()
+    if session is None:
         return Response([], status=status.HTTP_200_OK)
 
-    expected_students = User.objects.filter(
-        classe=session.planning.module.classe,
-        roles__name='STUDENT'
-    ).distinct()
-
-    present_students_ids = Pointage.objects.filter(session=session).values_list('user_id', flat=True)
-
-    student_list = []
-    for student in expected_students:
-        presence_status = "Présent" if student.id in present_students_ids else "Absent"
-        student_list.append({
-            'id': student.id,
-            'first_name': student.first_name,
-            'last_name': student.last_name,
-            'classe': student.classe.name if student.classe else None,
-            'filiere': student.filiere.name if student.filiere else None,
-            'status': presence_status
-        })
-
-    serializer = StudentPresenceSerializer(student_list, many=True)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    return Response(construire_liste_presences(session), status=status.HTTP_200_OK)
 
 class StudentPointageHistoryView(generics.ListAPIView):
     """
@@ -178,3 +282,77 @@ class StudentPointageHistoryView(generics.ListAPIView):
 
     def get_queryset(self):
         return Pointage.objects.filter(user=self.request.user).order_by('-session__planning__date')
+
+
+def _authentifier_flux(request):
+    """
+    Authentifie un flux par JWT, via l'en-tête Authorization ou le paramètre `?token=`
+    (l'API EventSource des navigateurs ne permet pas d'envoyer d'en-têtes).
+    """
+    authentification = JWTAuthentication()
+    header = authentification.get_header(request)
+    raw_token = authentification.get_raw_token(header) if header else request.GET.get('token')
+    if not raw_token:
+        return None
+    try:
+        return authentification.get_user(authentification.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+def _evenement_sse(nom, donnees):
+    return f"event: {nom}\ndata: {json.dumps(donnees, cls=DjangoJSONEncoder)}\n\n"
+
+async def _flux_presences(session):
+    abonnement = diffuseur_presences.abonner(session.id)
+    try:
+        # Abonné avant de lire la liste : aucun pointage ne peut passer entre les deux
+        liste = await sync_to_async(construire_liste_presences, thread_sensitive=False)(session)
+        yield _evenement_sse('roster', liste)
+
+        while True:
+            restant = (session.end_time - timezone.now()).total_seconds()
+            if restant <= 0:
+                break
+            try:
+                evenement = await asyncio.wait_for(abonnement.queue.get(), timeout=min(restant, FLUX_KEEPALIVE_SECONDES))
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield _evenement_sse(evenement['type'], evenement)
+
+        yield _evenement_sse('fin', {'session_id': session.id})
+    finally:
+        diffuseur_presences.desabonner(abonnement)
+
+async def presences_stream_view(request, id):
+    """
+    Flux SSE (ASGI) des présences d'une session pour le professeur connecté :
+    la liste complète une fois, puis un événement `pointage` par étudiant qui pointe,
+    jusqu'à la fin de la session. Remplace les rafraîchissements répétés de
+    `list_presences_today_view`.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Méthode non autorisée.'}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    user = await sync_to_async(_authentifier_flux)(request)
+    if user is None:
+        return JsonResponse({'error': 'Authentification requise.'}, status=status.HTTP_401_UNAUTHORIZED)
+    request.user = user
+
+    if not await sync_to_async(IsProfessor().has_permission)(request, None):
+        return JsonResponse({'error': 'Accès réservé aux professeurs.'}, status=status.HTTP_403_FORBIDDEN)
+
+    session = await (
+        SessionPresence.objects
+        .select_related('planning__horaire__module')
+        .filter(id=id, planning__user=user, is_active=True, end_time__gte=timezone.now())
+        .afirst()
+    )
+    if session is None:
+        return JsonResponse({'error': 'Session non trouvée ou expirée.'}, status=status.HTTP_404_NOT_FOUND)
+
+    return StreamingHttpResponse(
+        _flux_presences(session),
+        content_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
@@ -0,0 +1,120 @@
+"""
+Séries des graphiques de présence, lues dans `PresenceJournaliere`.
+
+Une série longue est sous-échantillonnée en base (`Trunc`) : un point par
+jour jusqu'à un mois, par semaine jusqu'à un semestre, par mois au-delà.
+Les périodes sans cours apparaissent avec des valeurs nulles pour que l'axe
+du temps reste régulier.
+"""
+from datetime import timedelta
+
+from django.db.models import Sum
+from django.db.models.functions import Trunc
+
+from .models import PresenceJournaliere
+
+CHAMPS = ('attendus', 'presents', 'absents', 'justifies')
+
+# Étendue maximale (en jours) de chaque granularité
+GRANULARITES = [
+    ('day', 31),
+    ('week', 184),
+    ('month', None),
+]
+
+
+def granularite(debut, fin):
+    jours = (fin - debut).days + 1
+    for nom, maximum in GRANULARITES:
+        if maximum is None or jours <= maximum:
+            return nom
+
+
+def _debut_periode(jour, nom):
+    if nom == 'week':
+        return jour - timedelta(days=jour.weekday())
+    if nom == 'month':
+        return jour.replace(day=1)
+    return jour
+
+
+def _periodes(debut, fin, nom):
+    jour = _debut_periode(debut, nom)
+    while jour <= fin:
+        yield jour
+        if nom == 'day':
+            jour += timedelta(days=1)
+        elif nom == 'week':
+            jour += timedelta(days=7)
+        else:
+            jour = (jour + timedelta(days=32)).replace(day=1)
+
+
+def lignes(debut, fin, classe=None, module=None, filiere=None):
+    """
+    Lignes de la période. Les lignes d'un (date, module) sont ventilées par filière
+    d'étudiant : leur somme donne les totaux du module.
+    """
+    qs = PresenceJournaliere.objects.filter(date__range=(debut, fin))
+    if classe:
+        qs = qs.filter(classe_id=classe)
+    if module:
+        qs = qs.filter(module_id=module)
+    if filiere:
+        qs = qs.filter(filiere_id=filiere)
+    return qs
+
+
+def _taux(valeurs):
+    return round(valeurs['presents'] / valeurs['attendus'] * 100, 2) if valeurs['attendus'] else 0
+
+
+def serie_temporelle(debut, fin, **filtres):
+    """
+    Returns:
+        Un dictionnaire : granularite, labels (début de chaque période) et une liste
+        par indicateur (attendus, presents, absents, justifies, taux_presence).
+    """
+    nom = granularite(debut, fin)
+    agregats = (
+        lignes(debut, fin, **filtres)
+        .annotate(periode=Trunc('date', nom))
+        .values('periode')
+        .annotate(**{champ: Sum(champ) for champ in CHAMPS})
+        .order_by('periode')
+    )
+    par_periode = {ligne['periode']: ligne for ligne in agregats}
+    zero = dict.fromkeys(CHAMPS, 0)
+
+    resultat = {'granularite': {'day': 'jour', 'week': 'semaine', 'month': 'mois'}[nom], 'labels': []}
+    for champ in (*CHAMPS, 'taux_presence'):
+        resultat[champ] = []
+    for periode in _periodes(debut, fin, nom):
+        valeurs = par_periode.get(periode, zero)
+        resultat['labels'].append(periode.isoformat())
+        for champ in CHAMPS:
+            resultat[champ].append(valeurs[champ] or 0)
+        resultat['taux_presence'].append(_taux(valeurs))
+    return resultat
+
+
+def repartition(debut, fin, par, **filtres):
+    """
+    Returns:
+        Un dictionnaire : labels (noms) et une liste par indicateur, trié par nombre d'absences décroissant.
+    """
+    champ_nom = f'{par}__name'
+    agregats = (
+        lignes(debut, fin, **filtres)
+        .filter(**{f'{par}__isnull': False})
+        .values(champ_nom)
+        .annotate(**{champ: Sum(champ) for champ in CHAMPS})
+        .order_by('-absents', champ_nom)
+    )
+    resultat = {'labels': [], **{champ: [] for champ in (*CHAMPS, 'taux_presence')}}
+    for ligne in agregats:
+        resultat['labels'].append(ligne[champ_nom])
+        for champ in CHAMPS:
+            resultat[champ].append(ligne[champ])
+        resultat['taux_presence'].append(_taux(ligne))
+    return resultat
@@ -0,0 +1,86 @@
+import random
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from absences import faits
+from absences.models import Absence
+from FaceLoad.dashboard import SECTIONS, calculer_dashboard, calculer_dashboard_concurrent
+from planning.models import Planning
+from pointage.bench import JeuDeDonnees, percentile, supprimer_par_lots
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare le calcul du dashboard section par section et en parallèle (vue asynchrone) : "
+        "durée de chaque section, somme, durée séquentielle et concurrente, égalité des résultats."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--absences', type=int, default=0,
+                            help="Absences de test à créer (0 = données existantes).")
+        parser.add_argument('--etudiants', type=int, default=500)
+        parser.add_argument('--repetitions', type=int, default=10)
+
+    def handle(self, *args, **options):
+        donnees = None
+        if options['absences']:
+            donnees = JeuDeDonnees(options['etudiants'], avec_session=False).creer()
+        try:
+            if donnees:
+                self._creer_absences(donnees, options['absences'])
+            self._mesurer(options['repetitions'])
+        finally:
+            if donnees:
+                self.stdout.write("Suppression des données de test...")
+                plannings = Planning.objects.filter(horaire=donnees.horaire)
+                # Par lots : les signaux post_delete tiennent compteurs et faits à jour
+                supprimer_par_lots(Absence.objects.filter(planning__in=plannings))
+                plannings.exclude(id=donnees.planning.id).delete()
+                donnees.supprimer()
+
+    def _creer_absences(self, donnees, total):
+        etudiants = [etudiant.id for etudiant in donnees.etudiants]
+        aujourd_hui = timezone.localdate()
+        plannings = Planning.objects.bulk_create(
+            [
+                Planning(user=donnees.professeur, horaire=donnees.horaire, date=aujourd_hui - timedelta(days=i // 4))
+                for i in range(-(-total // len(etudiants)))
+            ],
+            batch_size=5000
+        )
+        lot = []
+        for planning in plannings:
+            for user_id in etudiants:
+                lot.append(Absence(user_id=user_id, planning_id=planning.id, statut=random.choice(['NON_JUSTIFIEE', 'APPROUVEE'])))
+        Absence.objects.bulk_create(lot[:total], batch_size=10000)
+        faits.reconstruire_modules([donnees.module.id])
+        self.stdout.write(f"{total} absences créées.")
+
+    def _mesurer(self, repetitions):
+        today = date.today()
+        durees = {nom: [] for nom in SECTIONS}
+        for _ in range(repetitions):
+            for nom, section in SECTIONS.items():
+                debut = time.perf_counter()
+                section(today)
+                durees[nom].append(time.perf_counter() - debut)
+        for nom, valeurs in durees.items():
+            self.stdout.write(f"  section {nom:<24} p50={percentile(valeurs, 50) * 1000:>7.1f} ms")
+        plus_lente = max(percentile(valeurs, 50) for valeurs in durees.values())
+        somme = sum(percentile(valeurs, 50) for valeurs in durees.values())
+
+        if calculer_dashboard() != calculer_dashboard_concurrent():
+            raise CommandError("Les calculs séquentiel et concurrent diffèrent.")
+        for nom, calculer in (('séquentiel', calculer_dashboard), ('concurrent', calculer_dashboard_concurrent)):
+            latences = []
+            for _ in range(repetitions):
+                debut = time.perf_counter()
+                calculer()
+                latences.append(time.perf_counter() - debut)
+            self.stdout.write(
+                f"{nom:<12} p50={percentile(latences, 50) * 1000:>7.1f} ms  p95={percentile(latences, 95) * 1000:>7.1f} ms"
+            )
+        self.stdout.write(f"somme des sections : {somme * 1000:.1f} ms, section la plus lente : {plus_lente * 1000:.1f} ms")
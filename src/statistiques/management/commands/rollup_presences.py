@@ -0,0 +1,34 @@
+from datetime import date, datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from statistiques.rollup import reconstruire, rollup_incremental
+
+
+class Command(BaseCommand):
+    help = (
+        "Met à jour les agrégats quotidiens de présence (à lancer chaque nuit, par cron par exemple). "
+        "Avec --debut/--fin, recalcule toute la période."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--debut', type=date.fromisoformat, help="YYYY-MM-DD")
+        parser.add_argument('--fin', type=date.fromisoformat, help="YYYY-MM-DD (défaut : aujourd'hui)")
+        parser.add_argument('--depuis', type=datetime.fromisoformat,
+                            help="Passage incrémental : changements depuis cette date (après une nuit manquée).")
+
+    def handle(self, *args, **options):
+        if options['debut']:
+            fin = options['fin'] or timezone.localdate()
+            if options['debut'] > fin:
+                raise CommandError("--debut doit être antérieur à --fin.")
+            resultat = reconstruire(options['debut'], fin)
+        else:
+            depuis = options['depuis']
+            if depuis is not None and timezone.is_naive(depuis):
+                depuis = timezone.make_aware(depuis)
+            resultat = rollup_incremental(depuis=depuis)
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultat['paires']} (date, module) recalculé(s), {resultat['lignes']} ligne(s) écrite(s)."
+        ))
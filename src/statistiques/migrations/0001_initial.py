@@ -0,0 +1,39 @@
+# Generated by Django 4.2.16 on 2026-10-18 14:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('filiere', '0001_initial'),
+        ('module', '0001_initial'),
+        ('classe', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PresenceJournaliere',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('principal', models.BooleanField(default=True, help_text='Ligne de référence du (date, module) pour les totaux hors filière.')),
+                ('cours', models.PositiveIntegerField(default=0, help_text='Plannings du module ce jour-là.')),
+                ('attendus', models.PositiveIntegerField(default=0, help_text='Présences attendues (présents + absents).')),
+                ('presents', models.PositiveIntegerField(default=0)),
+                ('absents', models.PositiveIntegerField(default=0)),
+                ('justifies', models.PositiveIntegerField(default=0, help_text='Absences approuvées.')),
+                ('calcule_le', models.DateTimeField(auto_now=True)),
+                ('classe', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='presences_journalieres', to='classe.classe')),
+                ('filiere', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='presences_journalieres', to='filiere.filiere')),
+                ('module', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='presences_journalieres', to='module.module')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'principal'], name='presence_jour_date_idx'), models.Index(fields=['classe', 'date'], name='presence_jour_classe_idx'), models.Index(fields=['module', 'date'], name='presence_jour_module_idx'), models.Index(fields=['filiere', 'date'], name='presence_jour_filiere_idx')],
+                'unique_together': {('date', 'module', 'filiere')},
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.16 on 2026-10-18 14:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def supprimer_doublons(apps, schema_editor):
+    # Les lignes non principales recopiaient les chiffres du module : sans elles, les sommes restent justes
+    # jusqu'au prochain recalcul (`rollup_presences --debut ...`), qui ventile par filière d'étudiant.
+    PresenceJournaliere = apps.get_model('statistiques', 'PresenceJournaliere')
+    PresenceJournaliere.objects.filter(principal=False).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('filiere', '0001_initial'),
+        ('statistiques', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(supprimer_doublons, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='presencejournaliere',
+            name='presence_jour_date_idx',
+        ),
+        migrations.RemoveField(
+            model_name='presencejournaliere',
+            name='principal',
+        ),
+        migrations.AlterField(
+            model_name='presencejournaliere',
+            name='cours',
+            field=models.PositiveIntegerField(default=0, help_text='Plannings du module ce jour-là, porté par une seule ligne du (date, module).'),
+        ),
+        migrations.AlterField(
+            model_name='presencejournaliere',
+            name='filiere',
+            field=models.ForeignKey(help_text='Filière des étudiants comptés (None : étudiants sans filière).', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='presences_journalieres', to='filiere.filiere'),
+        ),
+        migrations.AddIndex(
+            model_name='presencejournaliere',
+            index=models.Index(fields=['date'], name='presence_jour_date_idx'),
+        ),
+    ]
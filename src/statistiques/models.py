@@ -0,0 +1,37 @@
+from django.db import models
+
+from classe.models import Classe
+from filiere.models import Filiere
+from module.models import Module
+
+
+class PresenceJournaliere(models.Model):
+    """
+    Agrégat quotidien des présences par (date, classe, module, filière), alimenté
+    par `statistiques.rollup`. La filière est celle des étudiants comptés : les
+    lignes d'un (date, module) se partagent ses présences et absences, et leur
+    somme donne les totaux du module.
+    """
+    date = models.DateField()
+    classe = models.ForeignKey(Classe, on_delete=models.CASCADE, null=True, related_name='presences_journalieres')
+    module = models.ForeignKey(Module, on_delete=models.CASCADE, related_name='presences_journalieres')
+    filiere = models.ForeignKey(Filiere, on_delete=models.CASCADE, null=True, related_name='presences_journalieres',
+                                help_text="Filière des étudiants comptés (None : étudiants sans filière).")
+    cours = models.PositiveIntegerField(default=0, help_text="Plannings du module ce jour-là, porté par une seule ligne du (date, module).")
+    attendus = models.PositiveIntegerField(default=0, help_text="Présences attendues (présents + absents).")
+    presents = models.PositiveIntegerField(default=0)
+    absents = models.PositiveIntegerField(default=0)
+    justifies = models.PositiveIntegerField(default=0, help_text="Absences approuvées.")
+    calcule_le = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('date', 'module', 'filiere')
+        indexes = [
+            models.Index(fields=['date'], name='presence_jour_date_idx'),
+            models.Index(fields=['classe', 'date'], name='presence_jour_classe_idx'),
+            models.Index(fields=['module', 'date'], name='presence_jour_module_idx'),
+            models.Index(fields=['filiere', 'date'], name='presence_jour_filiere_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - {self.module} : {self.presents}/{self.attendus} présent(s)"
@@ -0,0 +1,193 @@
+"""
+Alimentation de la table `PresenceJournaliere`.
+
+Les chiffres d'un (date, module) sont recalculés depuis les tables brutes
+en trois requêtes groupées (plannings, présences et absences ventilées par
+filière de l'étudiant) puis remplacés en bloc, ce qui rend chaque mise à
+jour idempotente :
+
+- à la génération des absences d'un planning validé (tâche `absences.generer`) ;
+- chaque nuit (`rollup_presences` ou la tâche `statistiques.rollup`) pour
+  les seuls (date, module) dont une présence, une absence ou un planning a
+  changé pendant la fenêtre `STATISTIQUES_ROLLUP['FENETRE_HEURES']`, la
+  veille comprise. La fenêtre dépasse 24 h pour que deux passages de nuit
+  se chevauchent.
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from absences.models import Absence
+from planning.models import Planning
+from pointage.models import Pointage
+
+from .models import PresenceJournaliere
+
+logger = logging.getLogger(__name__)
+
+_config = getattr(settings, 'STATISTIQUES_ROLLUP', {})
+
+# Couples (date, module) recalculés par transaction
+TAILLE_LOT = 500
+
+
+def _filtre_paires(paires, champ_module):
+    """Q couvrant les couples (date, module_id), regroupés par date."""
+    par_date = defaultdict(set)
+    for jour, module_id in paires:
+        par_date[jour].add(module_id)
+    filtre = Q(pk__in=[])
+    for jour, module_ids in par_date.items():
+        filtre |= Q(date=jour, **{f'{champ_module}__in': module_ids})
+    return filtre
+
+
+def calculer_lignes(paires):
+    """
+    Returns:
+        Les `PresenceJournaliere` (non enregistrées) des couples (date, module_id),
+        une par filière d'étudiant présente ou absente.
+    """
+    plannings = {
+        planning_id: (jour, module_id, classe_id)
+        for planning_id, jour, module_id, classe_id in
+        Planning.objects.filter(_filtre_paires(paires, 'horaire__module_id'))
+        .values_list('id', 'date', 'horaire__module_id', 'horaire__module__classe_id')
+    }
+    if not plannings:
+        return []
+
+    cours = defaultdict(int)
+    classes = {}
+    for jour, module_id, classe_id in plannings.values():
+        cours[(jour, module_id)] += 1
+        classes[(jour, module_id)] = classe_id
+
+    # Ventilation par filière de l'étudiant : chaque présence ou absence compte dans une seule ligne
+    chiffres = defaultdict(lambda: {'presents': 0, 'absents': 0, 'justifies': 0})
+
+    # Un étudiant pointé à plusieurs sessions du même cours n'est présent qu'une fois
+    presences = (
+        Pointage.objects.filter(session__planning_id__in=plannings)
+        .values_list('session__planning_id', 'user__filiere_id')
+        .annotate(n=Count('user_id', distinct=True))
+        .order_by()
+    )
+    for planning_id, filiere_id, n in presences:
+        jour, module_id, _ = plannings[planning_id]
+        chiffres[(jour, module_id, filiere_id)]['presents'] += n
+
+    absences = (
+        Absence.objects.filter(planning_id__in=plannings)
+        .values_list('planning_id', 'user__filiere_id')
+        .annotate(n=Count('id'), justifies=Count('id', filter=Q(statut='APPROUVEE')))
+        .order_by()
+    )
+    for planning_id, filiere_id, n, justifies in absences:
+        jour, module_id, _ = plannings[planning_id]
+        chiffres[(jour, module_id, filiere_id)]['absents'] += n
+        chiffres[(jour, module_id, filiere_id)]['justifies'] += justifies
+
+    # Un cours sans présence ni absence garde une ligne (sans filière) pour son nombre de cours
+    avec_chiffres = {(jour, module_id) for jour, module_id, _ in chiffres}
+    for cle in cours.keys() - avec_chiffres:
+        chiffres[(*cle, None)]
+
+    lignes = []
+    for (jour, module_id, filiere_id), valeurs in chiffres.items():
+        lignes.append(PresenceJournaliere(
+            date=jour,
+            module_id=module_id,
+            classe_id=classes[(jour, module_id)],
+            filiere_id=filiere_id,
+            # Le nombre de cours n'est porté que par la première ligne du (date, module)
+            cours=cours.pop((jour, module_id), 0),
+            attendus=valeurs['presents'] + valeurs['absents'],
+            **valeurs,
+        ))
+    return lignes
+
+
+def mettre_a_jour(paires):
+    """
+    Recalcule et remplace les lignes des couples (date, module_id).
+
+    Returns:
+        Le nombre de lignes écrites.
+    """
+    paires = sorted({(jour, module_id) for jour, module_id in paires if module_id is not None})
+    ecrites = 0
+    for i in range(0, len(paires), TAILLE_LOT):
+        lot = paires[i:i + TAILLE_LOT]
+        lignes = calculer_lignes(lot)
+        with transaction.atomic():
+            PresenceJournaliere.objects.filter(_filtre_paires(lot, 'module_id')).delete()
+            PresenceJournaliere.objects.bulk_create(lignes, batch_size=2000)
+        ecrites += len(lignes)
+    return ecrites
+
+
+def mettre_a_jour_planning(planning):
+    """Mise à jour après la validation d'un cours (génération de ses absences)."""
+    if planning.horaire_id is None:
+        return 0
+    return mettre_a_jour([(planning.date, planning.horaire.module_id)])
+
+
+def paires_modifiees(depuis, jusqu_a):
+    """
+    Couples (date, module_id) dont une présence, une absence ou un planning
+    a changé dans l'intervalle [depuis, jusqu_a[.
+    """
+    paires = set()
+    paires.update(
+        Pointage.objects.filter(timestamp__gte=depuis, timestamp__lt=jusqu_a)
+        .values_list('session__planning__date', 'session__planning__horaire__module_id').distinct()
+    )
+    paires.update(
+        Absence.objects.filter(modifie_le__gte=depuis, modifie_le__lt=jusqu_a)
+        .values_list('planning__date', 'planning__horaire__module_id').distinct()
+    )
+    paires.update(
+        Planning.objects.filter(date_creation__gte=depuis.date(), date_creation__lte=jusqu_a.date())
+        .values_list('date', 'horaire__module_id').distinct()
+    )
+    return {(jour, module_id) for jour, module_id in paires if jour is not None and module_id is not None}
+
+
+def rollup_incremental(now=None, depuis=None):
+    """
+    Passage de nuit : la veille, plus tout ce qui a changé pendant la fenêtre.
+
+    Returns:
+        Un dictionnaire avec le nombre de (date, module) recalculés et de lignes écrites.
+    """
+    now = now or timezone.now()
+    depuis = depuis or now - timedelta(hours=_config.get('FENETRE_HEURES', 26))
+    hier = timezone.localdate(now) - timedelta(days=1)
+
+    paires = paires_modifiees(depuis, now)
+    paires.update(
+        Planning.objects.filter(date=hier, horaire__module__isnull=False).values_list('date', 'horaire__module_id')
+    )
+    lignes = mettre_a_jour(paires)
+    logger.info(f"Agrégats de présence : {len(paires)} (date, module) recalculé(s), {lignes} ligne(s).")
+    return {"paires": len(paires), "lignes": lignes}
+
+
+def reconstruire(date_debut, date_fin):
+    """Recalcule toute une période (première mise en service, correction)."""
+    paires = set(
+        Planning.objects.filter(date__range=(date_debut, date_fin), horaire__module__isnull=False)
+        .values_list('date', 'horaire__module_id')
+    )
+    # Les lignes d'un (date, module) qui n'a plus de planning disparaissent aussi
+    PresenceJournaliere.objects.filter(date__range=(date_debut, date_fin)).exclude(
+        _filtre_paires(paires, 'module_id')
+    ).delete()
+    return {"paires": len(paires), "lignes": mettre_a_jour(paires)}
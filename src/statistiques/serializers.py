@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+from django.utils import timezone
+from rest_framework import serializers
+
+# Durée de chaque période prédéfinie, en jours
+PERIODES = {
+    'semaine': 7,
+    'mois': 30,
+    'semestre': 183,
+}
+
+# Étendue maximale d'une période explicite (debut, fin)
+ETENDUE_MAX = timedelta(days=3 * 366)
+
+
+class PeriodePresencesSerializer(serializers.Serializer):
+    """
+    Période et filtres des graphiques de présence. `debut` et `fin` remplacent `periode`.
+    """
+    periode = serializers.ChoiceField(choices=list(PERIODES), default='mois')
+    debut = serializers.DateField(required=False)
+    fin = serializers.DateField(required=False)
+    classe = serializers.IntegerField(required=False)
+    module = serializers.IntegerField(required=False)
+    filiere = serializers.IntegerField(required=False)
+
+    def validate(self, data):
+        fin = data.get('fin') or timezone.localdate()
+        debut = data.get('debut') or fin - timedelta(days=PERIODES[data['periode']] - 1)
+        if debut > fin:
+            raise serializers.ValidationError("La date de début doit être antérieure à la date de fin.")
+        if fin - debut > ETENDUE_MAX:
+            raise serializers.ValidationError("La période ne peut pas dépasser trois ans.")
+        data['debut'], data['fin'] = debut, fin
+        return data
+
+
+class RepartitionPresencesSerializer(PeriodePresencesSerializer):
+    """
+    Répartition des présences d'une période par classe, module ou filière.
+    """
+    par = serializers.ChoiceField(choices=['classe', 'module', 'filiere'], default='classe')
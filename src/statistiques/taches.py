@@ -0,0 +1,21 @@
+"""
+Gestionnaires de tâches de fond de l'application statistiques.
+"""
+from datetime import datetime
+
+from django.utils import timezone
+
+from taches.registre import tache
+
+from .rollup import rollup_incremental
+
+
+@tache('statistiques.rollup')
+def rollup_presences(t):
+    """Passage de nuit des agrégats de présence (voir `statistiques.rollup`)."""
+    depuis = t.parametres.get('depuis')
+    if depuis:
+        depuis = datetime.fromisoformat(depuis)
+        if timezone.is_naive(depuis):
+            depuis = timezone.make_aware(depuis)
+    return rollup_incremental(depuis=depuis or None)
@@ -0,0 +1,7 @@
+from django.urls import path
+from .views import PresencesRepartitionView, PresencesSerieView
+
+urlpatterns = [
+    path('statistiques/presences/', PresencesSerieView.as_view(), name='statistiques-presences'),
+    path('statistiques/presences/repartition/', PresencesRepartitionView.as_view(), name='statistiques-repartition'),
+]
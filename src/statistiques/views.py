@@ -0,0 +1,48 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+
+from users.permissions import IsAnyAdmin
+from .graphiques import repartition, serie_temporelle
+from .serializers import PeriodePresencesSerializer, RepartitionPresencesSerializer
+
+
+def _filtres(data):
+    return {cle: data.get(cle) for cle in ('classe', 'module', 'filiere')}
+
+
+class PresencesSerieView(APIView):
+    """
+    Évolution des présences sur une semaine, un mois, un semestre ou une période
+    explicite (`?debut=&fin=`), filtrable par classe, module et filière.
+    """
+    permission_classes = [IsAuthenticated, IsAnyAdmin]
+
+    def get(self, request):
+        serializer = PeriodePresencesSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        return Response({
+            'debut': data['debut'],
+            'fin': data['fin'],
+            **serie_temporelle(data['debut'], data['fin'], **_filtres(data)),
+        }, status=status.HTTP_200_OK)
+
+
+class PresencesRepartitionView(APIView):
+    """
+    Présences de la période ventilées par classe, module ou filière (`?par=`).
+    """
+    permission_classes = [IsAuthenticated, IsAnyAdmin]
+
+    def get(self, request):
+        serializer = RepartitionPresencesSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        return Response({
+            'debut': data['debut'],
+            'fin': data['fin'],
+            'par': data['par'],
+            **repartition(data['debut'], data['fin'], data['par'], **_filtres(data)),
+        }, status=status.HTTP_200_OK)
@@ -0,0 +1,16 @@
+from django.apps import AppConfig
+
+
+class TachesConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'taches'
+
+    def ready(self):
+        # Chaque application déclare ses gestionnaires dans son module `taches.py`
+        from django.utils.module_loading import autodiscover_modules
+        autodiscover_modules('taches')
+
+        # Reprend les tâches en attente, replanifiées ou bloquées dès le redémarrage,
+        # sans attendre qu'une requête en ajoute une
+        from .execution import demarrer_au_lancement
+        demarrer_au_lancement()
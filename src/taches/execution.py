@@ -0,0 +1,276 @@
+"""
+File de tâches de fond stockée en base, sans broker.
+
+`enfiler` crée une `Tache` et réveille les workers à la validation de la
+transaction. Un worker réclame une tâche par un UPDATE conditionnel
+(statut et nombre de tentatives inchangés) sur une ligne lue avec
+`select_for_update(skip_locked=True)` : deux workers, même dans deux
+processus, ne peuvent pas exécuter la même tâche. Une tâche en échec est
+replanifiée avec un délai croissant jusqu'à `max_tentatives`, une tâche
+`EN_COURS` dont le battement (`modifie_le`) est plus ancien que
+`DELAI_BLOCAGE` (worker arrêté) est reprise : pendant l'exécution, un thread
+rafraîchit `modifie_le` toutes les `BATTEMENT` secondes, et `progresser`
+le rafraîchit aussi. Une tâche longue mais vivante n'est donc jamais reprise.
+
+Les workers tournent dans le processus web (`TACHES['WORKERS_INTEGRES']`),
+démarrés avec lui par `TachesConfig.ready()` pour reprendre les tâches en
+attente après un redémarrage, ou dans un processus séparé avec la commande
+`executer_taches` (`WORKERS_INTEGRES` à 0).
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Tache
+from .registre import gestionnaires
+
+logger = logging.getLogger(__name__)
+
+_config = getattr(settings, 'TACHES', {})
+
+
+def enfiler(type, parametres=None, cree_par=None, max_tentatives=3, executer_apres=None):
+    """
+    Ajoute une tâche à la file.
+
+    Returns:
+        La `Tache` créée.
+    """
+    if type not in gestionnaires:
+        raise ValueError(f"Aucun gestionnaire de tâche enregistré pour « {type} ».")
+
+    tache = Tache.objects.create(
+        type=type,
+        parametres=parametres or {},
+        cree_par=cree_par,
+        max_tentatives=max_tentatives,
+        executer_apres=executer_apres or timezone.now(),
+    )
+    # La tâche n'est visible des workers qu'une fois la transaction validée
+    transaction.on_commit(reveiller_workers)
+    return tache
+
+
+def reclamer_tache(now=None):
+    """
+    Réserve la prochaine tâche exécutable pour le worker appelant.
+
+    Returns:
+        La `Tache` passée `EN_COURS`, ou None si la file est vide.
+    """
+    now = now or timezone.now()
+    limite_blocage = now - timedelta(seconds=_config.get('DELAI_BLOCAGE', 900))
+
+    while True:
+        with transaction.atomic():
+            candidate = (
+                Tache.objects
+                .select_for_update(skip_locked=True)
+                .filter(
+                    Q(statut='EN_ATTENTE', executer_apres__lte=now)
+                    | Q(statut='EN_COURS', modifie_le__lt=limite_blocage)
+                )
+                .order_by('executer_apres', 'id')
+                .first()
+            )
+            if candidate is None:
+                return None
+
+            # UPDATE conditionnel : sans effet si un autre worker a réservé la tâche entre-temps
+            reservee = Tache.objects.filter(
+                id=candidate.id, statut=candidate.statut, tentatives=candidate.tentatives
+            ).update(statut='EN_COURS', tentatives=F('tentatives') + 1, demarree_le=now, modifie_le=now)
+        if not reservee:
+            continue
+
+        tache = Tache.objects.get(id=candidate.id)
+        if tache.tentatives > tache.max_tentatives:
+            # Tâche reprise après l'arrêt de son worker alors qu'elle avait épuisé ses tentatives
+            Tache.objects.filter(id=tache.id).update(
+                statut='ECHOUEE', erreur="Tâche interrompue trop de fois.", modifie_le=timezone.now()
+            )
+            continue
+        return tache
+
+
+class Battement:
+    """
+    Rafraîchit `modifie_le` de la tâche toutes les `intervalle` secondes tant que
+    son gestionnaire tourne, pour que `reclamer_tache` ne la reprenne pas.
+    """
+
+    def __init__(self, tache, intervalle):
+        self.tache = tache
+        self.intervalle = intervalle
+        self._fin = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'taches-battement-{tache.id}', daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._fin.set()
+        self._thread.join()
+
+    def _run(self):
+        try:
+            while not self._fin.wait(self.intervalle):
+                # Sans effet si la tâche a été reprise par un autre worker (tentatives changées)
+                Tache.objects.filter(
+                    id=self.tache.id, statut='EN_COURS', tentatives=self.tache.tentatives
+                ).update(modifie_le=timezone.now())
+        except Exception as e:
+            logger.error(f"Battement de la tâche #{self.tache.id} interrompu : {e}")
+        finally:
+            connection.close()
+
+
+def executer_tache(tache):
+    """
+    Exécute le gestionnaire de la tâche et enregistre son résultat ou son erreur.
+    L'enregistrement est conditionnel, comme le battement : un worker dont la tâche
+    a été reprise entre-temps (`tentatives` changé) n'écrase pas le nouveau worker.
+    """
+    gestionnaire = gestionnaires.get(tache.type)
+    # Ligne toujours réservée par ce worker
+    reservee = Tache.objects.filter(id=tache.id, statut='EN_COURS', tentatives=tache.tentatives)
+    try:
+        if gestionnaire is None:
+            raise LookupError(f"Aucun gestionnaire de tâche enregistré pour « {tache.type} ».")
+        with Battement(tache, _config.get('BATTEMENT', 60)):
+            resultat = gestionnaire(tache)
+    except Exception as e:
+        now = timezone.now()
+        logger.error(f"Échec de la tâche #{tache.id} ({tache.type}), tentative {tache.tentatives} : {e}")
+        if tache.tentatives < tache.max_tentatives:
+            delai = _config.get('DELAI_RETRY', 30) * 2 ** (tache.tentatives - 1)
+            enregistree = reservee.update(
+                statut='EN_ATTENTE', erreur=str(e), executer_apres=now + timedelta(seconds=delai), modifie_le=now
+            )
+        else:
+            enregistree = reservee.update(statut='ECHOUEE', erreur=str(e), modifie_le=now)
+        if not enregistree:
+            logger.warning(f"Tâche #{tache.id} reprise par un autre worker : échec de la tentative {tache.tentatives} ignoré.")
+        return False
+
+    enregistree = reservee.update(
+        statut='TERMINEE', progression=100, resultat=resultat, erreur='', modifie_le=timezone.now()
+    )
+    if not enregistree:
+        logger.warning(f"Tâche #{tache.id} reprise par un autre worker : résultat de la tentative {tache.tentatives} ignoré.")
+    return bool(enregistree)
+
+
+def executer_disponibles(limite=None):
+    """
+    Exécute les tâches disponibles dans le thread appelant jusqu'à ce que la file soit vide.
+
+    Returns:
+        Le nombre de tâches exécutées.
+    """
+    total = 0
+    while limite is None or total < limite:
+        tache = reclamer_tache()
+        if tache is None:
+            break
+        executer_tache(tache)
+        total += 1
+    return total
+
+
+class PoolTaches:
+    """
+    Threads workers qui vident la file, puis attendent un réveil ou `intervalle` secondes.
+    """
+
+    def __init__(self, workers, intervalle):
+        self.workers = workers
+        self.intervalle = intervalle
+        self.threads = []
+        self._reveil = threading.Event()
+
+    def demarrer(self, daemon=True):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f'taches-worker-{i}', daemon=daemon)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def reveiller(self):
+        self._reveil.set()
+
+    def est_actif(self):
+        return any(thread.is_alive() for thread in self.threads)
+
+    def _run(self):
+        # Démarré depuis `ready()` : pas de requête avant la fin du chargement des applications
+        while not apps.ready:
+            time.sleep(0.1)
+        while True:
+            close_old_connections()
+            try:
+                executees = executer_disponibles()
+            except Exception as e:
+                logger.error(f"Erreur du worker de tâches : {e}")
+                executees = 0
+            finally:
+                close_old_connections()
+            if not executees:
+                self._reveil.wait(self.intervalle)
+                self._reveil.clear()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def demarrer_workers():
+    """
+    Démarre les workers intégrés au processus s'ils ne tournent pas encore.
+    Sans effet si `TACHES['WORKERS_INTEGRES']` vaut 0 (commande `executer_taches`).
+    """
+    global _pool
+    workers = _config.get('WORKERS_INTEGRES', 2)
+    if not workers or (_pool is not None and _pool.est_actif()):
+        return _pool
+    with _pool_lock:
+        if _pool is None or not _pool.est_actif():
+            _pool = PoolTaches(workers, _config.get('INTERVALLE', 2)).demarrer()
+    return _pool
+
+
+def _est_processus_serveur():
+    """
+    Vrai pour un serveur WSGI/ASGI ou le processus enfant de `runserver` ; faux pour
+    les autres commandes de gestion, les tests et le processus parent de l'autoreloader.
+    """
+    if 'pytest' in sys.modules:
+        return False
+    programme = os.path.basename(sys.argv[0]) if sys.argv else ''
+    if programme in ('manage.py', 'django-admin', 'django-admin.py') or programme.endswith('manage.py'):
+        if len(sys.argv) < 2 or sys.argv[1] != 'runserver':
+            return False
+        return os.environ.get('RUN_MAIN') == 'true' or '--noreload' in sys.argv
+    return True
+
+
+def demarrer_au_lancement():
+    """Démarre les workers intégrés avec le processus serveur (appelé par `TachesConfig.ready()`)."""
+    if _est_processus_serveur():
+        demarrer_workers()
+
+
+def reveiller_workers():
+    pool = demarrer_workers()
+    if pool is not None:
+        pool.reveiller()
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from taches.execution import PoolTaches, executer_disponibles
+
+
+class Command(BaseCommand):
+    help = "Exécute les tâches de fond en attente dans un processus séparé du serveur web."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help="Nombre de threads workers.")
+        parser.add_argument('--intervalle', type=float, default=2,
+                            help="Secondes entre deux consultations de la file vide.")
+        parser.add_argument('--une-passe', action='store_true',
+                            help="Exécute les tâches disponibles puis s'arrête (cron).")
+
+    def handle(self, *args, **options):
+        if options['une_passe']:
+            total = executer_disponibles()
+            self.stdout.write(f"{total} tâche(s) exécutée(s).")
+            return
+
+        pool = PoolTaches(options['workers'], options['intervalle']).demarrer()
+        self.stdout.write(f"{options['workers']} worker(s) démarré(s). Ctrl+C pour arrêter.")
+        try:
+            while pool.est_actif():
+                time.sleep(1)
+        except KeyboardInterrupt:
+            self.stdout.write("Arrêt des workers.")
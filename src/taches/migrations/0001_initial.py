@@ -0,0 +1,41 @@
+# Generated by Django 4.2.16 on 2026-10-18 14:21
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(help_text='Nom du gestionnaire enregistré (ex: absences.generer).', max_length=100)),
+                ('parametres', models.JSONField(blank=True, default=dict)),
+                ('statut', models.CharField(choices=[('EN_ATTENTE', 'En attente'), ('EN_COURS', 'En cours'), ('TERMINEE', 'Terminée'), ('ECHOUEE', 'Échouée')], default='EN_ATTENTE', max_length=20)),
+                ('progression', models.PositiveSmallIntegerField(default=0, help_text='Avancement en pourcentage.')),
+                ('resultat', models.JSONField(blank=True, null=True)),
+                ('erreur', models.TextField(blank=True, default='')),
+                ('tentatives', models.PositiveSmallIntegerField(default=0)),
+                ('max_tentatives', models.PositiveSmallIntegerField(default=3)),
+                ('executer_apres', models.DateTimeField(default=django.utils.timezone.now)),
+                ('demarree_le', models.DateTimeField(blank=True, null=True)),
+                ('cree_le', models.DateTimeField(auto_now_add=True)),
+                ('modifie_le', models.DateTimeField(auto_now=True)),
+                ('cree_par', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='taches', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-cree_le'],
+                'indexes': [models.Index(fields=['statut', 'executer_apres'], name='tache_statut_executer_idx')],
+            },
+        ),
+    ]
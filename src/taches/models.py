@@ -0,0 +1,44 @@
+from django.db import models
+from django.utils import timezone
+from users.models import User
+
+
+class Tache(models.Model):
+    """
+    Une tâche de fond enregistrée en base (file de tâches sans broker).
+    Les workers réclament les tâches `EN_ATTENTE` dont `executer_apres` est passé.
+    """
+    STATUT_CHOICES = [
+        ('EN_ATTENTE', 'En attente'),
+        ('EN_COURS', 'En cours'),
+        ('TERMINEE', 'Terminée'),
+        ('ECHOUEE', 'Échouée'),
+    ]
+
+    type = models.CharField(max_length=100, help_text="Nom du gestionnaire enregistré (ex: absences.generer).")
+    parametres = models.JSONField(default=dict, blank=True)
+    statut = models.CharField(max_length=20, choices=STATUT_CHOICES, default='EN_ATTENTE')
+    progression = models.PositiveSmallIntegerField(default=0, help_text="Avancement en pourcentage.")
+    resultat = models.JSONField(null=True, blank=True)
+    erreur = models.TextField(blank=True, default='')
+    tentatives = models.PositiveSmallIntegerField(default=0)
+    max_tentatives = models.PositiveSmallIntegerField(default=3)
+    executer_apres = models.DateTimeField(default=timezone.now)
+    demarree_le = models.DateTimeField(null=True, blank=True)
+    cree_par = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='taches')
+    cree_le = models.DateTimeField(auto_now_add=True)
+    modifie_le = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-cree_le']
+        indexes = [
+            models.Index(fields=['statut', 'executer_apres'], name='tache_statut_executer_idx'),
+        ]
+
+    def __str__(self):
+        return f"Tâche #{self.id} {self.type} ({self.statut})"
+
+    def progresser(self, progression):
+        """Enregistre l'avancement (0-100) sans toucher aux autres champs."""
+        self.progression = max(0, min(100, int(progression)))
+        Tache.objects.filter(id=self.id).update(progression=self.progression, modifie_le=timezone.now())
@@ -0,0 +1,27 @@
+"""
+Registre des gestionnaires de tâches de fond.
+
+Chaque application déclare ses gestionnaires dans un module `taches.py`,
+chargé au démarrage par `TachesConfig.ready()` :
+
+    from taches.registre import tache
+
+    @tache('absences.generer')
+    def generer(t):
+        ...
+        return {...}   # enregistré dans Tache.resultat
+
+Un gestionnaire reçoit l'objet `Tache` (paramètres dans `t.parametres`,
+avancement via `t.progresser(pourcentage)`) et retourne un résultat
+sérialisable en JSON. Une exception déclenche une nouvelle tentative.
+"""
+
+gestionnaires = {}
+
+
+def tache(nom):
+    """Décorateur qui enregistre un gestionnaire sous le nom `nom`."""
+    def decorateur(fonction):
+        gestionnaires[nom] = fonction
+        return fonction
+    return decorateur
@@ -0,0 +1,23 @@
+from rest_framework import serializers
+from .models import Tache
+
+
+class TacheSerializer(serializers.ModelSerializer):
+    """
+    Serializer pour suivre l'état d'une tâche de fond.
+    """
+    class Meta:
+        model = Tache
+        fields = [
+            'id',
+            'type',
+            'statut',
+            'progression',
+            'resultat',
+            'erreur',
+            'tentatives',
+            'max_tentatives',
+            'cree_le',
+            'modifie_le'
+        ]
+        read_only_fields = fields
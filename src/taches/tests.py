@@ -0,0 +1,110 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from . import execution
+from .models import Tache
+from .registre import tache
+
+appels = []
+
+
+@tache('tests.ok')
+def ok(t):
+    appels.append(t.id)
+    return {'ok': True}
+
+
+@tache('tests.echec')
+def echec(t):
+    raise RuntimeError("échec voulu")
+
+
+CONFIG = {'WORKERS_INTEGRES': 0, 'DELAI_RETRY': 30, 'DELAI_BLOCAGE': 900, 'BATTEMENT': 60}
+
+
+@mock.patch.dict(execution._config, CONFIG, clear=True)
+class FileDeTachesTests(TestCase):
+
+    def setUp(self):
+        appels.clear()
+
+    def test_reclamer_dans_l_ordre(self):
+        premiere = execution.enfiler('tests.ok')
+        seconde = execution.enfiler('tests.ok')
+        plus_tard = execution.enfiler('tests.ok', executer_apres=timezone.now() + timedelta(hours=1))
+
+        reclamee = execution.reclamer_tache()
+        self.assertEqual(reclamee.id, premiere.id)
+        self.assertEqual((reclamee.statut, reclamee.tentatives), ('EN_COURS', 1))
+        # Une tâche réservée n'est plus proposée, une tâche planifiée plus tard pas encore
+        self.assertEqual(execution.reclamer_tache().id, seconde.id)
+        self.assertIsNone(execution.reclamer_tache())
+        self.assertEqual(Tache.objects.get(id=plus_tard.id).statut, 'EN_ATTENTE')
+
+    def test_reservation_conditionnelle(self):
+        execution.enfiler('tests.ok')
+        # Un autre worker réserve la ligne entre la lecture et l'UPDATE : on passe à la suivante
+        update = Tache.objects.filter
+
+        def reservee_ailleurs(*args, **kwargs):
+            qs = update(*args, **kwargs)
+            if 'tentatives' in kwargs:
+                Tache.objects.all().update(statut='EN_COURS', tentatives=1, modifie_le=timezone.now())
+            return qs
+
+        with mock.patch.object(Tache.objects, 'filter', side_effect=reservee_ailleurs):
+            self.assertIsNone(execution.reclamer_tache())
+
+    def test_execution(self):
+        t = execution.enfiler('tests.ok')
+        self.assertEqual(execution.executer_disponibles(), 1)
+        t.refresh_from_db()
+        self.assertEqual((t.statut, t.progression, t.resultat), ('TERMINEE', 100, {'ok': True}))
+        self.assertEqual(appels, [t.id])
+
+    def test_nouvelles_tentatives_espacees(self):
+        t = execution.enfiler('tests.echec', max_tentatives=3)
+        delais = []
+        for _ in range(2):
+            avant = timezone.now()
+            execution.executer_disponibles()
+            t.refresh_from_db()
+            self.assertEqual(t.statut, 'EN_ATTENTE')
+            delais.append(round((t.executer_apres - avant).total_seconds()))
+            Tache.objects.filter(id=t.id).update(executer_apres=timezone.now())
+        self.assertEqual(delais, [30, 60])
+
+        execution.executer_disponibles()
+        t.refresh_from_db()
+        self.assertEqual((t.statut, t.tentatives, t.erreur), ('ECHOUEE', 3, "échec voulu"))
+
+    def test_reprise_d_une_tache_bloquee(self):
+        t = execution.enfiler('tests.ok')
+        ancienne = execution.reclamer_tache()
+
+        # Battement récent : la tâche n'est pas reprise
+        self.assertIsNone(execution.reclamer_tache())
+
+        Tache.objects.filter(id=t.id).update(modifie_le=timezone.now() - timedelta(seconds=901))
+        reprise = execution.reclamer_tache()
+        self.assertEqual((reprise.id, reprise.tentatives), (t.id, 2))
+
+        # Le premier worker finit après la reprise : son résultat est ignoré
+        self.assertFalse(execution.executer_tache(ancienne))
+        t.refresh_from_db()
+        self.assertEqual((t.statut, t.tentatives), ('EN_COURS', 2))
+
+        self.assertTrue(execution.executer_tache(reprise))
+        t.refresh_from_db()
+        self.assertEqual(t.statut, 'TERMINEE')
+
+    def test_tentatives_epuisees_a_la_reprise(self):
+        t = execution.enfiler('tests.ok', max_tentatives=1)
+        execution.reclamer_tache()
+        Tache.objects.filter(id=t.id).update(modifie_le=timezone.now() - timedelta(seconds=901))
+        self.assertIsNone(execution.reclamer_tache())
+        t.refresh_from_db()
+        self.assertEqual(t.statut, 'ECHOUEE')
@@ -0,0 +1,7 @@
+from django.urls import path
+from .views import TacheFichierView, TacheStatutView
+
+urlpatterns = [
+    path('taches/<int:id>/', TacheStatutView.as_view(), name='tache-statut'),
+    path('taches/<int:id>/fichier/', TacheFichierView.as_view(), name='tache-fichier'),
+]
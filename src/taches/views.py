@@ -0,0 +1,53 @@
+from django.http import FileResponse
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+
+from FaceLoad.exports import chemin_export
+from users.permissions import IsAnyAdmin
+from .models import Tache
+from .serializers import TacheSerializer
+
+
+def _tache_visible(request, view, id):
+    tache = Tache.objects.filter(pk=id).first()
+    if not tache or (tache.cree_par_id != request.user.id and not IsAnyAdmin().has_permission(request, view)):
+        return None
+    return tache
+
+
+class TacheStatutView(APIView):
+    """
+    Retourne l'état d'une tâche de fond (statut, progression, résultat).
+    Accessible à l'utilisateur qui l'a créée et aux administrateurs.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, id):
+        tache = _tache_visible(request, self, id)
+        if not tache:
+            return Response({"message": f"Tâche non trouvée avec ID: {id}"}, status=status.HTTP_404_NOT_FOUND)
+
+        serializer = TacheSerializer(tache)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class TacheFichierView(APIView):
+    """
+    Télécharge le fichier produit par une tâche terminée (exports).
+    Mêmes droits que le statut de la tâche.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, id):
+        tache = _tache_visible(request, self, id)
+        if not tache:
+            return Response({"message": f"Tâche non trouvée avec ID: {id}"}, status=status.HTTP_404_NOT_FOUND)
+        if tache.statut != 'TERMINEE':
+            return Response({"message": "La tâche n'est pas terminée."}, status=status.HTTP_409_CONFLICT)
+
+        chemin = chemin_export((tache.resultat or {}).get('fichier'))
+        if chemin is None or not chemin.is_file():
+            return Response({"message": "Aucun fichier pour cette tâche."}, status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(open(chemin, 'rb'), as_attachment=True, filename=chemin.name)
@@ -63,11 +63,11 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     @classmethod
     def get_students(cls):
-        return cls.objects.filter(roles__name='STUDENT').distinct()
+        return cls.objects.filter(role__name='STUDENT').distinct()
 
     @classmethod
     def get_professors(cls):
-        return cls.objects.filter(roles__name='PROFESSOR').distinct()
+        return cls.objects.filter(role__name='PROFESSOR').distinct()
 
     @classmethod
     def get_admins(cls):
@@ -19,7 +19,7 @@ class IsProfessor(permissions.BasePermission):
     Permission qui permet l'accès uniquement aux utilisateurs ayant le rôle 'PROFESSOR'.
     """
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.roles.filter(name='PROFESSOR').exists()
+        return request.user.is_authenticated and request.user.role_id is not None and request.user.role.name == 'PROFESSOR'
 
 
 class IsStudent(permissions.BasePermission):
@@ -27,7 +27,7 @@ class IsStudent(permissions.BasePermission):
     Permission qui permet l'accès uniquement aux utilisateurs ayant le rôle 'STUDENT'.
     """
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.roles.filter(name='STUDENT').exists()
+        return request.user.is_authenticated and request.user.role_id is not None and request.user.role.name == 'STUDENT'
 
 class IsSuperuser(permissions.BasePermission):
     """